@@ -2,6 +2,32 @@
 Admin para funcionalidades de acessibilidade.
 """
 from django.contrib import admin
+from .models import AudioCacheEntry
 
-# O app accessibility não possui modelos próprios
-# As configurações de acessibilidade são gerenciadas via API e frontend
+# As configurações de acessibilidade são gerenciadas via API e frontend;
+# aqui fica apenas o índice do cache de áudio do TTS
+
+
+@admin.register(AudioCacheEntry)
+class AudioCacheEntryAdmin(admin.ModelAdmin):
+    """
+    Admin para AudioCacheEntry.
+    """
+    list_display = [
+        'cache_key',
+        'size',
+        'hits',
+        'last_accessed_at',
+        'created_at'
+    ]
+    search_fields = [
+        'cache_key'
+    ]
+    readonly_fields = [
+        'cache_key',
+        'size',
+        'hits',
+        'last_accessed_at',
+        'created_at'
+    ]
+    ordering = ['-last_accessed_at']
@@ -5,3 +5,10 @@ class AccessibilityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accessibility'
     verbose_name = 'Acessibilidade'
+    
+    def ready(self):
+        from django.db.models.signals import post_save
+        from .prewarm import dish_saved
+        
+        # Narração do prato pré-sintetizada ao salvar (apps.accessibility.prewarm)
+        post_save.connect(dish_saved, sender='core.Dish', dispatch_uid='accessibility.prewarm_dish')
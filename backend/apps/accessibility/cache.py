@@ -0,0 +1,241 @@
+"""
+Cache em disco dos áudios do Text-to-Speech para João Macarrão.
+
+Os MP3 ficam em MEDIA_ROOT/tts_cache/<ab>/<cd>/<chave>.mp3 (dois níveis
+pelo início do hash, para nenhum diretório acumular todos os arquivos)
+e são gravados em um arquivo temporário seguido de rename: um leitor
+nunca vê um áudio pela metade, mesmo com gravações concorrentes.
+
+O índice (AudioCacheEntry) guarda tamanho, acertos e último acesso de
+cada áudio. Quando o total passa de TTS_CACHE_MAX_BYTES, os menos usados
+(TTS_CACHE_EVICTION: 'lru' ou 'lfu') são removidos até
+TTS_CACHE_TARGET_RATIO do limite. O comando prune_tts_cache aplica o
+limite, reconstrói o índice a partir do disco e mostra as estatísticas.
+"""
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import AudioCacheEntry
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_RE = re.compile(r'^[0-9a-f]{32}$')
+
+EVICTION_ORDER = {
+    'lru': ('last_accessed_at', 'id'),
+    'lfu': ('hits', 'last_accessed_at', 'id'),
+}
+
+
+class AudioCache:
+    """
+    Cache de áudio endereçado pela chave do TTS (get_cache_key).
+    
+    - lookup: consulta o cache e registra o acerto no índice
+    - store: grava o áudio, indexa e aplica o limite de tamanho
+    - evict: remove os áudios menos usados até caber no limite
+    - rebuild: sincroniza índice e disco
+    """
+    
+    def __init__(self, root=None, max_bytes=None, eviction=None, target_ratio=None):
+        self.root = Path(root or Path(settings.MEDIA_ROOT) / 'tts_cache')
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or getattr(settings, 'TTS_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+        self.eviction = eviction or getattr(settings, 'TTS_CACHE_EVICTION', 'lru')
+        self.target_ratio = target_ratio or getattr(settings, 'TTS_CACHE_TARGET_RATIO', 0.9)
+    
+    def path_for(self, cache_key, suffix='.mp3'):
+        return self.root / cache_key[:2] / cache_key[2:4] / f'{cache_key}{suffix}'
+    
+    def write(self, path, content):
+        """Grava via arquivo temporário + rename no mesmo diretório"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            self.discard(tmp)
+            raise
+    
+    def discard(self, *paths):
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+    
+    def exists(self, cache_key):
+        return self.path_for(cache_key).exists()
+    
+    def lookup(self, cache_key, load=True, touch=True):
+        """
+        (encontrado, áudio) no cache; com load=False o arquivo não é lido.
+        Com touch, acertos atualizam o índice (contagem e último acesso).
+        """
+        if load:
+            try:
+                with open(self.path_for(cache_key), 'rb') as f:
+                    audio = f.read()
+            except FileNotFoundError:
+                return False, None
+        else:
+            if not self.exists(cache_key):
+                return False, None
+            audio = None
+        
+        if touch:
+            self.touch(cache_key)
+        return True, audio
+    
+    def touch(self, cache_key):
+        """Registra um acerto (um UPDATE); áudios fora do índice são indexados"""
+        try:
+            updated = AudioCacheEntry.objects.filter(cache_key=cache_key).update(
+                hits=F('hits') + 1,
+                last_accessed_at=timezone.now()
+            )
+            if not updated:
+                size = self.path_for(cache_key).stat().st_size
+                AudioCacheEntry.objects.get_or_create(cache_key=cache_key, defaults={'size': size, 'hits': 1})
+        except (DatabaseError, FileNotFoundError) as e:
+            logger.warning('Índice do cache de áudio não atualizado (%s): %s', cache_key, e)
+    
+    def store(self, cache_key, content):
+        """Grava o áudio, indexa e remove os menos usados se passar do limite"""
+        self.write(self.path_for(cache_key), content)
+        try:
+            AudioCacheEntry.objects.update_or_create(
+                cache_key=cache_key,
+                defaults={'size': len(content), 'last_accessed_at': timezone.now()}
+            )
+            self.evict()
+        except DatabaseError as e:
+            # O áudio já está no disco; prune_tts_cache --rebuild corrige o índice
+            logger.warning('Índice do cache de áudio não atualizado (%s): %s', cache_key, e)
+    
+    def total_bytes(self):
+        return AudioCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    
+    def evict(self, max_bytes=None, dry_run=False, batch_size=500):
+        """
+        Remove os áudios menos usados se o total passar de max_bytes.
+        
+        Returns:
+            (quantidade removida, bytes liberados)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.total_bytes()
+        if total <= max_bytes:
+            return 0, 0
+        
+        excess = total - int(max_bytes * self.target_ratio)
+        removed = freed = 0
+        candidates = AudioCacheEntry.objects.order_by(*EVICTION_ORDER[self.eviction])
+        last_seen = 0
+        while freed < excess:
+            batch = list(candidates.values_list('pk', 'cache_key', 'size')[last_seen:last_seen + batch_size])
+            if not batch:
+                break
+            victims = []
+            for pk, cache_key, size in batch:
+                if freed >= excess:
+                    break
+                victims.append(pk)
+                freed += size
+                removed += 1
+                if not dry_run:
+                    self.discard(self.path_for(cache_key))
+            if dry_run:
+                last_seen += len(batch)
+            else:
+                AudioCacheEntry.objects.filter(pk__in=victims).delete()
+        
+        if removed and not dry_run:
+            logger.info('Cache de áudio: %s arquivo(s) removido(s), %s bytes liberados', removed, freed)
+        return removed, freed
+    
+    def _files(self):
+        """Arquivos do cache (inclusive o formato plano antigo <chave>.mp3 na raiz)"""
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                yield Path(dirpath) / filename
+    
+    def rebuild(self, stale_after=3600):
+        """
+        Sincroniza índice e disco.
+        
+        - move áudios do formato plano antigo para os subdiretórios
+        - indexa áudios sem entrada e remove entradas sem arquivo
+        - apaga temporários e marcadores abandonados há mais de stale_after segundos
+        """
+        summary = {'migrated': 0, 'indexed': 0, 'dropped': 0, 'cleaned': 0}
+        now = time.time()
+        on_disk = {}
+        
+        for path in list(self._files()):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.suffix != '.mp3' or path.name.startswith('.'):
+                if now - stat.st_mtime > stale_after:
+                    self.discard(path)
+                    summary['cleaned'] += 1
+                continue
+            
+            cache_key = path.stem
+            if not CACHE_KEY_RE.match(cache_key):
+                continue
+            target = self.path_for(cache_key)
+            if path != target:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, target)
+                summary['migrated'] += 1
+            on_disk[cache_key] = stat
+        
+        indexed = set(AudioCacheEntry.objects.values_list('cache_key', flat=True))
+        missing = [
+            AudioCacheEntry(
+                cache_key=cache_key,
+                size=stat.st_size,
+                last_accessed_at=datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+            )
+            for cache_key, stat in on_disk.items()
+            if cache_key not in indexed
+        ]
+        AudioCacheEntry.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+        summary['indexed'] = len(missing)
+        
+        orphans = indexed - set(on_disk)
+        if orphans:
+            summary['dropped'], _ = AudioCacheEntry.objects.filter(cache_key__in=orphans).delete()
+        return summary
+    
+    def stats(self):
+        """Uso do disco e taxa de acerto (acertos / (acertos + sínteses em cache))"""
+        totals = AudioCacheEntry.objects.aggregate(total=Sum('size'), hits=Sum('hits'))
+        entries = AudioCacheEntry.objects.count()
+        total = totals['total'] or 0
+        hits = totals['hits'] or 0
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'usage': round(total / self.max_bytes, 3) if self.max_bytes else 0.0,
+            'hits': hits,
+            'hit_rate': round(hits / (hits + entries), 3) if hits + entries else 0.0,
+            'eviction': self.eviction
+        }
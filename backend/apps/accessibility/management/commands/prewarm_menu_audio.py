@@ -0,0 +1,50 @@
+"""
+Pré-sintetiza a narração dos pratos do cardápio em todos os idiomas.
+Uso: python manage.py prewarm_menu_audio [--dish ID ...] [--language pt-BR ...] [--voice NEUTRAL ...] [--concurrency N]
+
+Pratos cuja narração já está no cache são pulados; rodar de novo após
+um deploy ou uma importação de cardápio só sintetiza o que mudou.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accessibility.prewarm import prewarm_menu
+from apps.accessibility.tts import SUPPORTED_LANGUAGES, VOICE_GENDERS, get_engine
+from apps.core.models import Dish
+
+
+class Command(BaseCommand):
+    help = 'Sintetiza antecipadamente a narração dos pratos disponíveis'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--dish', type=int, nargs='+', help='Apenas os pratos informados')
+        parser.add_argument(
+            '--language', nargs='+',
+            choices=[language['code'] for language in SUPPORTED_LANGUAGES],
+            help='Idiomas (padrão: todos os suportados)'
+        )
+        parser.add_argument('--voice', nargs='+', choices=VOICE_GENDERS, help='Vozes (padrão: TTS_PREWARM_VOICES)')
+        parser.add_argument('--concurrency', type=int, help='Sínteses simultâneas (padrão: TTS_PREWARM_CONCURRENCY)')
+    
+    def handle(self, *args, **options):
+        if not get_engine().available:
+            raise CommandError('Sintetizador de voz não configurado (veja TTS_SYNTHESIZER)')
+        
+        dishes = None
+        if options['dish']:
+            dishes = Dish.objects.filter(pk__in=options['dish'], available=True)
+        
+        summary = prewarm_menu(
+            dishes,
+            languages=options['language'],
+            voice_genders=options['voice'],
+            concurrency=options['concurrency']
+        )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['synthesized']} narração(ões) sintetizada(s), {summary['cached']} já em cache, "
+            f"{summary['failed']} com falha de {summary['total']}"
+        ))
+        self.stdout.write(
+            f"{summary['seconds']}s, {summary['per_second']} síntese(s)/s, "
+            f"{summary['bytes'] / 1024 / 1024:.1f} MB"
+        )
@@ -0,0 +1,40 @@
+"""
+Aplica o limite de tamanho do cache de áudio do TTS e mostra as estatísticas.
+Uso: python manage.py prune_tts_cache [--max-bytes N] [--rebuild] [--dry-run] [--stats]
+
+--rebuild sincroniza o índice com o disco (necessário uma vez para mover
+os áudios do formato antigo, um arquivo por chave na raiz do cache).
+"""
+from django.core.management.base import BaseCommand
+
+from apps.accessibility.cache import AudioCache
+
+
+class Command(BaseCommand):
+    help = 'Remove os áudios de TTS menos usados acima do limite e mostra uso e taxa de acerto'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--max-bytes', type=int, help='Limite em bytes (padrão: TTS_CACHE_MAX_BYTES)')
+        parser.add_argument('--rebuild', action='store_true', help='Reconstrói o índice a partir dos arquivos')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas mostra o que seria removido')
+        parser.add_argument('--stats', action='store_true', help='Apenas mostra as estatísticas')
+    
+    def handle(self, *args, **options):
+        cache = AudioCache()
+        
+        if options['rebuild'] and not options['stats']:
+            summary = cache.rebuild()
+            self.stdout.write(
+                f"Índice: {summary['migrated']} movido(s), {summary['indexed']} indexado(s), "
+                f"{summary['dropped']} entrada(s) sem arquivo, {summary['cleaned']} temporário(s) apagado(s)"
+            )
+        
+        if not options['stats']:
+            removed, freed = cache.evict(options['max_bytes'], dry_run=options['dry_run'])
+            verb = 'seriam removido(s)' if options['dry_run'] else 'removido(s)'
+            self.stdout.write(self.style.SUCCESS(
+                f'{removed} áudio(s) {verb}, {freed / 1024 / 1024:.1f} MB'
+            ))
+        
+        for name, value in cache.stats().items():
+            self.stdout.write(f'{name}: {value}')
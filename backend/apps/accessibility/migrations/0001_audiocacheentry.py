@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 00:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=32, unique=True, verbose_name='Chave')),
+                ('size', models.PositiveIntegerField(verbose_name='Tamanho (bytes)')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Acertos')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('last_accessed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Último acesso')),
+            ],
+            options={
+                'verbose_name': 'Áudio em Cache',
+                'verbose_name_plural': 'Áudios em Cache',
+                'ordering': ['-last_accessed_at'],
+                'indexes': [models.Index(fields=['last_accessed_at'], name='tts_cache_lru_idx'), models.Index(fields=['hits', 'last_accessed_at'], name='tts_cache_lfu_idx')],
+            },
+        ),
+    ]
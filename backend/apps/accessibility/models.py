@@ -1,3 +1,49 @@
+"""
+Modelos de acessibilidade para João Macarrão.
+"""
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class AudioCacheEntry(models.Model):
+    """
+    Índice do cache de áudio do Text-to-Speech (apps.accessibility.cache).
+    
+    Cada linha corresponde a um MP3 no disco. O tamanho total e a ordem de
+    acesso/uso permitem remover os áudios menos usados quando o cache passa
+    de TTS_CACHE_MAX_BYTES, sem varrer o diretório.
+    """
+    
+    cache_key = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name='Chave'
+    )
+    size = models.PositiveIntegerField(
+        verbose_name='Tamanho (bytes)'
+    )
+    hits = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Acertos'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Criado em'
+    )
+    last_accessed_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Último acesso'
+    )
+    
+    class Meta:
+        verbose_name = 'Áudio em Cache'
+        verbose_name_plural = 'Áudios em Cache'
+        ordering = ['-last_accessed_at']
+        indexes = [
+            # Ordem de remoção (LRU e LFU)
+            models.Index(fields=['last_accessed_at'], name='tts_cache_lru_idx'),
+            models.Index(fields=['hits', 'last_accessed_at'], name='tts_cache_lfu_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cache_key} ({self.size} bytes, {self.hits} acertos)"
@@ -0,0 +1,64 @@
+"""
+Concatenação de áudios MP3 para João Macarrão.
+
+Um MP3 é uma sequência de quadros independentes, então trechos
+sintetizados separadamente podem ser unidos em ordem. Antes de unir são
+removidos as tags ID3 e o quadro Xing/Info de cada trecho: esse quadro
+informa a duração do trecho e faria o player mostrar a duração errada.
+"""
+
+
+# kbps por índice (Layer III); MPEG-2 e 2.5 compartilham a tabela
+BITRATES = {
+    'mpeg1': [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    'mpeg2': [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Hz por bits de versão do cabeçalho (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+def frame_length(header):
+    """Tamanho em bytes do quadro Layer III que começa em header, ou None"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = (header[1] >> 1) & 3
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    
+    bitrate = BITRATES['mpeg1' if version == 3 else 'mpeg2'][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 1
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+
+def strip_tags(data):
+    """Remove a tag ID3v2 do início e a ID3v1 do fim"""
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b'TAG':
+        data = data[:-128]
+    return data
+
+
+def strip_info_frame(data):
+    """Remove o quadro Xing/Info (metadados de duração) do início"""
+    length = frame_length(data[:4])
+    if length and (b'Xing' in data[:length] or b'Info' in data[:length]):
+        return data[length:]
+    return data
+
+
+def concat_mp3(parts):
+    """Une os trechos em um único MP3, na ordem"""
+    return b''.join(strip_info_frame(strip_tags(part)) for part in parts)
@@ -0,0 +1,147 @@
+"""
+Pré-síntese da narração do cardápio para João Macarrão.
+
+A narração de cada prato (o mesmo texto que o DishCard envia ao TTS) é
+sintetizada antes do primeiro ouvinte, em todos os idiomas de
+SUPPORTED_LANGUAGES. Chaves já presentes no cache são puladas sem
+chamar o sintetizador.
+
+- prewarm_menu_audio: comando para o cardápio inteiro (ex: após deploy)
+- ao salvar um prato disponível, a narração dele é agendada no pool do
+  motor após o commit (TTS_PREWARM_ON_SAVE)
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.core.models import Dish
+
+from .tts import SUPPORTED_LANGUAGES, TTSBusy, get_cache_key, get_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+def dish_narration(dish):
+    """Texto narrado para o prato (igual ao do DishCard no frontend)"""
+    return f'{dish.name}. {dish.description}. Preço: R$ {Decimal(dish.price):.2f}.'
+
+
+def narration_requests(dishes, languages=None, voice_genders=None):
+    """(texto, idioma, voz) de cada prato em cada idioma e voz"""
+    languages = languages or [language['code'] for language in SUPPORTED_LANGUAGES]
+    voice_genders = voice_genders or getattr(settings, 'TTS_PREWARM_VOICES', ['NEUTRAL'])
+    return [
+        (dish_narration(dish), language_code, voice_gender)
+        for dish in dishes
+        for language_code in languages
+        for voice_gender in voice_genders
+    ]
+
+
+def prewarm(requests, concurrency=None, engine=None):
+    """
+    Sintetiza os pedidos que ainda não estão no cache, com no máximo
+    `concurrency` sínteses em andamento (o restante do pool do motor
+    continua livre para os usuários). Uma narração dividida em frases
+    conta como uma síntese por frase.
+    
+    Returns:
+        resumo com total, já em cache, sintetizados, falhas e vazão
+    """
+    engine = engine or get_engine()
+    concurrency = concurrency or getattr(settings, 'TTS_PREWARM_CONCURRENCY', 2)
+    summary = {'total': len(requests), 'cached': 0, 'synthesized': 0, 'failed': 0, 'bytes': 0}
+    started = time.monotonic()
+    pending = {}
+    
+    def collect(done):
+        for future in done:
+            pending.pop(future)
+            try:
+                audio = future.result()
+            except Exception as e:
+                logger.warning('Pré-síntese da narração falhou: %s', e)
+                summary['failed'] += 1
+            else:
+                summary['synthesized'] += 1
+                summary['bytes'] += len(audio or b'')
+    
+    for text, language_code, voice_gender in requests:
+        if engine.cache.exists(get_cache_key(text, language_code, voice_gender)):
+            summary['cached'] += 1
+            continue
+        # Uma narração maior que o limite ainda roda, mas sozinha
+        jobs = min(engine.job_count(text), concurrency)
+        while pending and sum(pending.values()) + jobs > concurrency:
+            collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        try:
+            _, future = engine.submit(text, language_code, voice_gender, load=False)
+        except TTSBusy as e:
+            logger.warning('Pré-síntese da narração adiada: %s', e)
+            summary['failed'] += 1
+            continue
+        pending[future] = jobs
+    
+    collect(wait(pending).done)
+    
+    elapsed = time.monotonic() - started
+    summary['seconds'] = round(elapsed, 2)
+    summary['per_second'] = round(summary['synthesized'] / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+def prewarm_menu(dishes=None, languages=None, voice_genders=None, concurrency=None):
+    """Pré-sintetiza a narração dos pratos disponíveis (ou dos informados)"""
+    if dishes is None:
+        dishes = Dish.objects.filter(available=True).only('name', 'description', 'price')
+    return prewarm(narration_requests(dishes, languages, voice_genders), concurrency)
+
+
+def schedule_dish_prewarm(dish):
+    """
+    Agenda a narração do prato após o commit, sem aguardar a síntese.
+    Não faz nada se o TTS não estiver configurado.
+    """
+    if not dish.available:
+        return
+    requests = narration_requests([dish])
+    
+    def submit():
+        engine = get_engine()
+        if not engine.available:
+            return
+        for text, language_code, voice_gender in requests:
+            if engine.cache.exists(get_cache_key(text, language_code, voice_gender)):
+                continue
+            try:
+                engine.submit(text, language_code, voice_gender, load=False)
+            except TTSBusy:
+                logger.info('Pré-síntese do prato %s adiada: fila do TTS cheia', dish.pk)
+                return
+    
+    transaction.on_commit(submit)
+
+
+NARRATED_FIELDS = {'name', 'description', 'price', 'available'}
+
+
+def dish_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """
+    post_save de Dish: agenda a narração se o texto pode ter mudado.
+    
+    Saves só de estoque (pedidos, cancelamentos) não agendam nada. No
+    post_save o prato ainda guarda os valores carregados do banco, então
+    has_changed compara com o estado anterior ao save.
+    """
+    if raw or not getattr(settings, 'TTS_PREWARM_ON_SAVE', True):
+        return
+    if update_fields is not None and not NARRATED_FIELDS & set(update_fields):
+        return
+    if not created and not instance.has_changed(*NARRATED_FIELDS):
+        return
+    schedule_dish_prewarm(instance)
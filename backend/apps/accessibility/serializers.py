@@ -22,12 +22,19 @@ class TTSRequestSerializer(serializers.Serializer):
         default='NEUTRAL',
         help_text="Gênero da voz"
     )
+    response_mode = serializers.ChoiceField(
+        choices=['inline', 'url'],
+        required=False,
+        default='inline',
+        help_text="inline: áudio em base64 na resposta; url: apenas audio_url"
+    )
 
 
 class TTSResponseSerializer(serializers.Serializer):
     """Serializer para resposta de Text-to-Speech"""
     audio_content = serializers.CharField(
-        help_text="Conteúdo do áudio em base64"
+        required=False,
+        help_text="Conteúdo do áudio em base64 (modo inline)"
     )
     text = serializers.CharField(
         help_text="Texto original"
@@ -35,4 +42,7 @@ class TTSResponseSerializer(serializers.Serializer):
     cache_key = serializers.CharField(
         help_text="Chave para cache do áudio"
     )
+    audio_url = serializers.URLField(
+        help_text="URL do áudio (aceita Range e pode ser mantida em cache)"
+    )
 
@@ -1,3 +1,224 @@
-from django.test import TestCase
+"""
+Testes do Text-to-Speech com o sintetizador local (sem Google Cloud).
+João Macarrão - Acessibilidade
+"""
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from apps.core.models import Category, Dish
+
+from .cache import AudioCache
+from .mp3 import concat_mp3
+from .prewarm import dish_narration, narration_requests, prewarm
+from .tts import StubSynthesizer, TTSEngine, get_cache_key
+
+
+class CountingSynthesizer(StubSynthesizer):
+    """Stub que registra as frases sintetizadas e o pico de sínteses simultâneas"""
+    
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.texts = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+    
+    def synthesize(self, text, language_code='pt-BR', voice_gender='NEUTRAL'):
+        with self._lock:
+            self.texts.append(text)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.latency)
+            return super().synthesize(text, language_code, voice_gender)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class EngineTestMixin:
+    """Motor com cache em um diretório temporário"""
+    
+    def make_engine(self, latency=0.0, max_workers=8, chunking=True):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        with self.settings(TTS_CHUNKING=chunking):
+            engine = TTSEngine(CountingSynthesizer(latency), cache=AudioCache(root=root), max_workers=max_workers)
+        self.addCleanup(lambda: engine._executor and engine._executor.shutdown(wait=True))
+        return engine
+
+
+@override_settings(TTS_STUB_LATENCY=0)
+class ChunkedSynthesisTests(EngineTestMixin, TransactionTestCase):
+    
+    def test_chunked_audio_is_the_concatenation_of_its_sentences(self):
+        engine = self.make_engine()
+        
+        _, audio = engine.synthesize('Massa fresca com camarão. Preço: R$ 42.90.', timeout=5)
+        
+        self.assertEqual(sorted(engine.synthesizer.texts), ['Massa fresca com camarão.', 'Preço: R$ 42.90.'])
+        parts = [
+            engine.cache.lookup(get_cache_key(sentence, 'pt-BR', 'NEUTRAL'))[1]
+            for sentence in ['Massa fresca com camarão.', 'Preço: R$ 42.90.']
+        ]
+        self.assertEqual(audio, concat_mp3(parts))
+    
+    def test_sentences_shared_between_texts_are_synthesized_once(self):
+        engine = self.make_engine()
+        
+        engine.synthesize('Prato A. Preço: R$ 42.90.', timeout=5)
+        engine.synthesize('Prato B. Preço: R$ 42.90.', timeout=5)
+        
+        self.assertEqual(engine.synthesizer.texts.count('Preço: R$ 42.90.'), 1)
+    
+    def test_job_count(self):
+        self.assertEqual(self.make_engine().job_count('Uma. Duas.  Três.'), 3)
+        self.assertEqual(self.make_engine(chunking=False).job_count('Uma. Duas. Três.'), 1)
+
+
+@override_settings(TTS_STUB_LATENCY=0)
+class PrewarmTests(EngineTestMixin, TransactionTestCase):
+    
+    def test_cached_narrations_are_skipped(self):
+        engine = self.make_engine()
+        requests = [('Prato A. Massa.', 'pt-BR', 'NEUTRAL'), ('Prato B. Massa.', 'pt-BR', 'NEUTRAL')]
+        engine.synthesize(*requests[0], timeout=5)
+        
+        summary = prewarm(requests, concurrency=2, engine=engine)
+        
+        self.assertEqual(
+            (summary['total'], summary['cached'], summary['synthesized'], summary['failed']),
+            (2, 1, 1, 0)
+        )
+        self.assertTrue(engine.cache.exists(get_cache_key(*requests[1])))
+    
+    def test_concurrency_counts_sentence_jobs(self):
+        engine = self.make_engine(latency=0.05)
+        requests = [
+            (f'Prato {index}. Massa {index}. Molho {index}.', 'pt-BR', 'NEUTRAL')
+            for index in range(4)
+        ]
+        
+        summary = prewarm(requests, concurrency=3, engine=engine)
+        
+        self.assertEqual(summary['synthesized'], 4)
+        self.assertEqual(len(engine.synthesizer.texts), 12)
+        self.assertEqual(engine.synthesizer.peak, 3)
+    
+    def test_narration_larger_than_limit_still_runs(self):
+        engine = self.make_engine()
+        
+        summary = prewarm([('Uma. Duas. Três.', 'pt-BR', 'NEUTRAL')], concurrency=1, engine=engine)
+        
+        self.assertEqual(summary['synthesized'], 1)
+
+
+@override_settings(TTS_PREWARM_ON_SAVE=True)
+class DishSavedTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Massas')
+        cls.dish = Dish.objects.create(
+            name='Espaguete',
+            description='Molho de tomate',
+            price='32.00',
+            category=cls.category,
+            stock=10
+        )
+    
+    def save_dish(self, **changes):
+        dish = Dish.objects.get(pk=self.dish.pk)
+        for field, value in changes.items():
+            setattr(dish, field, value)
+        with mock.patch('apps.accessibility.prewarm.schedule_dish_prewarm') as schedule:
+            dish.save()
+        return schedule
+    
+    def test_stock_only_save_does_not_prewarm(self):
+        self.save_dish(stock=9).assert_not_called()
+        self.save_dish().assert_not_called()
+    
+    def test_narrated_field_change_prewarms(self):
+        for field, value in [('name', 'Espaguete ao sugo'), ('price', '35.00'), ('available', False)]:
+            with self.subTest(field=field):
+                self.save_dish(**{field: value}).assert_called_once()
+    
+    def test_update_fields_without_narrated_fields_does_not_prewarm(self):
+        dish = Dish.objects.get(pk=self.dish.pk)
+        dish.name = 'Espaguete ao sugo'
+        dish.stock = 5
+        with mock.patch('apps.accessibility.prewarm.schedule_dish_prewarm') as schedule:
+            dish.save(update_fields=['stock'])
+        schedule.assert_not_called()
+    
+    def test_new_dish_prewarms(self):
+        with mock.patch('apps.accessibility.prewarm.schedule_dish_prewarm') as schedule:
+            Dish.objects.create(name='Lasanha', description='Bolonhesa', price='40.00', category=self.category)
+        schedule.assert_called_once()
+    
+    def test_narration_requests_cover_languages_and_voices(self):
+        requests = narration_requests([self.dish], voice_genders=['NEUTRAL'])
+        
+        self.assertEqual([language for _, language, _ in requests], ['pt-BR', 'en-US', 'es-ES'])
+        self.assertEqual(requests[0][0], 'Espaguete. Molho de tomate. Preço: R$ 32.00.')
+        self.assertEqual(dish_narration(self.dish), requests[0][0])
+
+
+class AudioViewTests(TestCase):
+    
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=root, TTS_SYNTHESIZER='stub')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.audio = bytes(range(256)) * 4
+        self.cache_key = get_cache_key('Massa fresca.', 'pt-BR', 'NEUTRAL')
+        AudioCache().write(AudioCache().path_for(self.cache_key), self.audio)
+        self.url = reverse('accessibility:text-to-speech-audio', args=[self.cache_key])
+    
+    def test_full_response(self):
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.audio)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+    
+    def test_range_request(self):
+        cases = [
+            ('bytes=0-99', 0, 99),
+            ('bytes=1000-', 1000, 1023),
+            ('bytes=-24', 1000, 1023),
+            ('bytes=1000-5000', 1000, 1023),
+        ]
+        for header, start, end in cases:
+            with self.subTest(range=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/1024')
+                self.assertEqual(b''.join(response.streaming_content), self.audio[start:end + 1])
+    
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+    
+    def test_if_range_with_other_version_returns_full_audio(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-99', HTTP_IF_RANGE='"outra"')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.audio)
+    
+    def test_unknown_key(self):
+        url = reverse('accessibility:text-to-speech-audio', args=['0' * 32])
+        self.assertEqual(self.client.get(url).status_code, 404)
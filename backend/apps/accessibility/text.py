@@ -0,0 +1,55 @@
+"""
+Preparação do texto para o Text-to-Speech em João Macarrão.
+
+- normalize_text: remove diferenças que não mudam a fala (espaços,
+  aspas e travessões tipográficos, pontuação repetida) antes de calcular
+  a chave do cache, para que variações triviais do mesmo texto reusem
+  o mesmo áudio
+- split_text: divide o texto em trechos do tamanho de uma frase; cada
+  trecho tem sua própria chave, então frases repetidas entre textos
+  (ex: "Preço: R$ 42.90." em vários pratos) são sintetizadas uma vez
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+
+
+PUNCTUATION_MAP = str.maketrans({
+    '“': '"', '”': '"', '„': '"', '«': '"', '»': '"',
+    '‘': "'", '’': "'", '‚': "'",
+    '–': '-', '—': '-', '−': '-',
+    '…': '...',
+})
+
+WHITESPACE_RE = re.compile(r'\s+')
+SPACE_BEFORE_PUNCTUATION_RE = re.compile(r' +([,.;:!?])')
+REPEATED_PUNCTUATION_RE = re.compile(r'([!?,;:])\1+|\.{4,}')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?]) ')
+
+
+def normalize_text(text):
+    """Forma canônica do texto (a mesma fala gera sempre o mesmo texto)"""
+    text = unicodedata.normalize('NFC', text).translate(PUNCTUATION_MAP)
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    text = SPACE_BEFORE_PUNCTUATION_RE.sub(r'\1', text)
+    return REPEATED_PUNCTUATION_RE.sub(lambda match: match.group(0)[:1] if match.group(1) else '...', text)
+
+
+def split_text(text, max_chars=None):
+    """
+    Divide um texto normalizado em frases. Frases maiores que max_chars
+    são quebradas na última vírgula (ou espaço) antes do limite.
+    """
+    max_chars = max_chars or getattr(settings, 'TTS_CHUNK_MAX_CHARS', 300)
+    chunks = []
+    for sentence in SENTENCE_END_RE.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(', ', 0, max_chars) + 1 or sentence.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            chunks.append(sentence)
+    return chunks
@@ -0,0 +1,416 @@
+"""
+Motor de Text-to-Speech para João Macarrão.
+
+A síntese roda em um pool de threads limitado (TTS_MAX_WORKERS) com um
+único cliente do sintetizador por processo. Pedidos simultâneos para o
+mesmo texto (mesma get_cache_key) compartilham uma só síntese
+(single-flight): o primeiro agenda, os demais aguardam o mesmo Future.
+O áudio pronto fica no cache em disco (apps.accessibility.cache).
+
+Textos com mais de uma frase (TTS_CHUNKING) são sintetizados frase a
+frase, em paralelo no mesmo pool e com cache próprio por frase; quando
+todas terminam, os MP3 são unidos na ordem e gravados sob a chave do
+texto completo.
+
+Arquivos auxiliares no mesmo diretório permitem acompanhar a síntese de
+qualquer worker do gunicorn: <chave>.pending enquanto a síntese roda e
+<chave>.error se ela falhou.
+
+O sintetizador é escolhido por TTS_SYNTHESIZER:
+- 'google': Google Cloud Text-to-Speech (requer GOOGLE_APPLICATION_CREDENTIALS)
+- 'stub': áudio de silêncio local, para desenvolvimento e testes sem rede
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from .cache import CACHE_KEY_RE, AudioCache
+from .mp3 import concat_mp3
+from .text import normalize_text, split_text
+
+# Importação condicional do Google Cloud TTS
+try:
+    from google.cloud import texttospeech
+    GOOGLE_TTS_AVAILABLE = True
+except ImportError:
+    GOOGLE_TTS_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+
+# Idiomas e vozes oferecidos em /api/accessibility/config/
+SUPPORTED_LANGUAGES = [
+    {'code': 'pt-BR', 'name': 'Português (Brasil)'},
+    {'code': 'en-US', 'name': 'English (US)'},
+    {'code': 'es-ES', 'name': 'Español (España)'},
+]
+VOICE_GENDERS = ['NEUTRAL', 'MALE', 'FEMALE']
+
+
+class TTSUnavailable(Exception):
+    """Sintetizador não configurado"""
+
+
+class TTSBusy(Exception):
+    """Fila de síntese cheia (TTS_MAX_PENDING)"""
+
+
+def get_cache_key(text: str, language_code: str, voice_gender: str) -> str:
+    """
+    Gera uma chave única para cache baseada nos parâmetros.
+    O texto é normalizado antes (apps.accessibility.text).
+    """
+    content = f"{normalize_text(text)}_{language_code}_{voice_gender}"
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+class Synthesizer:
+    """
+    Sintetizador registrado em SYNTHESIZERS.
+    Subclasses implementam synthesize() e, opcionalmente, available.
+    """
+    
+    name = None
+    
+    @property
+    def available(self):
+        return True
+    
+    def synthesize(self, text, language_code='pt-BR', voice_gender='NEUTRAL'):
+        """Retorna o áudio MP3 em bytes"""
+        raise NotImplementedError
+
+
+class GoogleSynthesizer(Synthesizer):
+    """Google Cloud Text-to-Speech com um cliente gRPC por processo"""
+    
+    name = 'google'
+    
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def available(self):
+        return GOOGLE_TTS_AVAILABLE and bool(os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    
+    @property
+    def client(self):
+        """Cliente do Google TTS, criado uma única vez (é thread-safe)"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.available:
+                        raise TTSUnavailable('Google Cloud TTS não configurado')
+                    self._client = texttospeech.TextToSpeechClient()
+        return self._client
+    
+    def synthesize(self, text, language_code='pt-BR', voice_gender='NEUTRAL'):
+        gender_map = {
+            'NEUTRAL': texttospeech.SsmlVoiceGender.NEUTRAL,
+            'MALE': texttospeech.SsmlVoiceGender.MALE,
+            'FEMALE': texttospeech.SsmlVoiceGender.FEMALE,
+        }
+        
+        response = self.client.synthesize_speech(
+            input=texttospeech.SynthesisInput(text=text),
+            voice=texttospeech.VoiceSelectionParams(
+                language_code=language_code,
+                ssml_gender=gender_map.get(voice_gender, texttospeech.SsmlVoiceGender.NEUTRAL)
+            ),
+            audio_config=texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3
+            ),
+            timeout=getattr(settings, 'TTS_TIMEOUT', 15)
+        )
+        return response.audio_content
+
+
+# Quadro MPEG-1 Layer III de silêncio (32 kbps, 44,1 kHz, mono): 104 bytes, ~26 ms
+SILENT_MP3_FRAME = b'\xff\xfb\x10\xc4' + b'\x00' * 100
+SILENT_MP3_FRAME_SECONDS = 1152 / 44100
+
+
+class StubSynthesizer(Synthesizer):
+    """
+    Sintetizador local para desenvolvimento e testes (TTS_SYNTHESIZER=stub).
+    
+    Gera um MP3 de silêncio com a duração aproximada da leitura do texto
+    (~15 caracteres por segundo), após TTS_STUB_LATENCY segundos.
+    """
+    
+    name = 'stub'
+    
+    def synthesize(self, text, language_code='pt-BR', voice_gender='NEUTRAL'):
+        latency = getattr(settings, 'TTS_STUB_LATENCY', 0)
+        if latency:
+            time.sleep(latency)
+        frames = max(1, int(len(text) / 15 / SILENT_MP3_FRAME_SECONDS))
+        return SILENT_MP3_FRAME * frames
+
+
+SYNTHESIZERS = {
+    GoogleSynthesizer.name: GoogleSynthesizer,
+    StubSynthesizer.name: StubSynthesizer,
+}
+
+
+class TTSEngine:
+    """
+    Síntese com cache em disco, single-flight e pool de threads limitado.
+    
+    - submit: retorna (cache_key, Future) — do cache, de uma síntese em
+      andamento para a mesma chave, ou de uma nova síntese agendada
+    - synthesize: submit + espera pelo áudio
+    - status: estado de uma chave para o endpoint de acompanhamento
+    """
+    
+    def __init__(self, synthesizer, cache=None, max_workers=None, max_pending=None):
+        self.synthesizer = synthesizer
+        self.cache = cache or AudioCache()
+        self.max_workers = max_workers or getattr(settings, 'TTS_MAX_WORKERS', 4)
+        self.max_pending = max_pending or getattr(settings, 'TTS_MAX_PENDING', 100)
+        self.chunking = getattr(settings, 'TTS_CHUNKING', True)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._counters = {'hits': 0, 'coalesced': 0, 'synthesized': 0, 'chunked': 0, 'failed': 0}
+    
+    @property
+    def available(self):
+        return self.synthesizer.available
+    
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='tts'
+                    )
+        return self._executor
+    
+    def audio_path(self, cache_key):
+        """Caminho do áudio da chave no cache em disco, ou None"""
+        if not CACHE_KEY_RE.match(cache_key):
+            return None
+        path = self.cache.path_for(cache_key)
+        return path if path.exists() else None
+    
+    def submit(self, text, language_code='pt-BR', voice_gender='NEUTRAL', load=True):
+        """
+        Agenda (ou reaproveita) a síntese do texto.
+        
+        Com load=False um acerto no cache não lê o arquivo: o Future
+        resolve com None (para respostas que só devolvem a URL).
+        
+        Raises:
+            TTSUnavailable: sintetizador não configurado
+            TTSBusy: já há TTS_MAX_PENDING sínteses na fila
+        """
+        text = normalize_text(text)
+        cache_key = get_cache_key(text, language_code, voice_gender)
+        
+        hit, audio = self.cache.lookup(cache_key, load)
+        if not hit:
+            with self._lock:
+                future = self._inflight.get(cache_key)
+                if future is not None:
+                    self._counters['coalesced'] += 1
+                    return cache_key, future
+                
+                # Pode ter sido concluída entre a leitura do cache e o lock
+                finished = self.cache.exists(cache_key)
+                if not finished:
+                    if not self.available:
+                        raise TTSUnavailable('Sintetizador de voz não configurado')
+                    if len(self._inflight) >= self.max_pending:
+                        raise TTSBusy('Muitas sínteses de voz em andamento')
+                    future = self._inflight[cache_key] = Future()
+            
+            if finished:
+                return self.submit(text, language_code, voice_gender, load)
+        
+        if hit:
+            with self._lock:
+                self._counters['hits'] += 1
+            future = Future()
+            future.set_result(audio)
+            return cache_key, future
+        
+        self.cache.discard(self.cache.path_for(cache_key, '.error'))
+        self.cache.write(self.cache.path_for(cache_key, '.pending'), b'')
+        try:
+            chunks = split_text(text) if self.chunking else [text]
+            if len(chunks) > 1:
+                self._submit_chunks(cache_key, future, chunks, language_code, voice_gender)
+            else:
+                self.executor.submit(
+                    self._run, cache_key, future,
+                    lambda: self.synthesizer.synthesize(text, language_code, voice_gender)
+                )
+        except Exception as e:
+            self.cache.discard(self.cache.path_for(cache_key, '.pending'))
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            # Pedidos que já aguardavam esta chave recebem o mesmo erro
+            future.set_exception(e)
+            raise
+        return cache_key, future
+    
+    def job_count(self, text):
+        """Sínteses que submit() agenda no pool para o texto (uma por frase)"""
+        if not self.chunking:
+            return 1
+        return max(1, len(split_text(normalize_text(text))))
+    
+    def _submit_chunks(self, cache_key, future, chunks, language_code, voice_gender):
+        """
+        Agenda cada frase como uma síntese própria (com cache e
+        single-flight por frase) e a união dos trechos quando todas
+        terminarem. Nenhuma thread do pool fica parada esperando outra.
+        """
+        parts = [self.submit(chunk, language_code, voice_gender)[1] for chunk in chunks]
+        remaining = [len(parts)]
+        remaining_lock = threading.Lock()
+        
+        def combine():
+            return concat_mp3([part.result() for part in parts])
+        
+        def part_done(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                self.executor.submit(self._run, cache_key, future, combine)
+            except RuntimeError:
+                # Pool encerrado (reset_engine): une nesta thread mesmo
+                self._run(cache_key, future, combine)
+        
+        with self._lock:
+            self._counters['chunked'] += 1
+        for part in parts:
+            part.add_done_callback(part_done)
+    
+    def _run(self, cache_key, future, produce):
+        """Gera o áudio com produce() no pool, grava no cache e resolve o Future"""
+        error = audio = None
+        try:
+            audio = produce()
+            self.cache.store(cache_key, audio)
+        except Exception as e:
+            logger.warning('Síntese de voz %s falhou: %s', cache_key, e)
+            error = e
+            try:
+                self.cache.write(self.cache.path_for(cache_key, '.error'), str(e).encode())
+            except OSError:
+                pass
+        finally:
+            # O índice do cache é gravado nesta thread do pool
+            close_old_connections()
+        
+        self.cache.discard(self.cache.path_for(cache_key, '.pending'))
+        # Sai do inflight só depois de gravar: quem chegar agora lê do cache
+        with self._lock:
+            self._inflight.pop(cache_key, None)
+            self._counters['failed' if error else 'synthesized'] += 1
+        
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(audio)
+    
+    def synthesize(self, text, language_code='pt-BR', voice_gender='NEUTRAL', timeout=None):
+        """
+        Retorna (cache_key, áudio), aguardando a síntese.
+        
+        Raises:
+            concurrent.futures.TimeoutError: a síntese continua em segundo plano
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'TTS_TIMEOUT', 15)
+        cache_key, future = self.submit(text, language_code, voice_gender)
+        return cache_key, future.result(timeout=timeout)
+    
+    def status(self, cache_key, load=True):
+        """
+        Estado da chave: ('ready', áudio), ('pending', None),
+        ('failed', mensagem) ou (None, None) se desconhecida.
+        Com load=False o áudio pronto não é lido (('ready', None)).
+        """
+        if not CACHE_KEY_RE.match(cache_key):
+            return None, None
+        
+        # Acompanhamento não conta como acerto do cache
+        hit, audio = self.cache.lookup(cache_key, load, touch=False)
+        if hit:
+            return 'ready', audio
+        
+        with self._lock:
+            if cache_key in self._inflight:
+                return 'pending', None
+        
+        try:
+            return 'failed', self.cache.path_for(cache_key, '.error').read_text()
+        except FileNotFoundError:
+            pass
+        
+        # Síntese em outro processo; marcadores antigos são de um worker que caiu
+        pending = self.cache.path_for(cache_key, '.pending')
+        try:
+            age = time.time() - pending.stat().st_mtime
+        except FileNotFoundError:
+            return None, None
+        if age < 2 * getattr(settings, 'TTS_TIMEOUT', 15):
+            return 'pending', None
+        return None, None
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'synthesizer': self.synthesizer.name,
+                'available': self.available,
+                'inflight': len(self._inflight),
+                **self._counters
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Motor único deste processo, com o sintetizador de TTS_SYNTHESIZER"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                name = getattr(settings, 'TTS_SYNTHESIZER', 'google')
+                _engine = TTSEngine(SYNTHESIZERS[name]())
+    return _engine
+
+
+def reset_engine():
+    """Descarta o motor (novas sínteses usam os settings atuais)"""
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine is not None and engine._executor is not None:
+        engine._executor.shutdown(wait=False)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting.startswith('TTS_') or setting == 'MEDIA_ROOT':
+        reset_engine()
@@ -2,12 +2,19 @@
 URLs para funcionalidades de acessibilidade.
 """
 from django.urls import path
-from .views import text_to_speech_view, accessibility_config_view
+from .views import (
+    text_to_speech_view,
+    text_to_speech_status_view,
+    text_to_speech_audio_view,
+    accessibility_config_view,
+)
 
 app_name = 'accessibility'
 
 urlpatterns = [
     path('tts/', text_to_speech_view, name='text-to-speech'),
+    path('tts/<str:cache_key>/', text_to_speech_status_view, name='text-to-speech-status'),
+    path('tts/<str:cache_key>/audio/', text_to_speech_audio_view, name='text-to-speech-audio'),
     path('config/', accessibility_config_view, name='config'),
 ]
 
@@ -1,96 +1,54 @@
 """
 Views para funcionalidades de acessibilidade.
 """
-import os
-import hashlib
 import base64
-from pathlib import Path
+import os
+import re
+from concurrent.futures import TimeoutError as SynthesisTimeout
 from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import etag, require_safe
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from .serializers import TTSRequestSerializer, TTSResponseSerializer
+from .tts import SUPPORTED_LANGUAGES, VOICE_GENDERS, TTSBusy, TTSUnavailable, get_engine
 
-# Importação condicional do Google Cloud TTS
-try:
-    from google.cloud import texttospeech
-    GOOGLE_TTS_AVAILABLE = True
-except ImportError:
-    GOOGLE_TTS_AVAILABLE = False
 
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
 
-# Diretório para cache de áudios TTS
-TTS_CACHE_DIR = Path(settings.MEDIA_ROOT) / 'tts_cache'
-TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-
-def get_cache_key(text: str, language_code: str, voice_gender: str) -> str:
+def _audio_response(request, cache_key, audio_content=None, **extra):
     """
-    Gera uma chave única para cache baseada nos parâmetros.
+    Payload de áudio pronto (mesmo formato no POST e no acompanhamento).
+    audio_content só vai na resposta no modo 'inline'.
     """
-    content = f"{text}_{language_code}_{voice_gender}"
-    return hashlib.md5(content.encode()).hexdigest()
+    data = {**extra, 'cache_key': cache_key}
+    if audio_content is not None:
+        data['audio_content'] = base64.b64encode(audio_content).decode('utf-8')
+    data['audio_url'] = request.build_absolute_uri(
+        reverse('accessibility:text-to-speech-audio', args=[cache_key])
+    )
+    return data
 
 
-def synthesize_speech_google(text: str, language_code: str = 'pt-BR', 
-                             voice_gender: str = 'NEUTRAL') -> bytes:
-    """
-    Sintetiza fala usando Google Cloud Text-to-Speech API.
-    
-    Args:
-        text: Texto para sintetizar
-        language_code: Código do idioma (ex: 'pt-BR', 'en-US')
-        voice_gender: Gênero da voz ('NEUTRAL', 'MALE', 'FEMALE')
-    
-    Returns:
-        Conteúdo do áudio em bytes
-    """
-    if not GOOGLE_TTS_AVAILABLE:
-        raise ImportError("google-cloud-texttospeech não está instalado")
-    
-    # Instancia o cliente
-    client = texttospeech.TextToSpeechClient()
-    
-    # Define o input de texto
-    synthesis_input = texttospeech.SynthesisInput(text=text)
-    
-    # Mapeia o gênero da voz
-    gender_map = {
-        'NEUTRAL': texttospeech.SsmlVoiceGender.NEUTRAL,
-        'MALE': texttospeech.SsmlVoiceGender.MALE,
-        'FEMALE': texttospeech.SsmlVoiceGender.FEMALE,
-    }
-    
-    # Configura a voz
-    voice = texttospeech.VoiceSelectionParams(
-        language_code=language_code,
-        ssml_gender=gender_map.get(voice_gender, texttospeech.SsmlVoiceGender.NEUTRAL)
-    )
-    
-    # Configura o formato do áudio
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
+def _pending_response(request, cache_key, response_mode='inline'):
+    """Síntese em segundo plano: o cliente acompanha pela status_url"""
+    status_url = request.build_absolute_uri(
+        reverse('accessibility:text-to-speech-status', args=[cache_key])
     )
-    
-    # Realiza a requisição de síntese
-    response = client.synthesize_speech(
-        input=synthesis_input,
-        voice=voice,
-        audio_config=audio_config
+    if response_mode != 'inline':
+        status_url += f'?response_mode={response_mode}'
+    return Response(
+        {
+            'status': 'pending',
+            'cache_key': cache_key,
+            'status_url': status_url
+        },
+        status=status.HTTP_202_ACCEPTED
     )
-    
-    return response.audio_content
-
-
-def synthesize_speech_fallback(text: str) -> bytes:
-    """
-    Fallback simples quando Google TTS não está disponível.
-    Retorna um áudio de exemplo (silêncio) apenas para desenvolvimento.
-    """
-    # Este é apenas um placeholder - em produção você pode usar outra API
-    # ou retornar um erro apropriado
-    return b''
 
 
 @api_view(['POST'])
@@ -104,15 +62,21 @@ def text_to_speech_view(request):
     {
         "text": "Texto para converter em áudio",
         "language_code": "pt-BR",  # opcional
-        "voice_gender": "NEUTRAL"   # opcional (NEUTRAL, MALE, FEMALE)
+        "voice_gender": "NEUTRAL",  # opcional (NEUTRAL, MALE, FEMALE)
+        "response_mode": "inline"   # opcional (inline, url)
     }
     
-    Response:
+    Response (200):
     {
-        "audio_content": "base64_encoded_audio",
+        "audio_content": "base64_encoded_audio",  # só no modo inline
         "text": "Texto original",
-        "cache_key": "hash_do_cache"
+        "cache_key": "hash_do_cache",
+        "audio_url": "URL do MP3 (GET /api/accessibility/tts/<cache_key>/audio/)"
     }
+    
+    Textos com TTS_ASYNC_MIN_CHARS caracteres ou mais, e sínteses que
+    passam de TTS_TIMEOUT segundos, respondem 202 com a status_url
+    (GET /api/accessibility/tts/<cache_key>/) para acompanhar.
     """
     serializer = TTSRequestSerializer(data=request.data)
     
@@ -125,54 +89,167 @@ def text_to_speech_view(request):
     text = serializer.validated_data['text']
     language_code = serializer.validated_data.get('language_code', 'pt-BR')
     voice_gender = serializer.validated_data.get('voice_gender', 'NEUTRAL')
+    response_mode = serializer.validated_data.get('response_mode', 'inline')
+    
+    engine = get_engine()
+    async_min_chars = getattr(settings, 'TTS_ASYNC_MIN_CHARS', 0)
     
-    # Gera chave de cache
-    cache_key = get_cache_key(text, language_code, voice_gender)
-    cache_file = TTS_CACHE_DIR / f"{cache_key}.mp3"
+    try:
+        cache_key, future = engine.submit(
+            text, language_code, voice_gender,
+            load=response_mode == 'inline'
+        )
+        if async_min_chars and len(text) >= async_min_chars and not future.done():
+            return _pending_response(request, cache_key, response_mode)
+        audio_content = future.result(timeout=getattr(settings, 'TTS_TIMEOUT', 15))
+    except TTSUnavailable:
+        return Response(
+            {
+                "error": "Google Cloud TTS não configurado",
+                "detail": "Configure GOOGLE_APPLICATION_CREDENTIALS para usar TTS",
+                "fallback": True
+            },
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except TTSBusy as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '5'}
+        )
+    except SynthesisTimeout:
+        # A síntese continua no pool; a resposta sai pelo acompanhamento
+        return _pending_response(request, cache_key, response_mode)
+    except Exception as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
     
-    # Verifica se já existe no cache
-    if cache_file.exists():
-        with open(cache_file, 'rb') as f:
-            audio_content = f.read()
+    if response_mode != 'inline':
+        audio_content = None
+    return Response(
+        _audio_response(request, cache_key, audio_content, text=text),
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def text_to_speech_status_view(request, cache_key):
+    """
+    Acompanha uma síntese iniciada em segundo plano.
+    
+    GET /api/accessibility/tts/<cache_key>/?response_mode=inline|url
+    
+    - 200 {"status": "ready", "audio_url": ..., "audio_content": ...}
+    - 200 {"status": "failed", "error": ...}
+    - 202 {"status": "pending", "status_url": ...}
+    - 404 chave desconhecida
+    """
+    response_mode = request.query_params.get('response_mode', 'inline')
+    state, value = get_engine().status(cache_key, load=response_mode == 'inline')
+    
+    if state == 'ready':
+        return Response(_audio_response(request, cache_key, value, status='ready'))
+    if state == 'pending':
+        return _pending_response(request, cache_key, response_mode)
+    if state == 'failed':
+        return Response({'status': 'failed', 'cache_key': cache_key, 'error': value})
+    return Response(
+        {'error': 'Síntese não encontrada'},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
+def _byte_range(header, size):
+    """
+    Intervalo (início, fim inclusivo) de um cabeçalho Range de um trecho.
+    
+    Retorna None se não há Range utilizável (resposta completa) e levanta
+    ValueError se o intervalo está fora do arquivo (416).
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end:
+            raise ValueError(header)
     else:
-        # Sintetiza o áudio
+        # bytes=-N: últimos N bytes
+        if int(last) == 0:
+            raise ValueError(header)
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(f, start, end, chunk_size=64 * 1024):
+    try:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+@require_safe
+@etag(lambda request, cache_key: cache_key)
+def text_to_speech_audio_view(request, cache_key):
+    """
+    Serve o MP3 sintetizado.
+    GET /api/accessibility/tts/<cache_key>/audio/
+    
+    A chave é o hash do texto e da voz e o arquivo é gravado uma única vez,
+    então a resposta pode ser mantida em cache indefinidamente. Aceita
+    Range (206) para o player buscar só o trecho que precisa; a resposta
+    completa sai por FileResponse (sendfile no gunicorn).
+    """
+    path = get_engine().audio_path(cache_key)
+    if path is None:
+        raise Http404('Áudio não encontrado')
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        raise Http404('Áudio não encontrado')
+    size = os.fstat(f.fileno()).st_size
+    
+    byte_range = None
+    # If-Range com outra versão: devolve o arquivo inteiro
+    if request.META.get('HTTP_IF_RANGE', f'"{cache_key}"') == f'"{cache_key}"':
         try:
-            if GOOGLE_TTS_AVAILABLE and os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-                audio_content = synthesize_speech_google(
-                    text, language_code, voice_gender
-                )
-            else:
-                # Fallback ou modo de desenvolvimento
-                return Response(
-                    {
-                        "error": "Google Cloud TTS não configurado",
-                        "detail": "Configure GOOGLE_APPLICATION_CREDENTIALS para usar TTS",
-                        "fallback": True
-                    },
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE
-                )
-            
-            # Salva no cache
-            with open(cache_file, 'wb') as f:
-                f.write(audio_content)
-                
-        except Exception as e:
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-    
-    # Codifica em base64 para enviar na resposta
-    audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-    
-    response_data = {
-        'audio_content': audio_base64,
-        'text': text,
-        'cache_key': cache_key,
-        'audio_url': f"{settings.MEDIA_URL}tts_cache/{cache_key}.mp3"
-    }
+            byte_range = _byte_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            f.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    
+    if byte_range is None:
+        response = FileResponse(f, content_type='audio/mpeg')
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(f, start, end),
+            status=206,
+            content_type='audio/mpeg'
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
     
-    return Response(response_data, status=status.HTTP_200_OK)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
 @api_view(['GET'])
@@ -184,13 +261,9 @@ def accessibility_config_view(request):
     GET /api/accessibility/config/
     """
     config = {
-        'tts_enabled': GOOGLE_TTS_AVAILABLE and bool(os.getenv('GOOGLE_APPLICATION_CREDENTIALS')),
-        'supported_languages': [
-            {'code': 'pt-BR', 'name': 'Português (Brasil)'},
-            {'code': 'en-US', 'name': 'English (US)'},
-            {'code': 'es-ES', 'name': 'Español (España)'},
-        ],
-        'voice_genders': ['NEUTRAL', 'MALE', 'FEMALE'],
+        'tts_enabled': get_engine().available,
+        'supported_languages': SUPPORTED_LANGUAGES,
+        'voice_genders': VOICE_GENDERS,
         'features': {
             'text_to_speech': True,
             'high_contrast': True,
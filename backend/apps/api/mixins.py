@@ -0,0 +1,105 @@
+"""
+Mixins reutilizáveis para as views da API.
+João Macarrão - API
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Adiciona suporte a GET condicional (ETag / Last-Modified).
+    
+    Os validadores são calculados com um único aggregate sobre o queryset
+    da rota (maior updated_at e quantidade de linhas). Clientes que enviam
+    If-None-Match / If-Modified-Since recebem 304 antes da serialização.
+    
+    Atributos:
+    - conditional_timestamp_field: campo usado no Last-Modified
+    - conditional_extra_aggregates: agregações extras que entram no ETag
+      (ex: dados de relacionamentos exibidos no payload)
+    """
+    conditional_timestamp_field = 'updated_at'
+    conditional_extra_aggregates = {}
+    
+    def get_conditional_validators(self, queryset, extra_aggregates=None):
+        """
+        Retorna (etag, last_modified, count) para o queryset informado.
+        """
+        if extra_aggregates is None:
+            extra_aggregates = self.conditional_extra_aggregates
+        aggregates = {
+            'last_modified': Max(self.conditional_timestamp_field),
+            'count': Count('pk', distinct=True),
+            **extra_aggregates
+        }
+        values = queryset.order_by().aggregate(**aggregates)
+        
+        # Respostas variam por rota, query string e usuário
+        user_id = getattr(self.request.user, 'pk', None)
+        parts = [
+            self.__class__.__name__,
+            str(self.action),
+            self.request.get_full_path(),
+            str(user_id)
+        ]
+        parts += [f'{key}={values[key]}' for key in sorted(values)]
+        etag = quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+        
+        return etag, values['last_modified'], values['count']
+    
+    def conditional_response(self, queryset, build, require_rows=False,
+                             extra_aggregates=None):
+        """
+        Responde 304 se os validadores do cliente ainda forem válidos;
+        caso contrário executa build() e anexa ETag/Last-Modified.
+        
+        require_rows: para rotas de detalhe, queryset vazio segue para
+        build() (que retorna 404).
+        extra_aggregates: substitui conditional_extra_aggregates nesta rota.
+        """
+        etag, last_modified, count = self.get_conditional_validators(
+            queryset, extra_aggregates
+        )
+        
+        if require_rows and not count:
+            return build()
+        
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is None:
+            response = build()
+        
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+        
+        return response
+    
+    def get_detail_queryset(self):
+        """Queryset filtrado pelo lookup da rota de detalhe"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_queryset(),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            require_rows=True
+        )
@@ -0,0 +1,68 @@
+"""
+Paginação da API.
+João Macarrão - API
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) em (-created_at, -id).
+    
+    Cada página é um WHERE created_at < cursor ... LIMIT, sem COUNT(*) nem
+    OFFSET, e novas linhas inseridas não deslocam as páginas seguintes.
+    O parâmetro ?ordering é ignorado neste modo.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Paginação por número de página (padrão) com cursor opcional.
+    
+    O modo cursor é ativado com ?pagination=cursor (primeira página) ou
+    pela presença de ?cursor=... (links next/previous). A resposta traz
+    next/previous/results, sem count.
+    """
+    cursor_class = CreatedAtCursorPagination
+    
+    def __init__(self):
+        self.cursor_paginator = None
+    
+    def use_cursor(self, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or self.cursor_class.cursor_query_param in params
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_class()
+            self.cursor_paginator.page_size = self.page_size
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+    
+    def get_next_link(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_next_link()
+        return super().get_next_link()
+    
+    def get_previous_link(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_previous_link()
+        return super().get_previous_link()
+    
+    def get_schema_operation_parameters(self, view):
+        return (
+            super().get_schema_operation_parameters(view) +
+            self.cursor_class().get_schema_operation_parameters(view)
+        )
@@ -26,6 +26,19 @@ class IsAtendenteOrAdmin(permissions.BasePermission):
         )
 
 
+class IsStaffMember(permissions.BasePermission):
+    """
+    Permissão restrita a atendentes e admins, inclusive para leitura.
+    """
+    message = "Você precisa ser atendente ou administrador para acessar este recurso."
+    
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+        
+        return request.user.is_atendente() or request.user.is_admin()
+
+
 class IsAtendenteOrAdminOrReadOnly(permissions.BasePermission):
     """
     Permissão que permite:
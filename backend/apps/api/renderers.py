@@ -0,0 +1,45 @@
+"""
+Renderers adicionais da API.
+João Macarrão - API
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Permite negociar text/event-stream (Server-Sent Events).
+    O stream em si é uma StreamingHttpResponse; este renderer só é usado
+    para respostas de erro (401/403), serializadas como JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON (?format=ndjson): um objeto JSON por linha.
+    Views de exportação devolvem uma StreamingHttpResponse usando
+    render_line; render cobre respostas comuns (listas e erros).
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+    
+    @staticmethod
+    def render_line(item):
+        return json.dumps(item, cls=JSONEncoder, ensure_ascii=False) + '\n'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return ''.join(self.render_line(item) for item in items).encode(self.charset)
@@ -4,7 +4,7 @@ João Macarrão - Sistema de Pedidos
 """
 from rest_framework import serializers
 from apps.core.models import Order, OrderItem, Dish
-from decimal import Decimal
+from apps.core.services import OrderPlacementService, OrderPlacementError
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -40,31 +40,59 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return value
 
 
+class OrderItemCreateListSerializer(serializers.ListSerializer):
+    """
+    Validação em lote dos itens do pedido.
+    Resolve todos os pratos com um único in_bulk para devolver os erros
+    por item antes do create (que relê os pratos travados na transação).
+    """
+    
+    def to_internal_value(self, data):
+        """
+        Valida existência, disponibilidade e estoque de todos os itens.
+        Erros são retornados por item, no mesmo formato da validação de campos.
+        """
+        attrs = super().to_internal_value(data)
+        
+        dish_ids = {item['dish_id'] for item in attrs}
+        dishes = Dish.objects.in_bulk(dish_ids)
+        
+        # Quantidade total por prato (o mesmo prato pode vir em mais de um item)
+        quantities = {}
+        for item in attrs:
+            quantities[item['dish_id']] = quantities.get(item['dish_id'], 0) + item['quantity']
+        
+        errors = []
+        for item in attrs:
+            dish = dishes.get(item['dish_id'])
+            if dish is None:
+                errors.append({'dish_id': ["Prato não encontrado."]})
+            elif not dish.available:
+                errors.append({'dish_id': [f"O prato '{dish.name}' não está disponível."]})
+            elif dish.stock < quantities[dish.id]:
+                errors.append({'quantity': [
+                    f"Estoque insuficiente para {dish.name}. Disponível: {dish.stock}"
+                ]})
+            else:
+                errors.append({})
+        
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        
+        return attrs
+
+
 class OrderItemCreateSerializer(serializers.Serializer):
     """
     Serializer simplificado para criação de itens.
+    Pratos são validados em lote por OrderItemCreateListSerializer.
     """
     dish_id = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1, default=1)
     notes = serializers.CharField(required=False, allow_blank=True)
     
-    def validate_dish_id(self, value):
-        """Valida se o prato existe e está disponível"""
-        try:
-            dish = Dish.objects.get(id=value)
-            if not dish.available:
-                raise serializers.ValidationError(
-                    f"O prato '{dish.name}' não está disponível."
-                )
-            if dish.stock <= 0:
-                raise serializers.ValidationError(
-                    f"O prato '{dish.name}' está sem estoque."
-                )
-            return value
-        except Dish.DoesNotExist:
-            raise serializers.ValidationError(
-                "Prato não encontrado."
-            )
+    class Meta:
+        list_serializer_class = OrderItemCreateListSerializer
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -150,45 +178,21 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        """Cria pedido com seus itens"""
+        """
+        Cria pedido com seus itens em uma única transação.
+        Estoque é reservado via OrderPlacementService.
+        """
         items_data = validated_data.pop('items')
+        user = validated_data.pop('user')
         
-        # Cria o pedido
-        order = Order.objects.create(**validated_data)
-        
-        # Cria os itens
-        subtotal = Decimal('0.00')
-        for item_data in items_data:
-            dish = Dish.objects.get(id=item_data['dish_id'])
-            
-            # Verifica estoque
-            if dish.stock < item_data['quantity']:
-                order.delete()
-                raise serializers.ValidationError({
-                    'items': f"Estoque insuficiente para {dish.name}. Disponível: {dish.stock}"
-                })
-            
-            # Cria item do pedido
-            order_item = OrderItem.objects.create(
-                order=order,
-                dish=dish,
-                quantity=item_data['quantity'],
-                unit_price=dish.price,
-                notes=item_data.get('notes', '')
+        try:
+            return OrderPlacementService.place_order(
+                user,
+                items_data,
+                **validated_data
             )
-            
-            subtotal += order_item.subtotal
-            
-            # Atualiza estoque
-            dish.stock -= item_data['quantity']
-            dish.save()
-        
-        # Atualiza totais do pedido
-        order.subtotal = subtotal
-        order.total = subtotal + order.delivery_fee
-        order.save()
-        
-        return order
+        except OrderPlacementError as e:
+            raise serializers.ValidationError({'items': e.errors})
 
 
 class OrderListSerializer(serializers.ModelSerializer):
@@ -0,0 +1,228 @@
+"""
+Testes da API de pedidos.
+João Macarrão - API
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.api.serializers.order_serializers import OrderItemCreateListSerializer
+from apps.core.events import ORDER_CREATED, DatabaseEventBackend
+from apps.core.menu_cache import menu_cache
+from apps.core.models import Category, Dish, Order, OrderEvent, User
+
+
+class OrderQueryCountTests(APITestCase):
+    """
+    Criação e listagem de pedidos usam um número constante de queries,
+    independente da quantidade de itens ou de pedidos por página.
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cliente',
+            email='cliente@joaomacarrao.com',
+            password='senha-segura-123'
+        )
+        cls.staff = User.objects.create_user(
+            username='atendente',
+            email='atendente@joaomacarrao.com',
+            password='senha-segura-123',
+            role='atendente'
+        )
+        category = Category.objects.create(name='Massas')
+        cls.dishes = [
+            Dish.objects.create(
+                name=f'Prato {index}',
+                description='Massa artesanal',
+                price='25.00',
+                category=category,
+                stock=100
+            )
+            for index in range(10)
+        ]
+    
+    def create_order(self, dishes):
+        payload = {
+            'payment_method': 'pix',
+            'delivery_address': 'Rua das Massas, 10',
+            'items': [{'dish_id': dish.id, 'quantity': 2} for dish in dishes]
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return len(queries)
+    
+    def list_orders(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+    
+    def test_create_order_query_count_independent_of_items(self):
+        self.client.force_authenticate(self.user)
+        
+        single_item = self.create_order(self.dishes[:1])
+        ten_items = self.create_order(self.dishes)
+        
+        self.assertEqual(single_item, ten_items)
+        self.assertEqual(Order.objects.get(items__dish=self.dishes[-1]).items.count(), 10)
+    
+    def test_order_lists_query_count_independent_of_page_size(self):
+        self.client.force_authenticate(self.staff)
+        self.create_order(self.dishes[:3])
+        
+        urls = ['/api/orders/', '/api/orders/my_orders/', '/api/orders/pending/']
+        few = {url: self.list_orders(url) for url in urls}
+        for _ in range(9):
+            self.create_order(self.dishes[:3])
+        many = {url: self.list_orders(url) for url in urls}
+        
+        self.assertEqual(few, many)
+
+
+class MenuStockCacheTests(APITestCase):
+    """O estoque sobreposto ao cardápio não fica preso a valores antigos"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Massas')
+        cls.dish = Dish.objects.create(
+            name='Nhoque',
+            description='Molho pomodoro',
+            price='30.00',
+            category=category,
+            stock=10
+        )
+    
+    def setUp(self):
+        menu_cache.backend.clear()
+        self.addCleanup(menu_cache.backend.clear)
+    
+    def dish_row(self):
+        response = self.client.get('/api/menu/dishes/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        return next(row for row in rows if row['id'] == self.dish.id)
+    
+    def test_rebuilt_payload_overwrites_stale_stock(self):
+        # Estoque publicado por outro worker ou alterado sem passar pelo cache
+        menu_cache.set_stocks({self.dish.id: 0})
+        Dish.objects.filter(pk=self.dish.pk).update(stock=7)
+        menu_cache.bump_version()
+        
+        row = self.dish_row()
+        
+        self.assertEqual(row['stock'], 7)
+        self.assertTrue(row['is_available'])
+        self.assertEqual(menu_cache.get_stocks([self.dish.id]), {self.dish.id: 7})
+    
+    def test_stock_keys_expire_with_menu_timeout(self):
+        with mock.patch.object(type(menu_cache.backend), 'set_many') as set_many:
+            menu_cache.set_stocks({self.dish.id: 3})
+        
+        self.assertEqual(set_many.call_args.kwargs['timeout'], menu_cache.timeout)
+
+
+class OrderPlacementRaceTests(APITestCase):
+    """Mudanças no prato entre a validação e o commit valem para o pedido"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cliente',
+            email='cliente@joaomacarrao.com',
+            password='senha-segura-123'
+        )
+        category = Category.objects.create(name='Massas')
+        cls.dish = Dish.objects.create(
+            name='Ravioli',
+            description='Recheio de ricota',
+            price='28.00',
+            category=category,
+            stock=10
+        )
+    
+    def place_order_after_validation(self, **changes):
+        """Aplica as mudanças no prato logo depois da validação dos itens"""
+        validate = OrderItemCreateListSerializer.to_internal_value
+        
+        def validate_then_change(serializer, data):
+            attrs = validate(serializer, data)
+            Dish.objects.filter(pk=self.dish.pk).update(**changes)
+            return attrs
+        
+        self.client.force_authenticate(self.user)
+        payload = {
+            'payment_method': 'pix',
+            'delivery_address': 'Rua das Massas, 10',
+            'items': [{'dish_id': self.dish.id, 'quantity': 2}]
+        }
+        with mock.patch.object(OrderItemCreateListSerializer, 'to_internal_value', validate_then_change):
+            return self.client.post('/api/orders/', payload, format='json')
+    
+    def test_dish_deactivated_after_validation_is_rejected(self):
+        response = self.place_order_after_validation(available=False)
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('não está disponível', str(response.data['items']))
+        self.assertFalse(Order.objects.exists())
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.stock, 10)
+    
+    def test_price_is_read_from_locked_rows(self):
+        response = self.place_order_after_validation(price='30.00')
+        
+        self.assertEqual(response.status_code, 201, response.data)
+        item = Order.objects.get().items.get()
+        self.assertEqual((item.unit_price, item.subtotal), (Decimal('30.00'), Decimal('60.00')))
+
+
+class DatabaseEventBackendTests(TestCase):
+    """Leitura do log de eventos com ids confirmados fora de ordem"""
+    
+    def setUp(self):
+        self.backend = DatabaseEventBackend(max_events=2, prune_every=3, settle_seconds=5)
+    
+    def add_event(self, event_id, age=0):
+        OrderEvent.objects.create(id=event_id, type=ORDER_CREATED, payload={'type': ORDER_CREATED})
+        if age:
+            OrderEvent.objects.filter(id=event_id).update(created_at=timezone.now() - timedelta(seconds=age))
+    
+    def event_ids(self, last_id):
+        events, gap = self.backend.events_since(last_id)
+        return [event['id'] for event in events], gap
+    
+    def test_missing_id_holds_back_recent_events(self):
+        self.add_event(1)
+        self.add_event(3)
+        
+        # O id 2 pode ser um INSERT que ainda não foi confirmado
+        self.assertEqual(self.event_ids(1), ([], False))
+        self.assertEqual(self.backend.latest_id(), 1)
+        
+        self.add_event(2)
+        self.assertEqual(self.event_ids(1), ([2, 3], False))
+        self.assertEqual(self.backend.latest_id(), 3)
+    
+    def test_missing_id_is_skipped_after_settle_window(self):
+        self.add_event(1, age=10)
+        self.add_event(3, age=10)
+        
+        self.assertEqual(self.event_ids(1), ([3], False))
+        self.assertEqual(self.backend.latest_id(), 3)
+    
+    def test_prunes_by_publish_count(self):
+        self.add_event(1)
+        for _ in range(3):
+            self.backend.publish({'type': ORDER_CREATED})
+        
+        self.assertEqual(list(OrderEvent.objects.values_list('id', flat=True)), [3, 4])
+        self.assertEqual(self.event_ids(1), ([3, 4], True))
@@ -9,8 +9,12 @@ from django.db.models import Count, Sum, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
 
-from apps.core.models import Order, Dish, User
+from apps.core.models import Order, Dish, User, OrderDailyRollup
+from apps.core.menu_cache import menu_cache
+from apps.core.stats import conditional_counts, count_if
 from apps.payments.models import Payment
+from apps.payments.gateways import gateway_stats
+from apps.payments.webhooks import webhook_metrics
 from apps.contact.models import ContactMessage
 from apps.reviews.models import DishReview
 
@@ -22,148 +26,130 @@ def admin_stats(request):
     Retorna estatísticas gerais para o painel administrativo.
     GET /api/admin/stats/
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     
-    # Estatísticas de Pedidos
-    orders_total = Order.objects.count()
-    orders_today = Order.objects.filter(created_at__date=today).count()
-    orders_week = Order.objects.filter(created_at__date__gte=week_ago).count()
-    orders_pending = Order.objects.filter(status='pending').count()
-    orders_in_progress = Order.objects.filter(
-        status__in=['confirmed', 'preparing', 'ready', 'delivering']
-    ).count()
-    
-    # Estatísticas de Vendas
-    sales_stats = Order.objects.filter(
-        payment_status='paid'
-    ).aggregate(
-        total=Sum('total'),
-        count=Count('id'),
-        average=Avg('total')
+    # Totais de pedidos e vendas a partir do agregado diário
+    rollup_totals = OrderDailyRollup.objects.aggregate(
+        orders_total=Sum('orders_count'),
+        orders_today=Sum('orders_count', filter=Q(date=today)),
+        orders_week=Sum('orders_count', filter=Q(date__gte=week_ago)),
+        sales_total=Sum('revenue'),
+        sales_count=Sum('paid_orders_count'),
+        sales_today=Sum('revenue', filter=Q(date=today)),
+        sales_week=Sum('revenue', filter=Q(date__gte=week_ago)),
+        sales_month=Sum('revenue', filter=Q(date__gte=month_ago))
+    )
+    sales_count = rollup_totals['sales_count'] or 0
+    sales_average = (rollup_totals['sales_total'] or 0) / sales_count if sales_count else 0
+    
+    # Fila atual de pedidos (estado corrente, não histórico)
+    orders_queue = conditional_counts(
+        Order.objects.all(),
+        pending=count_if(status='pending'),
+        in_progress=count_if(
+            status__in=['confirmed', 'preparing', 'ready', 'delivering']
+        )
     )
     
-    sales_today = Order.objects.filter(
-        payment_status='paid',
-        created_at__date=today
-    ).aggregate(total=Sum('total'))
-    
-    sales_week = Order.objects.filter(
-        payment_status='paid',
-        created_at__date__gte=week_ago
-    ).aggregate(total=Sum('total'))
-    
-    sales_month = Order.objects.filter(
-        payment_status='paid',
-        created_at__date__gte=month_ago
-    ).aggregate(total=Sum('total'))
-    
-    # Estatísticas de Pagamentos
-    payments_completed = Payment.objects.filter(status='completed').count()
-    payments_pending = Payment.objects.filter(status='pending').count()
-    payments_failed = Payment.objects.filter(status='failed').count()
-    
-    # Estatísticas de Usuários
-    users_total = User.objects.count()
-    users_clients = User.objects.filter(role='cliente').count()
-    users_staff = User.objects.filter(Q(is_staff=True) | Q(role='atendente')).count()
-    users_new_week = User.objects.filter(date_joined__gte=timezone.now() - timedelta(days=7)).count()
-    
-    # Estatísticas de Pratos
-    dishes_total = Dish.objects.count()
-    dishes_available = Dish.objects.filter(available=True).count()
-    dishes_out_of_stock = Dish.objects.filter(stock=0).count()
+    # Demais contadores: um aggregate condicional por modelo
+    now = timezone.now()
+    payments = conditional_counts(
+        Payment.objects.all(),
+        completed=count_if(status='completed'),
+        pending=count_if(status='pending'),
+        failed=count_if(status='failed')
+    )
+    users = conditional_counts(
+        User.objects.all(),
+        total=Count('pk'),
+        clients=count_if(role='cliente'),
+        staff=count_if(Q(is_staff=True) | Q(role='atendente')),
+        new_week=count_if(date_joined__gte=now - timedelta(days=7))
+    )
+    dishes = conditional_counts(
+        Dish.objects.all(),
+        total=Count('pk'),
+        available=count_if(available=True),
+        out_of_stock=count_if(stock=0)
+    )
     dishes_top_rated = Dish.objects.filter(
         average_rating__gt=0
     ).order_by('-average_rating')[:5].values('id', 'name', 'average_rating', 'reviews_count')
-    
-    # Estatísticas de Mensagens de Contato
-    messages_total = ContactMessage.objects.count()
-    messages_pending = ContactMessage.objects.filter(status='pending').count()
-    messages_replied = ContactMessage.objects.filter(status='replied').count()
-    messages_new_today = ContactMessage.objects.filter(created_at__date=today).count()
-    
-    # Estatísticas de Avaliações
-    reviews_total = DishReview.objects.count()
-    reviews_pending = DishReview.objects.filter(is_approved=False).count()
-    reviews_average = DishReview.objects.filter(is_approved=True).aggregate(
-        avg=Avg('rating')
+    messages = conditional_counts(
+        ContactMessage.objects.all(),
+        total=Count('pk'),
+        pending=count_if(status='pending'),
+        replied=count_if(status='replied'),
+        new_today=count_if(created_at__date=today)
+    )
+    reviews = conditional_counts(
+        DishReview.objects.all(),
+        total=Count('pk'),
+        pending=count_if(is_approved=False),
+        average=Avg('rating', filter=Q(is_approved=True)),
+        new_week=count_if(created_at__gte=now - timedelta(days=7))
     )
-    reviews_new_week = DishReview.objects.filter(created_at__gte=timezone.now() - timedelta(days=7)).count()
     
-    # Gráfico de pedidos por dia (últimos 7 dias)
+    # Gráficos dos últimos 7 dias (uma linha do agregado por dia)
+    chart_start = today - timedelta(days=6)
+    rollups_by_day = {
+        rollup['date']: rollup
+        for rollup in OrderDailyRollup.objects.filter(
+            date__gte=chart_start
+        ).values('date', 'orders_count', 'revenue')
+    }
     orders_by_day = []
+    sales_by_day = []
     for i in range(6, -1, -1):
         day = today - timedelta(days=i)
-        count = Order.objects.filter(created_at__date=day).count()
+        rollup = rollups_by_day.get(day, {})
         orders_by_day.append({
             'date': day.strftime('%Y-%m-%d'),
-            'count': count
+            'count': rollup.get('orders_count', 0)
         })
-    
-    # Gráfico de vendas por dia (últimos 7 dias)
-    sales_by_day = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        total = Order.objects.filter(
-            created_at__date=day,
-            payment_status='paid'
-        ).aggregate(total=Sum('total'))
         sales_by_day.append({
             'date': day.strftime('%Y-%m-%d'),
-            'total': float(total['total'] or 0)
+            'total': float(rollup.get('revenue') or 0)
         })
     
     return Response({
         'orders': {
-            'total': orders_total,
-            'today': orders_today,
-            'week': orders_week,
-            'pending': orders_pending,
-            'in_progress': orders_in_progress
+            'total': rollup_totals['orders_total'] or 0,
+            'today': rollup_totals['orders_today'] or 0,
+            'week': rollup_totals['orders_week'] or 0,
+            'pending': orders_queue['pending'],
+            'in_progress': orders_queue['in_progress']
         },
         'sales': {
-            'total': float(sales_stats['total'] or 0),
-            'count': sales_stats['count'],
-            'average': float(sales_stats['average'] or 0),
-            'today': float(sales_today['total'] or 0),
-            'week': float(sales_week['total'] or 0),
-            'month': float(sales_month['total'] or 0)
+            'total': float(rollup_totals['sales_total'] or 0),
+            'count': sales_count,
+            'average': float(sales_average),
+            'today': float(rollup_totals['sales_today'] or 0),
+            'week': float(rollup_totals['sales_week'] or 0),
+            'month': float(rollup_totals['sales_month'] or 0)
         },
         'payments': {
-            'completed': payments_completed,
-            'pending': payments_pending,
-            'failed': payments_failed
-        },
-        'users': {
-            'total': users_total,
-            'clients': users_clients,
-            'staff': users_staff,
-            'new_week': users_new_week
+            **payments,
+            'webhooks': webhook_metrics(),
+            'gateways': gateway_stats()
         },
+        'users': users,
         'dishes': {
-            'total': dishes_total,
-            'available': dishes_available,
-            'out_of_stock': dishes_out_of_stock,
+            **dishes,
             'top_rated': list(dishes_top_rated)
         },
-        'messages': {
-            'total': messages_total,
-            'pending': messages_pending,
-            'replied': messages_replied,
-            'new_today': messages_new_today
-        },
+        'messages': messages,
         'reviews': {
-            'total': reviews_total,
-            'pending': reviews_pending,
-            'average': round(reviews_average['avg'] or 0, 2),
-            'new_week': reviews_new_week
+            **reviews,
+            'average': round(reviews['average'] or 0, 2)
         },
         'charts': {
             'orders_by_day': orders_by_day,
             'sales_by_day': sales_by_day
-        }
+        },
+        'menu_cache': menu_cache.stats()
     })
 
 
@@ -174,10 +160,11 @@ def admin_dashboard_summary(request):
     Retorna resumo rápido para dashboard.
     GET /api/admin/dashboard/
     """
-    pending_orders = Order.objects.filter(status='pending').count()
-    pending_messages = ContactMessage.objects.filter(status='pending').count()
-    pending_reviews = DishReview.objects.filter(is_approved=False).count()
-    low_stock_dishes = Dish.objects.filter(stock__lte=5, available=True).count()
+    # Alertas: contadores condicionais, como em admin_stats
+    orders = conditional_counts(Order.objects.all(), pending=count_if(status='pending'))
+    messages = conditional_counts(ContactMessage.objects.all(), pending=count_if(status='pending'))
+    reviews = conditional_counts(DishReview.objects.all(), pending=count_if(is_approved=False))
+    dishes = conditional_counts(Dish.objects.all(), low_stock=count_if(stock__lte=5, available=True))
     
     recent_orders = Order.objects.select_related('user').order_by('-created_at')[:5].values(
         'id', 'user__username', 'total', 'status', 'created_at'
@@ -187,12 +174,20 @@ def admin_dashboard_summary(request):
         'id', 'name', 'subject', 'status', 'created_at'
     )
     
+    today_rollup = OrderDailyRollup.objects.filter(date=timezone.localdate()).first()
+    
     return Response({
         'alerts': {
-            'pending_orders': pending_orders,
-            'pending_messages': pending_messages,
-            'pending_reviews': pending_reviews,
-            'low_stock_dishes': low_stock_dishes
+            'pending_orders': orders['pending'],
+            'pending_messages': messages['pending'],
+            'pending_reviews': reviews['pending'],
+            'low_stock_dishes': dishes['low_stock']
+        },
+        'today': {
+            'orders': today_rollup.orders_count if today_rollup else 0,
+            'paid_orders': today_rollup.paid_orders_count if today_rollup else 0,
+            'revenue': float(today_rollup.revenue) if today_rollup else 0.0,
+            'cancelled': today_rollup.cancelled_count if today_rollup else 0
         },
         'recent_orders': list(recent_orders),
         'recent_messages': list(recent_messages)
@@ -2,22 +2,85 @@
 Views para cardápio (categorias e pratos).
 João Macarrão - Sistema de Cardápio
 """
-from rest_framework import viewsets, filters
+import hashlib
+
+from rest_framework import viewsets, filters, mixins
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 
 from apps.core.models import Category, Dish
+from apps.core.menu_cache import menu_cache
 from ..serializers.menu_serializers import (
     CategorySerializer,
     DishSerializer,
     DishListSerializer
 )
 from ..permissions import IsAtendenteOrAdminOrReadOnly
+from ..mixins import ConditionalGetMixin
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class MenuCacheMixin:
+    """
+    Serve as listagens públicas do cardápio a partir do cache versionado.
+    O payload serializado é guardado por escopo + query string e
+    invalidado quando a versão do cardápio muda.
+    
+    A chave já inclui a versão do cardápio e o estoque vem do cache
+    (menu_cache.get_stocks), então o ETag é derivado dos dois: o 304 e os
+    acertos do cache não consultam o banco.
+    """
+    
+    def cached_menu_response(self, scope, build):
+        """
+        Retorna o payload em cache para o escopo ou o constrói com build().
+        Responde 304 se o cliente já tem o payload da versão atual.
+        """
+        key = menu_cache.make_key(scope, self.request)
+        data = menu_cache.get(key)
+        cache_status = 'HIT'
+        
+        if data is None:
+            data = build()
+            menu_cache.set(key, data)
+            menu_cache.set_stocks({row['id']: row['stock'] for row in self._menu_rows(data)})
+            cache_status = 'MISS'
+        
+        stocks = self._apply_stocks(data)
+        etag = quote_etag(hashlib.md5(f'{key}|{sorted(stocks.items())}'.encode()).hexdigest())
+        response = get_conditional_response(self.request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+            return response
+        
+        response = Response(data)
+        response['ETag'] = etag
+        response['X-Menu-Cache'] = cache_status
+        return response
+    
+    @staticmethod
+    def _menu_rows(data):
+        """Pratos do payload (lista, página ou pratos da categoria)"""
+        if isinstance(data, dict):
+            return data.get('results', data.get('dishes', []))
+        return data
+    
+    def _apply_stocks(self, data):
+        """Aplica no payload o estoque atual publicado no cache"""
+        rows = self._menu_rows(data)
+        stocks = menu_cache.get_stocks([row['id'] for row in rows])
+        for row in rows:
+            if row['id'] in stocks:
+                row['stock'] = stocks[row['id']]
+                row['is_available'] = row['available'] and row['stock'] > 0
+        return stocks
+
+
+class CategoryViewSet(ConditionalGetMixin, MenuCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet para CRUD completo de Categorias.
     
@@ -34,23 +97,29 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
     
+    # dishes_count faz parte do payload
+    conditional_extra_aggregates = {'dishes_count': Count('dishes', distinct=True)}
+    
     @action(detail=True, methods=['get'])
     def dishes(self, request, slug=None):
         """
         Endpoint customizado: retorna todos os pratos de uma categoria.
         GET /api/menu/categories/{slug}/dishes/
         """
-        category = self.get_object()
-        dishes = category.dishes.filter(available=True)
-        serializer = DishListSerializer(dishes, many=True)
-        return Response({
-            'category': category.name,
-            'count': dishes.count(),
-            'dishes': serializer.data
-        })
+        def build():
+            category = self.get_object()
+            dishes = category.dishes.filter(available=True).select_related('category')
+            serializer = DishListSerializer(dishes, many=True)
+            return {
+                'category': category.name,
+                'count': len(serializer.data),
+                'dishes': serializer.data
+            }
+        
+        return self.cached_menu_response(f'category-dishes:{slug}', build)
 
 
-class DishViewSet(viewsets.ModelViewSet):
+class DishViewSet(ConditionalGetMixin, MenuCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet para CRUD completo de Pratos.
     
@@ -80,6 +149,9 @@ class DishViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'price', 'created_at']
     ordering = ['category', 'name']
     
+    # category_name faz parte do payload
+    conditional_extra_aggregates = {'category_updated_at': Max('category__updated_at')}
+    
     def get_serializer_class(self):
         """
         Usa serializer simplificado para listagem.
@@ -89,24 +161,42 @@ class DishViewSet(viewsets.ModelViewSet):
             return DishListSerializer
         return DishSerializer
     
-    @action(detail=False, methods=['get'])
-    def available(self, request):
+    def list(self, request, *args, **kwargs):
+        """Listagem pública servida pelo cache do cardápio"""
+        return self.cached_menu_response(
+            'dishes',
+            lambda: mixins.ListModelMixin.list(self, request, *args, **kwargs).data
+        )
+    
+    def _list_dishes(self, scope, dishes):
         """
-        Endpoint customizado: retorna apenas pratos disponíveis.
-        GET /api/menu/dishes/available/
+        Responde um recorte do cardápio com GET condicional e cache.
         """
-        dishes = self.queryset.filter(available=True, stock__gt=0)
-        
-        # Aplica filtros e busca
-        dishes = self.filter_queryset(dishes)
-        
+        return self.cached_menu_response(
+            scope,
+            lambda: self._serialize_dishes(self.filter_queryset(dishes))
+        )
+    
+    def _serialize_dishes(self, dishes):
+        """Pagina e serializa um recorte do cardápio"""
         page = self.paginate_queryset(dishes)
         if page is not None:
             serializer = DishListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(serializer.data).data
         
         serializer = DishListSerializer(dishes, many=True)
-        return Response(serializer.data)
+        return serializer.data
+    
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """
+        Endpoint customizado: retorna apenas pratos disponíveis.
+        GET /api/menu/dishes/available/
+        """
+        return self._list_dishes(
+            'dishes-available',
+            self.queryset.filter(available=True, stock__gt=0)
+        )
     
     @action(detail=False, methods=['get'])
     def vegetarian(self, request):
@@ -114,18 +204,10 @@ class DishViewSet(viewsets.ModelViewSet):
         Endpoint customizado: retorna apenas pratos vegetarianos.
         GET /api/menu/dishes/vegetarian/
         """
-        dishes = self.queryset.filter(vegetarian=True, available=True)
-        
-        # Aplica filtros e busca
-        dishes = self.filter_queryset(dishes)
-        
-        page = self.paginate_queryset(dishes)
-        if page is not None:
-            serializer = DishListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = DishListSerializer(dishes, many=True)
-        return Response(serializer.data)
+        return self._list_dishes(
+            'dishes-vegetarian',
+            self.queryset.filter(vegetarian=True, available=True)
+        )
     
     @action(detail=True, methods=['patch'])
     def update_stock(self, request, slug=None):
@@ -154,7 +236,7 @@ class DishViewSet(viewsets.ModelViewSet):
             )
         
         dish.stock = stock
-        dish.save()
+        dish.save()  # save() publica o estoque no cache do cardápio
         
         serializer = self.get_serializer(dish)
         return Response({
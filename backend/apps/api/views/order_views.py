@@ -2,13 +2,28 @@
 Views para pedidos.
 João Macarrão - Sistema de Pedidos
 """
+import asyncio
+import threading
+import time
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from asgiref.sync import sync_to_async
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 
+from apps.core.events import (
+    ORDER_CANCELLED,
+    ORDER_STATUS_CHANGED,
+    format_sse,
+    order_events
+)
 from apps.core.models import Order, OrderItem
 from ..serializers.order_serializers import (
     OrderSerializer,
@@ -16,10 +31,103 @@ from ..serializers.order_serializers import (
     OrderListSerializer,
     OrderStatusUpdateSerializer
 )
-from ..permissions import IsAtendenteOrAdmin
+from ..permissions import IsAtendenteOrAdmin, IsStaffMember
+from ..mixins import ConditionalGetMixin
+from ..pagination import OptInCursorPagination
+from ..renderers import EventStreamRenderer
+
+
+_wsgi_streams = None
+_wsgi_streams_lock = threading.Lock()
+
 
+def _wsgi_stream_slots():
+    """Semáforo dos streams longos em WSGI (ORDER_EVENTS_WSGI_STREAMS por processo)"""
+    global _wsgi_streams
+    with _wsgi_streams_lock:
+        if _wsgi_streams is None:
+            _wsgi_streams = threading.BoundedSemaphore(settings.ORDER_EVENTS_WSGI_STREAMS)
+        return _wsgi_streams
 
-class OrderViewSet(viewsets.ModelViewSet):
+
+def _stream_frames(events, gap):
+    """Converte eventos do broker em frames SSE"""
+    if gap:
+        # Eventos perdidos: o cliente deve recarregar a fila completa
+        yield format_sse({'reason': 'buffer_overflow'}, event='reset')
+    for event in events:
+        yield format_sse(event, event=event['type'], event_id=event['id'])
+
+
+def _stream_start(last_id, retry):
+    """
+    Abre o stream: intervalo de reconexão e o id de partida. Um frame só
+    com id atualiza o Last-Event-ID do EventSource sem disparar evento,
+    então a reconexão continua de onde parou mesmo sem eventos.
+    """
+    return f'retry: {retry}\n\nid: {last_id}\n\n'
+
+
+def _order_event_poll(last_id):
+    """
+    Short polling (WSGI sem vaga para stream longo): envia os eventos
+    pendentes e encerra. O EventSource reconecta após
+    ORDER_EVENTS_POLL_RETRY segundos com o Last-Event-ID.
+    """
+    events, gap = order_events.events_since(last_id)
+    yield _stream_start(last_id, settings.ORDER_EVENTS_POLL_RETRY * 1000)
+    yield from _stream_frames(events, gap)
+
+
+def _order_event_stream(last_id, keepalive, duration):
+    """
+    Stream síncrono (WSGI): ocupa uma thread do worker enquanto aberto.
+    No máximo ORDER_EVENTS_WSGI_STREAMS por processo; acima disso o
+    cliente recebe short polling.
+    """
+    slots = _wsgi_stream_slots()
+    if not slots.acquire(blocking=False):
+        yield from _order_event_poll(last_id)
+        return
+    
+    try:
+        deadline = time.monotonic() + duration
+        yield _stream_start(last_id, 3000)
+        while time.monotonic() < deadline:
+            events, gap = order_events.wait(last_id, timeout=keepalive)
+            if not events and not gap:
+                yield ': keepalive\n\n'
+                continue
+            yield from _stream_frames(events, gap)
+            if events:
+                last_id = events[-1]['id']
+    finally:
+        slots.release()
+
+
+async def _async_order_event_stream(last_id, keepalive, duration):
+    """Stream assíncrono (ASGI): não ocupa uma thread por conexão"""
+    events_since = sync_to_async(order_events.events_since)
+    interval = settings.ORDER_EVENTS_POLL_INTERVAL
+    deadline = time.monotonic() + duration
+    idle = 0.0
+    yield _stream_start(last_id, 3000)
+    while time.monotonic() < deadline:
+        events, gap = await events_since(last_id)
+        if events or gap:
+            for frame in _stream_frames(events, gap):
+                yield frame
+            if events:
+                last_id = events[-1]['id']
+            idle = 0.0
+        elif idle >= keepalive:
+            yield ': keepalive\n\n'
+            idle = 0.0
+        await asyncio.sleep(interval)
+        idle += interval
+
+
+class OrderViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de pedidos.
     
@@ -32,6 +140,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     - Podem atualizar status dos pedidos
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -50,9 +159,15 @@ class OrderViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if user.is_atendente() or user.is_admin():
-            return Order.objects.all().prefetch_related('items__dish')
+            orders = Order.objects.all()
+        else:
+            orders = Order.objects.filter(user=user)
         
-        return Order.objects.filter(user=user).prefetch_related('items__dish')
+        # Listagem não renderiza itens: apenas anota a quantidade
+        if self.action == 'list':
+            return orders.for_listing()
+        
+        return orders.select_related('user').prefetch_related('items__dish')
     
     def get_serializer_class(self):
         """Retorna serializer apropriado"""
@@ -113,6 +228,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 order.delivered_at = timezone.now()
             
             order.save()
+            order_events.publish(ORDER_STATUS_CHANGED, order, old_status=old_status)
             
             return Response({
                 'message': f'Status atualizado de "{order.get_status_display()}" para "{order.get_status_display()}"',
@@ -154,19 +270,68 @@ class OrderViewSet(viewsets.ModelViewSet):
         # Cancela pedido
         order.status = 'cancelled'
         order.save()
+        order_events.publish(ORDER_CANCELLED, order)
         
         return Response({
             'message': 'Pedido cancelado com sucesso',
             'order': OrderSerializer(order).data
         })
     
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsStaffMember],
+        renderer_classes=[EventStreamRenderer, JSONRenderer]
+    )
+    def stream(self, request):
+        """
+        Stream de eventos de pedidos para a cozinha (Server-Sent Events).
+        GET /api/orders/stream/
+        
+        Substitui o polling de /api/orders/pending/: o cliente carrega a
+        fila uma vez e aplica os eventos order.created, order.status_changed,
+        order.cancelled e payment.completed.
+        
+        Reconexão: o EventSource reenvia o header Last-Event-ID e os eventos
+        ainda no buffer são reenviados. Um evento "reset" indica que houve
+        perda e a fila deve ser recarregada. A conexão é encerrada após
+        ORDER_EVENTS_STREAM_TIMEOUT segundos (o cliente reconecta).
+        
+        Os eventos vêm de ORDER_EVENTS_BACKEND (banco por padrão), então
+        chegam a todos os workers, inclusive os publicados pelo worker de
+        pagamentos.
+        
+        Deploy: sirva esta rota em ASGI (ex: uvicorn), onde o stream é
+        assíncrono. Em WSGI cada stream ocupa uma thread do gunicorn; por
+        isso cada processo mantém no máximo ORDER_EVENTS_WSGI_STREAMS
+        streams abertos e as demais telas recebem short polling (os
+        eventos pendentes e reconexão em ORDER_EVENTS_POLL_RETRY segundos).
+        """
+        last_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        try:
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            last_id = order_events.latest_id()
+        
+        keepalive = settings.ORDER_EVENTS_KEEPALIVE
+        duration = settings.ORDER_EVENTS_STREAM_TIMEOUT
+        if isinstance(request._request, ASGIRequest):
+            stream = _async_order_event_stream(last_id, keepalive, duration)
+        else:
+            stream = _order_event_stream(last_id, keepalive, duration)
+        
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
     @action(detail=False, methods=['get'])
     def my_orders(self, request):
         """
         Lista pedidos do usuário autenticado.
         GET /api/orders/my_orders/
         """
-        orders = Order.objects.filter(user=request.user).prefetch_related('items__dish')
+        orders = Order.objects.filter(user=request.user).for_listing()
         
         # Aplica filtros
         orders = self.filter_queryset(orders)
@@ -185,7 +350,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         Lista pedidos pendentes (apenas atendentes/admins).
         GET /api/orders/pending/
         """
-        orders = Order.objects.filter(status='pending').prefetch_related('items__dish')
+        orders = Order.objects.filter(status='pending').for_listing()
         
         page = self.paginate_queryset(orders)
         if page is not None:
@@ -203,7 +368,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         orders = Order.objects.filter(
             status__in=['confirmed', 'preparing', 'ready', 'delivering']
-        ).prefetch_related('items__dish')
+        ).for_listing()
         
         page = self.paginate_queryset(orders)
         if page is not None:
@@ -93,6 +93,11 @@ class ContactMessage(models.Model):
         verbose_name = 'Mensagem de Contato'
         verbose_name_plural = 'Mensagens de Contato'
         ordering = ['-created_at']
+        indexes = [
+            # Paginação por cursor (-created_at, -id) e filtro por status
+            models.Index(fields=['-created_at', '-id'], name='contact_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='contact_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.subject} ({self.get_status_display()})"
@@ -8,7 +8,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db.models import Count
 
+from apps.api.pagination import OptInCursorPagination
+from apps.core.stats import choice_counts, conditional_counts
 from .models import ContactMessage
 from .serializers import (
     ContactMessageSerializer,
@@ -27,6 +30,7 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
     - PATCH (admin): Responder mensagem
     """
     queryset = ContactMessage.objects.all()
+    pagination_class = OptInCursorPagination
     
     def get_permissions(self):
         """
@@ -195,16 +199,9 @@ João Macarrão 🍝
         Estatísticas de mensagens de contato.
         GET /api/contact/stats/
         """
-        total = ContactMessage.objects.count()
-        pending = ContactMessage.objects.filter(status='pending').count()
-        read = ContactMessage.objects.filter(status='read').count()
-        replied = ContactMessage.objects.filter(status='replied').count()
-        
-        return Response({
-            'total': total,
-            'pending': pending,
-            'read': read,
-            'replied': replied,
-            'archived': ContactMessage.objects.filter(status='archived').count()
-        })
+        return Response(conditional_counts(
+            ContactMessage.objects.all(),
+            total=Count('pk'),
+            **choice_counts('status', ContactMessage.STATUS_CHOICES)
+        ))
 
@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
-from .models import Category, Dish, Order, OrderItem
+from django.db.models import Max, Min
+from django.utils import timezone
+from .models import Category, Dish, Order, OrderItem, OrderDailyRollup
+from .menu_cache import bump_menu_version
+from .rollups import rebuild_rollups
 
 User = get_user_model()
 
@@ -91,6 +95,11 @@ class CategoryAdmin(admin.ModelAdmin):
         """Retorna quantidade de pratos na categoria"""
         return obj.dishes.count()
     dishes_count.short_description = 'Qtd. Pratos'
+    
+    def delete_queryset(self, request, queryset):
+        """Exclusão em massa também invalida o cache do cardápio"""
+        super().delete_queryset(request, queryset)
+        bump_menu_version()
 
 
 @admin.register(Dish)
@@ -145,6 +154,11 @@ class DishAdmin(admin.ModelAdmin):
         return obj.is_available
     is_available.boolean = True
     is_available.short_description = 'Disponível'
+    
+    def delete_queryset(self, request, queryset):
+        """Exclusão em massa também invalida o cache do cardápio"""
+        super().delete_queryset(request, queryset)
+        bump_menu_version()
 
 
 class OrderItemInline(admin.TabularInline):
@@ -228,10 +242,48 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Anota a quantidade de itens para a listagem"""
+        return super().get_queryset(request).for_listing()
+    
     def items_count(self, obj):
         """Retorna quantidade total de itens"""
         return obj.items_count
     items_count.short_description = 'Qtd. Itens'
+    
+    def delete_queryset(self, request, queryset):
+        """Exclusão em lote não passa por Order.delete: recalcula os agregados do período"""
+        period = queryset.order_by().aggregate(start=Min('created_at'), end=Max('created_at'))
+        super().delete_queryset(request, queryset)
+        if period['start']:
+            rebuild_rollups(
+                timezone.localdate(period['start']),
+                timezone.localdate(period['end'])
+            )
+
+
+@admin.register(OrderDailyRollup)
+class OrderDailyRollupAdmin(admin.ModelAdmin):
+    """
+    Admin somente leitura dos agregados diários de pedidos.
+    Use o comando rebuild_order_rollups para recalcular.
+    """
+    list_display = [
+        'date',
+        'orders_count',
+        'paid_orders_count',
+        'revenue',
+        'cancelled_count',
+        'updated_at'
+    ]
+    date_hierarchy = 'date'
+    ordering = ['-date']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(OrderItem)
@@ -0,0 +1,246 @@
+"""
+Eventos de ciclo de vida dos pedidos para João Macarrão.
+Broker com backend plugável, usado pelo stream da cozinha.
+
+- DatabaseEventBackend (padrão): tabela OrderEvent compartilhada por
+  todos os processos (workers web e worker de pagamentos)
+- InMemoryEventBackend: buffer por processo, para desenvolvimento com
+  um único processo
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+ORDER_CANCELLED = 'order.cancelled'
+PAYMENT_COMPLETED = 'payment.completed'
+PAYMENT_STATUS_CHANGED = 'payment.status_changed'
+
+
+class InMemoryEventBackend:
+    """
+    Backend em memória: mantém os últimos eventos em um buffer circular.
+    
+    Os ids são crescentes e baseados no timestamp em ms, então continuam
+    válidos como Last-Event-ID após reiniciar o processo.
+    
+    Cada processo tem o seu buffer: eventos publicados em outro worker
+    (ou no worker de pagamentos) não chegam aos leitores deste processo.
+    Use apenas com um único processo; o padrão é DatabaseEventBackend.
+    """
+    
+    # Eventos publicados aqui não chegam a outros processos
+    shared = False
+    
+    def __init__(self, max_events=1000):
+        self._events = deque(maxlen=max_events)
+        self._condition = threading.Condition()
+        self._last_id = 0
+        self._evicted_id = 0
+    
+    def publish(self, event):
+        """Adiciona o evento ao buffer, atribuindo um id, e acorda os leitores"""
+        with self._condition:
+            self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+            event = {'id': self._last_id, **event}
+            if len(self._events) == self._events.maxlen:
+                self._evicted_id = self._events[0]['id']
+            self._events.append(event)
+            self._condition.notify_all()
+        return event
+    
+    def latest_id(self):
+        """Id do evento mais recente (0 se não houver)"""
+        with self._condition:
+            return self._last_id
+    
+    def events_since(self, last_id):
+        """
+        Retorna (eventos com id > last_id, houve_lacuna).
+        Há lacuna quando eventos posteriores a last_id já saíram do buffer.
+        """
+        with self._condition:
+            events = [event for event in self._events if event['id'] > last_id]
+            gap = 0 < last_id < self._evicted_id
+        return events, gap
+    
+    def wait(self, last_id, timeout):
+        """Bloqueia até haver eventos com id > last_id ou o timeout expirar"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._events and self._events[-1]['id'] > last_id,
+                timeout=timeout
+            )
+        return self.events_since(last_id)
+
+
+class DatabaseEventBackend:
+    """
+    Backend em banco: cada evento é uma linha de OrderEvent e o id da
+    linha é o id do evento.
+    
+    Qualquer processo publica e lê a mesma sequência; os leitores
+    consultam por id > last_id (índice da chave primária) a cada
+    poll_interval segundos. A cada `prune_every` publicações deste
+    processo, eventos além dos últimos max_events são apagados.
+    
+    O id é atribuído no INSERT, não no commit: um publicador pode
+    confirmar o id 10 depois que outro já confirmou (e um leitor já leu)
+    o 11. Por isso a leitura para antes de um id faltando enquanto o
+    evento seguinte a ele tiver menos de `settle_seconds`; depois disso
+    o id é tratado como descartado (INSERT desfeito).
+    """
+    
+    shared = True
+    
+    def __init__(self, max_events=1000, poll_interval=None, prune_every=100, settle_seconds=None):
+        self.max_events = max_events
+        self.poll_interval = poll_interval or getattr(settings, 'ORDER_EVENTS_POLL_INTERVAL', 1.0)
+        self.prune_every = prune_every
+        if settle_seconds is None:
+            settle_seconds = getattr(settings, 'ORDER_EVENTS_SETTLE_SECONDS', 3.0)
+        self.settle_seconds = settle_seconds
+        self._published = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def model(self):
+        from .models import OrderEvent
+        return OrderEvent
+    
+    def publish(self, event):
+        """Grava o evento (um INSERT) e apaga os antigos periodicamente"""
+        row = self.model.objects.create(type=event['type'], payload=event)
+        with self._lock:
+            self._published += 1
+            prune = self._published % self.prune_every == 0
+        if prune:
+            self.model.objects.filter(id__lte=row.id - self.max_events).delete()
+        return {'id': row.id, **event}
+    
+    def _settled(self, rows, last_id):
+        """
+        Linhas (id, criado_em, ...) até o primeiro id faltando que ainda
+        pode ser um INSERT em andamento (seguido de um evento recente).
+        """
+        cutoff = timezone.now() - timedelta(seconds=self.settle_seconds)
+        previous = last_id
+        for index, row in enumerate(rows):
+            if previous and row[0] != previous + 1 and row[1] > cutoff:
+                return rows[:index]
+            previous = row[0]
+        return rows
+    
+    def latest_id(self):
+        """Id do evento mais recente já estável (0 se não houver)"""
+        # Só os últimos eventos podem ter ids ainda não confirmados antes deles
+        rows = list(self.model.objects.order_by('-id').values_list('id', 'created_at')[:self.prune_every])
+        rows.reverse()
+        rows = self._settled(rows, rows[0][0] - 1 if rows else 0)
+        return rows[-1][0] if rows else 0
+    
+    def events_since(self, last_id):
+        """
+        Retorna (eventos com id > last_id, houve_lacuna).
+        Há lacuna quando eventos posteriores a last_id já foram apagados.
+        """
+        rows = list(
+            self.model.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'created_at', 'payload')[:self.max_events]
+        )
+        
+        gap = False
+        if last_id > 0 and rows and rows[0][0] > last_id + 1:
+            # A limpeza apaga sempre o início da tabela: se ainda há linhas
+            # até last_id, nada depois dele foi apagado
+            gap = not self.model.objects.filter(id__lte=last_id).exists()
+        
+        # Depois de uma lacuna a leitura recomeça na primeira linha mantida
+        rows = self._settled(rows, rows[0][0] - 1 if gap else last_id)
+        events = [{**payload, 'id': event_id} for event_id, _, payload in rows]
+        return events, gap
+    
+    def wait(self, last_id, timeout):
+        """Consulta a tabela até haver eventos com id > last_id ou o timeout expirar"""
+        deadline = time.monotonic() + timeout
+        while True:
+            events, gap = self.events_since(last_id)
+            remaining = deadline - time.monotonic()
+            if events or gap or remaining <= 0:
+                return events, gap
+            time.sleep(min(self.poll_interval, remaining))
+
+
+class OrderEventBroker:
+    """
+    Fan-out de eventos de pedidos.
+    Publica após o commit da transação para que os leitores nunca vejam
+    um pedido que ainda não existe no banco.
+    """
+    
+    def __init__(self, backend=None):
+        self._backend = backend
+    
+    @property
+    def backend(self):
+        if self._backend is None:
+            backend_class = import_string(getattr(
+                settings,
+                'ORDER_EVENTS_BACKEND',
+                'apps.core.events.DatabaseEventBackend'
+            ))
+            self._backend = backend_class(
+                max_events=getattr(settings, 'ORDER_EVENTS_BUFFER_SIZE', 1000)
+            )
+        return self._backend
+    
+    def publish(self, event_type, order, **extra):
+        """Agenda a publicação de um evento para o pedido"""
+        event = {
+            'type': event_type,
+            'order_id': order.id,
+            'status': order.status,
+            'payment_status': order.payment_status,
+            'total': str(order.total),
+            'timestamp': timezone.now().isoformat(),
+            **extra
+        }
+        transaction.on_commit(lambda: self.backend.publish(event))
+    
+    @property
+    def shared(self):
+        """Indica se os eventos chegam a leitores de outros processos"""
+        return getattr(self.backend, 'shared', False)
+    
+    def latest_id(self):
+        return self.backend.latest_id()
+    
+    def events_since(self, last_id):
+        return self.backend.events_since(last_id)
+    
+    def wait(self, last_id, timeout):
+        return self.backend.wait(last_id, timeout)
+
+
+order_events = OrderEventBroker()
+
+
+def format_sse(data, event=None, event_id=None):
+    """Serializa uma mensagem no formato Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,77 @@
+"""
+Mede queries e tempo dos endpoints de estatísticas.
+Uso: python manage.py benchmark_stats [--repeat N]
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.api.views.admin_views import admin_dashboard_summary, admin_stats
+from apps.contact.models import ContactMessage
+from apps.contact.views import ContactMessageViewSet
+from apps.core.stats import choice_counts, conditional_counts
+
+
+class Command(BaseCommand):
+    help = 'Compara contagens separadas com agregação condicional e mede os endpoints do painel'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Execuções por medição')
+    
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        admin = get_user_model().objects.filter(is_superuser=True).first()
+        if admin is None:
+            raise CommandError('Crie um superusuário antes de executar o benchmark')
+        
+        statuses = [value for value, _ in ContactMessage.STATUS_CHOICES]
+        
+        def separate_counts():
+            return {
+                'total': ContactMessage.objects.count(),
+                **{value: ContactMessage.objects.filter(status=value).count() for value in statuses}
+            }
+        
+        def single_aggregate():
+            return conditional_counts(
+                ContactMessage.objects.all(),
+                total=Count('pk'),
+                **choice_counts('status', ContactMessage.STATUS_CHOICES)
+            )
+        
+        self.stdout.write('Contadores de ContactMessage')
+        self._report('count() por status', separate_counts, repeat)
+        self._report('aggregate condicional', single_aggregate, repeat)
+        
+        factory = APIRequestFactory()
+        contact_stats = ContactMessageViewSet.as_view({'get': 'stats'})
+        endpoints = [
+            ('/api/admin/stats/', admin_stats),
+            ('/api/admin/dashboard/', admin_dashboard_summary),
+            ('/api/contact/stats/', contact_stats),
+        ]
+        
+        self.stdout.write('\nEndpoints')
+        for path, view in endpoints:
+            def call(path=path, view=view):
+                request = factory.get(path)
+                force_authenticate(request, user=admin)
+                return view(request)
+            self._report(path, call, repeat)
+    
+    def _report(self, label, func, repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        queries = len(ctx.captured_queries)
+        
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        
+        self.stdout.write(f'  {label:<28} {queries:>3} queries  {elapsed:8.2f} ms')
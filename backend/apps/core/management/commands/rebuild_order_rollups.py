@@ -0,0 +1,36 @@
+"""
+Recalcula os agregados diários de pedidos (OrderDailyRollup).
+Uso: python manage.py rebuild_order_rollups [--start AAAA-MM-DD] [--end AAAA-MM-DD]
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os agregados diários de pedidos a partir da tabela de pedidos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Primeiro dia (AAAA-MM-DD); padrão: início do histórico')
+        parser.add_argument('--end', help='Último dia (AAAA-MM-DD); padrão: hoje')
+    
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f'Data inválida: {e}')
+        
+        if start and end and start > end:
+            raise CommandError('--start deve ser anterior a --end')
+        
+        started = time.monotonic()
+        days = rebuild_rollups(start, end)
+        elapsed = time.monotonic() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{days} dia(s) recalculado(s) em {elapsed:.2f}s'
+        ))
@@ -0,0 +1,142 @@
+"""
+Cache do cardápio para João Macarrão.
+Armazena os payloads serializados das listagens públicas de pratos,
+invalidados por uma versão monotônica do cardápio.
+
+O estoque muda a cada pedido e fica fora do payload: cada prato tem sua
+contagem em uma chave própria (menu:stock:<id>), aplicada sobre o
+payload na leitura. A versão só muda quando a disponibilidade de algum
+prato muda (estoque zerado ou reposto). As chaves de estoque expiram
+com MENU_CACHE_TIMEOUT e são regravadas a cada payload montado do banco,
+então mudanças de estoque que não passam por update_menu_stock (ou
+feitas em outro worker com cache local) valem no máximo até lá.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+VERSION_KEY = 'menu:version'
+STOCK_KEY = 'menu:stock:{}'
+
+
+class MenuCache:
+    """
+    Camada de cache das listagens do cardápio.
+    
+    Cada payload é salvo sob uma chave que inclui a versão atual do
+    cardápio. Ao alterar pratos ou categorias a versão é incrementada e
+    todas as entradas antigas deixam de ser lidas (expiram pelo timeout).
+    
+    O backend é o alias configurado em settings.CACHES (local-memory por
+    padrão). Com mais de um worker, use um backend compartilhado
+    (Redis, Memcached ou DatabaseCache) para que a invalidação valha
+    para todos os processos.
+    """
+    
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias or getattr(settings, 'MENU_CACHE_ALIAS', 'menu')
+        self.timeout = timeout or getattr(settings, 'MENU_CACHE_TIMEOUT', 300)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def backend(self):
+        return caches[self.alias]
+    
+    def get_version(self):
+        """Retorna a versão atual do cardápio"""
+        version = self.backend.get(VERSION_KEY)
+        if version is None:
+            # Inicializa com o timestamp em ms para que a versão continue
+            # crescente mesmo se a chave for descartada pelo backend
+            self.backend.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = self.backend.get(VERSION_KEY)
+        return version
+    
+    def bump_version(self):
+        """Incrementa a versão do cardápio, invalidando todos os payloads"""
+        try:
+            return self.backend.incr(VERSION_KEY)
+        except ValueError:
+            # Chave ausente: get_version recria a partir do timestamp
+            return self.get_version()
+    
+    def make_key(self, scope, request):
+        """
+        Monta a chave do payload a partir do escopo e da query string
+        (filtros, busca, ordenação e página).
+        """
+        params = sorted(request.query_params.lists())
+        raw = f"{request.get_host()}|{params}"
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f"menu:{self.get_version()}:{scope}:{digest}"
+    
+    def get(self, key):
+        data = self.backend.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+    
+    def set(self, key, data):
+        self.backend.set(key, data, timeout=self.timeout)
+    
+    def get_stocks(self, dish_ids):
+        """Estoque atual dos pratos informados: {id: estoque}"""
+        keys = {STOCK_KEY.format(dish_id): dish_id for dish_id in dish_ids}
+        return {keys[key]: stock for key, stock in self.backend.get_many(list(keys)).items()}
+    
+    def set_stocks(self, stocks):
+        """
+        Grava o estoque dos pratos ({id: estoque}), publicado por pedidos
+        ou lido do banco ao montar um payload.
+        """
+        self.backend.set_many(
+            {STOCK_KEY.format(dish_id): stock for dish_id, stock in stocks.items()},
+            timeout=self.timeout
+        )
+    
+    def stats(self):
+        """Retorna contadores de hit/miss deste processo"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'version': self.get_version(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0
+        }
+
+
+menu_cache = MenuCache()
+
+
+def bump_menu_version():
+    """
+    Invalida o cache do cardápio após o commit da transação atual.
+    Executa imediatamente quando não há transação aberta.
+    """
+    transaction.on_commit(menu_cache.bump_version)
+
+
+def update_menu_stock(stocks, availability_changed=False):
+    """
+    Publica o novo estoque dos pratos ({id: estoque}) após o commit.
+    A versão do cardápio só é incrementada se a disponibilidade de algum
+    prato mudou (ele entra ou sai das listagens de disponíveis).
+    """
+    def publish():
+        menu_cache.set_stocks(stocks)
+        if availability_changed:
+            menu_cache.bump_version()
+    
+    transaction.on_commit(publish)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 00:20
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_dish_average_rating_dish_reviews_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Data')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Pedidos')),
+                ('paid_orders_count', models.PositiveIntegerField(default=0, verbose_name='Pedidos Pagos')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Faturamento')),
+                ('cancelled_count', models.PositiveIntegerField(default=0, verbose_name='Cancelamentos')),
+                ('status_counts', models.JSONField(blank=True, default=dict, verbose_name='Pedidos por Status')),
+                ('payment_method_counts', models.JSONField(blank=True, default=dict, verbose_name='Pedidos por Forma de Pagamento')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Agregado Diário de Pedidos',
+                'verbose_name_plural': 'Agregados Diários de Pedidos',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
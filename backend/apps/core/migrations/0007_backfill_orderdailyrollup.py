@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Preenche os agregados diários a partir dos pedidos existentes.
+    Usa apenas os modelos históricos (não importa apps.core.rollups).
+    """
+    Order = apps.get_model('core', 'Order')
+    OrderDailyRollup = apps.get_model('core', 'OrderDailyRollup')
+    
+    rows = Order.objects.annotate(
+        day=TruncDate('created_at')
+    ).order_by().values(
+        'day', 'status', 'payment_status', 'payment_method'
+    ).annotate(orders=Count('pk'), total=Sum('total'))
+    
+    rollups = {}
+    for row in rows:
+        rollup = rollups.get(row['day'])
+        if rollup is None:
+            rollup = rollups[row['day']] = OrderDailyRollup(
+                date=row['day'],
+                orders_count=0,
+                paid_orders_count=0,
+                revenue=Decimal('0.00'),
+                cancelled_count=0,
+                status_counts={},
+                payment_method_counts={}
+            )
+        rollup.orders_count += row['orders']
+        if row['payment_status'] == 'paid':
+            rollup.paid_orders_count += row['orders']
+            rollup.revenue += row['total'] or Decimal('0.00')
+        if row['status'] == 'cancelled':
+            rollup.cancelled_count += row['orders']
+        for field, value in (('status_counts', row['status']),
+                             ('payment_method_counts', row['payment_method'])):
+            counts = getattr(rollup, field)
+            counts[value] = counts.get(value, 0) + row['orders']
+    
+    for rollup in rollups.values():
+        rollup.status_counts = dict(sorted(rollup.status_counts.items()))
+        rollup.payment_method_counts = dict(sorted(rollup.payment_method_counts.items()))
+    
+    OrderDailyRollup.objects.all().delete()
+    OrderDailyRollup.objects.bulk_create(
+        [rollups[day] for day in sorted(rollups)],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('core', '0006_orderdailyrollup'),
+    ]
+    
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
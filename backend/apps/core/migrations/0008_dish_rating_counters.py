@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_backfill_orderdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Soma das Avaliações'),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0, verbose_name='Avaliações 1 Estrela'),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0, verbose_name='Avaliações 2 Estrelas'),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0, verbose_name='Avaliações 3 Estrelas'),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0, verbose_name='Avaliações 4 Estrelas'),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0, verbose_name='Avaliações 5 Estrelas'),
+        ),
+    ]
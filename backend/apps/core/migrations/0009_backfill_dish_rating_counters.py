@@ -0,0 +1,56 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations
+from django.db.models import Count
+
+
+RATING_FIELDS = [
+    'reviews_count', 'rating_sum', 'average_rating',
+    'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5'
+]
+
+
+def backfill_rating_counters(apps, schema_editor):
+    """
+    Preenche os contadores de avaliação dos pratos a partir das
+    avaliações aprovadas. Usa apenas os modelos históricos (não importa
+    apps.reviews.ratings).
+    """
+    Dish = apps.get_model('core', 'Dish')
+    DishReview = apps.get_model('reviews', 'DishReview')
+    
+    counters = {}
+    rows = DishReview.objects.filter(is_approved=True).order_by().values(
+        'dish_id', 'rating'
+    ).annotate(reviews=Count('pk'))
+    for row in rows:
+        values = counters.setdefault(row['dish_id'], {field: 0 for field in RATING_FIELDS})
+        values['reviews_count'] += row['reviews']
+        values['rating_sum'] += row['rating'] * row['reviews']
+        values[f"stars_{row['rating']}"] += row['reviews']
+    
+    dishes = []
+    for dish in Dish.objects.only('id', *RATING_FIELDS).order_by('id').iterator(chunk_size=500):
+        values = counters.get(dish.pk, {field: 0 for field in RATING_FIELDS})
+        if values['reviews_count']:
+            values['average_rating'] = (
+                Decimal(values['rating_sum']) / values['reviews_count']
+            ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        if any(getattr(dish, field) != values[field] for field in RATING_FIELDS):
+            for field in RATING_FIELDS:
+                setattr(dish, field, values[field])
+            dishes.append(dish)
+    
+    Dish.objects.bulk_update(dishes, RATING_FIELDS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('core', '0008_dish_rating_counters'),
+        ('reviews', '0001_initial'),
+    ]
+    
+    operations = [
+        migrations.RunPython(backfill_rating_counters, migrations.RunPython.noop),
+    ]
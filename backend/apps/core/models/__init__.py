@@ -4,6 +4,8 @@ Modelos do app core - João Macarrão
 from .user_models import User
 from .menu_models import Category, Dish
 from .order_models import Order, OrderItem
+from .rollup_models import OrderDailyRollup
+from .event_models import OrderEvent
 
-__all__ = ['User', 'Category', 'Dish', 'Order', 'OrderItem']
+__all__ = ['User', 'Category', 'Dish', 'Order', 'OrderItem', 'OrderDailyRollup', 'OrderEvent']
 
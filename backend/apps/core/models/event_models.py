@@ -0,0 +1,35 @@
+"""
+Modelos de eventos de pedidos para João Macarrão.
+Log compartilhado entre processos consumido pelo stream da cozinha.
+"""
+from django.db import models
+
+
+class OrderEvent(models.Model):
+    """
+    Evento de ciclo de vida de um pedido.
+    
+    Gravado por apps.core.events.DatabaseEventBackend: o id crescente é o
+    id do evento no stream (Last-Event-ID), então workers web e o worker
+    de pagamentos publicam e leem a mesma sequência. Apenas os eventos
+    mais recentes são mantidos (ORDER_EVENTS_BUFFER_SIZE).
+    """
+    type = models.CharField(
+        max_length=50,
+        verbose_name='Tipo'
+    )
+    payload = models.JSONField(
+        verbose_name='Dados'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Criado em'
+    )
+    
+    class Meta:
+        verbose_name = 'Evento de Pedido'
+        verbose_name_plural = 'Eventos de Pedidos'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"#{self.id} {self.type}"
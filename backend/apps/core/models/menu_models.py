@@ -5,6 +5,8 @@ Gerenciamento de categorias e pratos.
 from django.db import models
 from django.utils.text import slugify
 
+from ..menu_cache import bump_menu_version, update_menu_stock
+
 
 class Category(models.Model):
     """
@@ -44,10 +46,17 @@ class Category(models.Model):
         return self.name
     
     def save(self, *args, **kwargs):
-        """Gera slug automaticamente se não fornecido"""
+        """Gera slug automaticamente se não fornecido e invalida o cache do cardápio"""
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        bump_menu_version()
+    
+    def delete(self, *args, **kwargs):
+        """Invalida o cache do cardápio após remover a categoria"""
+        result = super().delete(*args, **kwargs)
+        bump_menu_version()
+        return result
 
 
 class Dish(models.Model):
@@ -113,6 +122,15 @@ class Dish(models.Model):
         default=0,
         verbose_name='Número de Avaliações'
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Soma das Avaliações'
+    )
+    stars_1 = models.PositiveIntegerField(default=0, verbose_name='Avaliações 1 Estrela')
+    stars_2 = models.PositiveIntegerField(default=0, verbose_name='Avaliações 2 Estrelas')
+    stars_3 = models.PositiveIntegerField(default=0, verbose_name='Avaliações 3 Estrelas')
+    stars_4 = models.PositiveIntegerField(default=0, verbose_name='Avaliações 4 Estrelas')
+    stars_5 = models.PositiveIntegerField(default=0, verbose_name='Avaliações 5 Estrelas')
     
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -131,11 +149,60 @@ class Dish(models.Model):
     def __str__(self):
         return f"{self.name} - {self.category.name}"
     
+    # Campos exibidos nas listagens do cardápio (além do estoque)
+    MENU_FIELDS = (
+        'name', 'slug', 'description', 'price', 'category_id',
+        'image', 'available', 'vegetarian'
+    )
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Guarda os valores carregados para detectar o que mudou no save()"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def has_changed(self, *fields):
+        """Indica se algum dos campos mudou desde que o prato foi carregado"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(
+            field not in loaded or getattr(self, field) != loaded[field]
+            for field in fields
+        )
+    
     def save(self, *args, **kwargs):
-        """Gera slug automaticamente se não fornecido"""
+        """
+        Gera slug automaticamente se não fornecido e atualiza o cache do
+        cardápio: mudanças só de estoque publicam a nova contagem e só
+        invalidam as listagens se a disponibilidade do prato mudou.
+        """
         if not self.slug:
             self.slug = slugify(self.name)
+        loaded = getattr(self, '_loaded_values', {})
+        availability_changed = (
+            'stock' not in loaded or (loaded['stock'] > 0) != (self.stock > 0)
+        )
+        menu_changed = self.has_changed(*self.MENU_FIELDS)
         super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        self._loaded_values = {**loaded, **{
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if update_fields is None or field.name in update_fields or field.attname in update_fields
+        }}
+        
+        update_menu_stock({self.pk: self.stock}, availability_changed)
+        if menu_changed:
+            bump_menu_version()
+    
+    def delete(self, *args, **kwargs):
+        """Invalida o cache do cardápio após remover o prato"""
+        result = super().delete(*args, **kwargs)
+        bump_menu_version()
+        return result
     
     @property
     def is_available(self):
@@ -143,16 +210,17 @@ class Dish(models.Model):
         return self.available and self.stock > 0
     
     def update_rating(self):
-        """Atualiza a média de avaliações do prato"""
-        from django.db.models import Avg, Count
-        
-        stats = self.reviews.filter(is_approved=True).aggregate(
-            avg_rating=Avg('rating'),
-            count=Count('id')
-        )
+        """
+        Recalcula do zero os agregados de avaliação do prato.
+        Escritas de avaliações já atualizam os contadores de forma
+        incremental (apps.reviews.ratings); use apenas para reconciliar.
+        """
+        from apps.reviews.ratings import recompute_dish_ratings
         
-        self.average_rating = stats['avg_rating'] or 0.00
-        self.reviews_count = stats['count'] or 0
-        self.save(update_fields=['average_rating', 'reviews_count'])
+        recompute_dish_ratings([self.pk])
+        self.refresh_from_db(fields=[
+            'average_rating', 'reviews_count', 'rating_sum',
+            'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5'
+        ])
 
 
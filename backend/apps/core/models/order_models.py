@@ -3,10 +3,27 @@ Modelos de pedidos para João Macarrão.
 Sistema completo de gerenciamento de pedidos.
 """
 from django.db import models
+from django.db.models import Sum
 from django.conf import settings
 from decimal import Decimal
 
 
+class OrderQuerySet(models.QuerySet):
+    """
+    QuerySet de pedidos com construtores compartilhados pelas views.
+    """
+    
+    def for_listing(self):
+        """
+        Queryset para listagens: junta o cliente e anota a quantidade
+        total de itens, evitando uma query extra por pedido.
+        """
+        # Meta.ordering não é aplicado em queries com GROUP BY
+        return self.select_related('user').annotate(
+            items_quantity=Sum('items__quantity')
+        ).order_by('-created_at')
+
+
 class Order(models.Model):
     """
     Modelo de Pedido.
@@ -130,14 +147,80 @@ class Order(models.Model):
         verbose_name='Entregue em'
     )
     
+    objects = OrderQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
         ordering = ['-created_at']
+        indexes = [
+            # Paginação por cursor (-created_at, -id) e filtros das listagens
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"Pedido #{self.id} - {self.user.username} - {self.get_status_display()}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Guarda o estado carregado para calcular o delta do agregado diário"""
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_state = instance.get_rollup_state()
+        return instance
+    
+    def get_rollup_state(self):
+        """
+        Estado que define a contribuição do pedido no OrderDailyRollup.
+        Retorna None se algum campo não foi carregado (only/defer).
+        """
+        from ..rollups import TRACKED_FIELDS
+        
+        if any(field not in self.__dict__ for field in TRACKED_FIELDS):
+            return None
+        return {field: self.__dict__[field] for field in TRACKED_FIELDS}
+    
+    def save(self, *args, **kwargs):
+        """Salva o pedido e atualiza o agregado diário com a diferença"""
+        from ..rollups import TRACKED_FIELDS, record_order_change
+        
+        previous = None
+        if not self._state.adding:
+            previous = getattr(self, '_rollup_state', None)
+            if previous is None:
+                previous = type(self)._base_manager.filter(pk=self.pk).values(
+                    *TRACKED_FIELDS
+                ).first()
+        
+        super().save(*args, **kwargs)
+        
+        current = self.get_rollup_state()
+        update_fields = kwargs.get('update_fields')
+        if current is None:
+            current = type(self)._base_manager.filter(pk=self.pk).values(
+                *TRACKED_FIELDS
+            ).first()
+        elif update_fields is not None and previous is not None:
+            # Apenas os campos gravados mudaram no banco
+            current = {
+                field: current[field] if field in update_fields else previous[field]
+                for field in TRACKED_FIELDS
+            }
+        
+        record_order_change(self.created_at, previous, current)
+        self._rollup_state = current
+    
+    def delete(self, *args, **kwargs):
+        """Remove o pedido e sua contribuição do agregado diário"""
+        from ..rollups import record_order_change
+        
+        previous = getattr(self, '_rollup_state', None) or self.get_rollup_state()
+        created_at = self.created_at
+        result = super().delete(*args, **kwargs)
+        record_order_change(created_at, previous, None)
+        return result
+    
     def calculate_total(self):
         """Calcula o total do pedido"""
         self.subtotal = sum(
@@ -148,7 +231,12 @@ class Order(models.Model):
     
     @property
     def items_count(self):
-        """Retorna quantidade total de itens"""
+        """
+        Retorna quantidade total de itens.
+        Usa a anotação de OrderQuerySet.for_listing quando disponível.
+        """
+        if hasattr(self, 'items_quantity'):
+            return self.items_quantity or 0
         return sum(item.quantity for item in self.items.all())
     
     def can_be_cancelled(self):
@@ -0,0 +1,59 @@
+"""
+Modelos de agregados diários para João Macarrão.
+Totais de pedidos e vendas pré-calculados para o painel administrativo.
+"""
+from django.db import models
+from decimal import Decimal
+
+
+class OrderDailyRollup(models.Model):
+    """
+    Agregado diário de pedidos.
+    Uma linha por dia de criação dos pedidos, mantida incrementalmente
+    por apps.core.rollups e reconstruível com o comando
+    rebuild_order_rollups.
+    """
+    date = models.DateField(
+        unique=True,
+        verbose_name='Data'
+    )
+    orders_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Pedidos'
+    )
+    paid_orders_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Pedidos Pagos'
+    )
+    revenue = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Faturamento'
+    )
+    cancelled_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Cancelamentos'
+    )
+    status_counts = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Pedidos por Status'
+    )
+    payment_method_counts = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Pedidos por Forma de Pagamento'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Atualizado em'
+    )
+    
+    class Meta:
+        verbose_name = 'Agregado Diário de Pedidos'
+        verbose_name_plural = 'Agregados Diários de Pedidos'
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.date} - {self.orders_count} pedidos"
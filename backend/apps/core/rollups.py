@@ -0,0 +1,189 @@
+"""
+Manutenção dos agregados diários de pedidos (OrderDailyRollup).
+
+Cada pedido contribui para a linha do seu dia de criação. Ao salvar um
+pedido, a diferença entre a contribuição anterior e a atual é aplicada
+na linha do dia, após o commit e em uma transação curta, para não
+prolongar os locks do checkout.
+
+Escritas que não passam por Order.save()/delete() devem chamar
+record_order_changes (queryset.update) ou rebuild_rollups para o
+intervalo afetado (delete em lote).
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from .models import Order, OrderDailyRollup
+from .stats import choice_counts, count_if, daily_series, sum_if
+
+
+# Campos do pedido que determinam sua contribuição no agregado
+TRACKED_FIELDS = ('status', 'payment_status', 'payment_method', 'total')
+
+
+def order_contribution(state):
+    """
+    Contribuição de um pedido (dict com TRACKED_FIELDS) para o agregado.
+    state=None representa um pedido inexistente (antes de criar ou
+    depois de remover).
+    """
+    if state is None:
+        return {
+            'orders_count': 0,
+            'paid_orders_count': 0,
+            'revenue': Decimal('0.00'),
+            'cancelled_count': 0,
+            'status_counts': Counter(),
+            'payment_method_counts': Counter()
+        }
+    
+    paid = state['payment_status'] == 'paid'
+    return {
+        'orders_count': 1,
+        'paid_orders_count': int(paid),
+        'revenue': Decimal(state['total']) if paid else Decimal('0.00'),
+        'cancelled_count': int(state['status'] == 'cancelled'),
+        'status_counts': Counter({state['status']: 1}),
+        'payment_method_counts': Counter({state['payment_method']: 1})
+    }
+
+
+def _subtract(current, previous):
+    """Diferença entre duas contribuições"""
+    delta = {}
+    for field, value in current.items():
+        if isinstance(value, Counter):
+            counts = Counter(value)
+            counts.subtract(previous[field])
+            delta[field] = counts
+        else:
+            delta[field] = value - previous[field]
+    return delta
+
+
+def _merge_counts(stored, delta):
+    counts = Counter(stored)
+    counts.update(delta)
+    return {key: value for key, value in sorted(counts.items()) if value}
+
+
+def apply_delta(date, delta):
+    """Aplica um delta na linha do dia, criando-a se necessário"""
+    with transaction.atomic():
+        rollup, _ = OrderDailyRollup.objects.select_for_update().get_or_create(date=date)
+        rollup.orders_count += delta['orders_count']
+        rollup.paid_orders_count += delta['paid_orders_count']
+        rollup.revenue += delta['revenue']
+        rollup.cancelled_count += delta['cancelled_count']
+        rollup.status_counts = _merge_counts(rollup.status_counts, delta['status_counts'])
+        rollup.payment_method_counts = _merge_counts(
+            rollup.payment_method_counts, delta['payment_method_counts']
+        )
+        rollup.save()
+
+
+def record_order_change(created_at, previous, current):
+    """
+    Registra a transição de um pedido entre dois estados.
+    
+    Args:
+        created_at: data de criação do pedido (define o dia)
+        previous: estado anterior (None na criação)
+        current: estado atual (None na remoção)
+    """
+    if previous == current:
+        return
+    
+    delta = _subtract(order_contribution(current), order_contribution(previous))
+    date = timezone.localdate(created_at)
+    transaction.on_commit(lambda: apply_delta(date, delta))
+
+
+def record_order_changes(changes):
+    """
+    Versão em lote de record_order_change, para escritas com
+    queryset.update(): soma os deltas e aplica um único por dia.
+    
+    Args:
+        changes: iterável de (created_at, previous, current)
+    """
+    deltas = {}
+    for created_at, previous, current in changes:
+        if previous == current:
+            continue
+        delta = _subtract(order_contribution(current), order_contribution(previous))
+        date = timezone.localdate(created_at)
+        if date in deltas:
+            for field, value in delta.items():
+                if isinstance(value, Counter):
+                    # Counter += descartaria as contagens negativas
+                    deltas[date][field].update(value)
+                else:
+                    deltas[date][field] += value
+        else:
+            deltas[date] = delta
+    
+    for date, delta in deltas.items():
+        transaction.on_commit(lambda date=date, delta=delta: apply_delta(date, delta))
+
+
+def rebuild_rollups(start=None, end=None, order_model=Order,
+                    rollup_model=OrderDailyRollup):
+    """
+    Recalcula os agregados do intervalo [start, end] a partir dos pedidos.
+    Todos os contadores saem de um único GROUP BY por dia com agregações
+    condicionais; as linhas do intervalo são substituídas.
+    Retorna a quantidade de dias gravados.
+    
+    order_model/rollup_model permitem usar os modelos históricos em
+    migrações.
+    """
+    orders = order_model.objects.all()
+    if start is None or end is None:
+        bounds = orders.aggregate(first=Min('created_at'), last=Max('created_at'))
+        if bounds['first'] is None:
+            return 0
+        start = start or timezone.localdate(bounds['first'])
+        end = end or timezone.localdate(bounds['last'])
+    
+    status_choices = order_model._meta.get_field('status').choices
+    method_choices = order_model._meta.get_field('payment_method').choices
+    series = daily_series(
+        orders, 'created_at', start, end,
+        orders_count=Count('pk'),
+        paid_orders_count=count_if(payment_status='paid'),
+        revenue=sum_if('total', payment_status='paid'),
+        cancelled_count=count_if(status='cancelled'),
+        **choice_counts('status', status_choices, prefix='status_'),
+        **choice_counts('payment_method', method_choices, prefix='method_')
+    )
+    
+    rollups = []
+    for day in series:
+        if not day['orders_count']:
+            continue
+        rollups.append(rollup_model(
+            date=day['date'],
+            orders_count=day['orders_count'],
+            paid_orders_count=day['paid_orders_count'],
+            revenue=day['revenue'] or Decimal('0.00'),
+            cancelled_count=day['cancelled_count'],
+            status_counts={
+                value: day[f'status_{value}']
+                for value, _ in status_choices if day[f'status_{value}']
+            },
+            payment_method_counts={
+                value: day[f'method_{value}']
+                for value, _ in method_choices if day[f'method_{value}']
+            }
+        ))
+    
+    with transaction.atomic():
+        rollup_model.objects.filter(date__gte=start, date__lte=end).delete()
+        rollup_model.objects.bulk_create(rollups)
+    
+    return len(rollups)
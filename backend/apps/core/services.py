@@ -0,0 +1,160 @@
+"""
+Serviços de domínio do core para João Macarrão.
+Colocação de pedidos com reserva de estoque em uma única transação.
+"""
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, When
+from django.utils import timezone
+
+from .events import ORDER_CREATED, order_events
+from .menu_cache import update_menu_stock
+from .models import Dish, Order, OrderItem
+
+
+class OrderPlacementError(Exception):
+    """
+    Erro ao colocar um pedido.
+    Carrega uma mensagem por item com problema (prato inexistente,
+    indisponível ou com estoque insuficiente).
+    """
+    
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+class OrderPlacementService:
+    """
+    Serviço de colocação de pedidos.
+    
+    Todo o pedido é criado em uma transação com número constante de
+    queries, independente da quantidade de itens:
+    1. SELECT ... FOR UPDATE de todos os pratos (ordenados por id)
+    2. UPDATE condicional do estoque de todos os pratos
+    3. SELECT do estoque resultante (publicado no cache do cardápio)
+    4. INSERT do pedido já com os totais
+    5. INSERT em lote dos itens (bulk_create)
+    
+    A validação do serializer lê os pratos sem trava só para devolver os
+    erros por item mais cedo; disponibilidade, estoque e preço valem
+    sempre pelas linhas travadas no passo 1.
+    """
+    
+    @staticmethod
+    def _group_quantities(items):
+        """Soma as quantidades por prato, preservando a ordem dos itens"""
+        quantities = OrderedDict()
+        for item in items:
+            dish_id = item['dish_id']
+            quantities[dish_id] = quantities.get(dish_id, 0) + item['quantity']
+        return quantities
+    
+    @staticmethod
+    def validate_stock(dishes, quantities):
+        """Retorna a lista de erros por item para o snapshot de pratos"""
+        errors = []
+        for dish_id, quantity in quantities.items():
+            dish = dishes.get(dish_id)
+            if dish is None:
+                errors.append(f"Prato #{dish_id} não encontrado.")
+            elif not dish.available:
+                errors.append(f"O prato '{dish.name}' não está disponível.")
+            elif dish.stock < quantity:
+                errors.append(
+                    f"Estoque insuficiente para {dish.name}. "
+                    f"Solicitado: {quantity}, disponível: {dish.stock}"
+                )
+        return errors
+    
+    @classmethod
+    def place_order(cls, user, items, **order_data):
+        """
+        Cria um pedido e reserva o estoque dos pratos.
+        
+        Args:
+            user: cliente do pedido
+            items: lista de dicts com dish_id, quantity e notes (opcional)
+            **order_data: demais campos do Order (endereço, pagamento...)
+        
+        Returns:
+            Order criado
+        
+        Raises:
+            OrderPlacementError: com uma mensagem por item com problema
+        """
+        quantities = cls._group_quantities(items)
+        
+        with transaction.atomic():
+            # Trava todos os pratos em uma query, sempre na mesma ordem
+            # para evitar deadlocks entre checkouts concorrentes
+            dishes = Dish.objects.select_for_update().filter(
+                id__in=list(quantities)
+            ).order_by('id').in_bulk()
+            
+            errors = cls.validate_stock(dishes, quantities)
+            if errors:
+                raise OrderPlacementError(errors)
+            
+            cls._reserve_stock(quantities)
+            
+            # Monta itens e totais em uma única passada
+            order = Order(user=user, **order_data)
+            order_items = []
+            subtotal = Decimal('0.00')
+            for item in items:
+                dish = dishes[item['dish_id']]
+                item_subtotal = dish.price * item['quantity']
+                subtotal += item_subtotal
+                order_items.append(OrderItem(
+                    order=order,
+                    dish=dish,
+                    quantity=item['quantity'],
+                    unit_price=dish.price,
+                    subtotal=item_subtotal,
+                    notes=item.get('notes', '')
+                ))
+            
+            order.subtotal = subtotal
+            order.total = subtotal + order.delivery_fee
+            order.save()
+            OrderItem.objects.bulk_create(order_items)
+            order_events.publish(ORDER_CREATED, order, items_count=sum(quantities.values()))
+        
+        return order
+    
+    @classmethod
+    def _reserve_stock(cls, quantities):
+        """
+        Decrementa o estoque de todos os pratos em um único UPDATE.
+        Cada prato só é atualizado se ainda estiver disponível e com
+        estoque suficiente.
+        """
+        guard = Q()
+        for dish_id, quantity in quantities.items():
+            guard |= Q(id=dish_id, available=True, stock__gte=quantity)
+        
+        updated = Dish.objects.filter(guard).update(
+            stock=Case(
+                *[When(id=dish_id, then=F('stock') - quantity)
+                  for dish_id, quantity in quantities.items()],
+                output_field=IntegerField()
+            ),
+            updated_at=timezone.now()
+        )
+        
+        if updated != len(quantities):
+            # Algum prato foi desativado ou perdeu estoque entre a leitura e o UPDATE
+            dishes = Dish.objects.filter(id__in=list(quantities)).in_bulk()
+            raise OrderPlacementError(
+                cls.validate_stock(dishes, quantities) or
+                ['Estoque alterado durante o pedido. Tente novamente.']
+            )
+        
+        # Estoque aparece nas listagens públicas do cardápio. O cache só é
+        # invalidado quando algum prato esgota; nos demais casos apenas a
+        # contagem publicada é atualizada
+        stocks = dict(Dish.objects.filter(id__in=list(quantities)).values_list('id', 'stock'))
+        update_menu_stock(stocks, availability_changed=0 in stocks.values())
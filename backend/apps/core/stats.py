@@ -0,0 +1,68 @@
+"""
+Agregações condicionais para os painéis de João Macarrão.
+
+Cada contador é expresso como Count/Sum com filter=Q(...), de forma que
+todos os contadores de um modelo saem de um único aggregate(), e as
+séries diárias de um único GROUP BY por data.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def count_if(*args, **lookups):
+    """Count condicional: linhas que satisfazem os filtros"""
+    return Count('pk', filter=Q(*args, **lookups))
+
+
+def sum_if(field, *args, **lookups):
+    """Sum condicional de um campo"""
+    return Sum(field, filter=Q(*args, **lookups))
+
+
+def choice_counts(field, choices, prefix=''):
+    """
+    Um Count condicional por valor de choices.
+    Ex: choice_counts('status', Order.STATUS_CHOICES) ->
+        {'pending': Count(filter=Q(status='pending')), ...}
+    """
+    return {
+        f'{prefix}{value}': count_if(**{field: value})
+        for value, _ in choices
+    }
+
+
+def conditional_counts(queryset, **aggregates):
+    """
+    Executa todos os contadores em um único aggregate().
+    Somas sem linhas retornam None; contadores retornam 0.
+    """
+    return queryset.order_by().aggregate(**aggregates)
+
+
+def daily_series(queryset, date_field, start, end, **aggregates):
+    """
+    Série diária [start, end] com um único GROUP BY por data.
+    Dias sem linhas aparecem com os valores zerados.
+    
+    Returns:
+        lista de dicts {'date': date, <aggregate>: valor, ...}
+    """
+    rows = queryset.filter(**{
+        f'{date_field}__date__gte': start,
+        f'{date_field}__date__lte': end
+    }).annotate(
+        day=TruncDate(date_field)
+    ).order_by().values('day').annotate(**aggregates)
+    by_day = {row.pop('day'): row for row in rows}
+    
+    series = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        values = by_day.get(day, {})
+        series.append({
+            'date': day,
+            **{name: values.get(name) or 0 for name in aggregates}
+        })
+    return series
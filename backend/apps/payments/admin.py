@@ -3,7 +3,8 @@ Admin para pagamentos.
 João Macarrão - Sistema de Pagamentos
 """
 from django.contrib import admin
-from .models import Payment, PaymentWebhook
+from .models import Payment, PaymentJob, PaymentWebhook
+from .webhooks import replay
 
 
 @admin.register(Payment)
@@ -91,9 +92,12 @@ class PaymentWebhookAdmin(admin.ModelAdmin):
         'id',
         'provider',
         'event_type',
+        'event_id',
         'processed',
+        'attempts',
         'payment',
-        'created_at'
+        'created_at',
+        'processed_at'
     ]
     list_filter = [
         'provider',
@@ -104,6 +108,48 @@ class PaymentWebhookAdmin(admin.ModelAdmin):
     search_fields = [
         'provider',
         'event_type',
+        'event_id',
         'payment__id'
     ]
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'processed_at', 'attempts', 'error']
+    actions = ['replay_webhooks']
+    
+    def replay_webhooks(self, request, queryset):
+        """Devolve os webhooks à fila do worker"""
+        count = replay(queryset)
+        self.message_user(request, f'{count} webhook(s) devolvido(s) à fila.')
+    replay_webhooks.short_description = 'Reprocessar webhooks selecionados'
+
+
+@admin.register(PaymentJob)
+class PaymentJobAdmin(admin.ModelAdmin):
+    """
+    Admin para PaymentJob.
+    """
+    list_display = [
+        'id',
+        'payment',
+        'kind',
+        'status',
+        'attempts',
+        'run_after',
+        'created_at'
+    ]
+    list_filter = [
+        'kind',
+        'status',
+        'created_at'
+    ]
+    search_fields = [
+        'payment__id',
+        'idempotency_key'
+    ]
+    readonly_fields = [
+        'idempotency_key',
+        'result',
+        'last_error',
+        'locked_at',
+        'created_at',
+        'updated_at',
+        'finished_at'
+    ]
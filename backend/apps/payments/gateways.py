@@ -0,0 +1,388 @@
+"""
+Clientes dos gateways de pagamento para João Macarrão.
+
+Cada provedor tem um único cliente por processo, criado na primeira
+chamada e reutilizado por todas as requisições e threads. Os clientes
+compartilham uma sessão HTTP com pool de conexões keep-alive (evita um
+handshake TLS por pagamento), usam o timeout de PAYMENT_GATEWAY_TIMEOUT
+e passam por um circuit breaker: após falhas seguidas o provedor fica
+indisponível por alguns segundos e as chamadas falham na hora, sem
+prender threads do gunicorn ou do worker esperando o timeout.
+
+Uso:
+    gateway = get_gateway('stripe')
+    intent = gateway.call(lambda client: client.payment_intents.create(params=...))
+"""
+import random
+import threading
+import time
+
+import mercadopago
+import requests
+import stripe
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from mercadopago.config import RequestOptions
+from mercadopago.http import HttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+
+class GatewayUnavailable(Exception):
+    """Gateway não configurado ou com o circuito aberto"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por provedor (por processo).
+    
+    - fechado: chamadas passam; falhas seguidas são contadas
+    - aberto: após `failure_threshold` falhas, recusa chamadas por
+      `reset_timeout` segundos
+    - meio-aberto: passado o tempo, deixa uma chamada de teste passar;
+      sucesso fecha o circuito, falha o abre de novo
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+    
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+    
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def before_call(self):
+        """Levanta GatewayUnavailable se a chamada não deve ser feita"""
+        with self._lock:
+            state = self._state()
+            if state == self.OPEN or (state == self.HALF_OPEN and self._probing):
+                raise GatewayUnavailable(f'Gateway {self.name} indisponível (circuito aberto)')
+            if state == self.HALF_OPEN:
+                self._probing = True
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+    
+    def stats(self):
+        with self._lock:
+            return {'state': self._state(), 'failures': self._failures}
+
+
+def build_session(max_retries=None):
+    """Sessão HTTP com pool de conexões keep-alive e retry em erros transitórios"""
+    pool_size = getattr(settings, 'PAYMENT_HTTP_POOL_SIZE', 10)
+    if max_retries is None:
+        max_retries = getattr(settings, 'PAYMENT_GATEWAY_MAX_RETRIES', 2)
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET']
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class PooledHttpClient(HttpClient):
+    """
+    HttpClient do SDK do Mercado Pago usando uma sessão compartilhada.
+    O cliente padrão abre uma sessão (e uma conexão TLS) por chamada.
+    """
+    
+    def __init__(self, session):
+        self.session = session
+    
+    def request(self, method, url, maxretries=None, **kwargs):
+        api_result = self.session.request(method, url, **kwargs)
+        return {
+            'status': api_result.status_code,
+            'response': api_result.json()
+        }
+
+
+class BaseGateway:
+    """
+    Provedor de pagamento registrado em GATEWAYS.
+    Subclasses implementam build_client() e, opcionalmente, is_failure().
+    """
+    
+    name = None
+    
+    def __init__(self):
+        self.timeout = float(getattr(settings, 'PAYMENT_GATEWAY_TIMEOUT', 10))
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_threshold=getattr(settings, 'PAYMENT_CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'PAYMENT_CIRCUIT_RESET_TIMEOUT', 30)
+        )
+        self._client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def configured(self):
+        return True
+    
+    @property
+    def client(self):
+        """Cliente do provedor, criado uma única vez por processo"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.configured:
+                        raise GatewayUnavailable(f'Gateway {self.name} não configurado')
+                    self._client = self.build_client()
+        return self._client
+    
+    def build_client(self):
+        raise NotImplementedError
+    
+    def fetch_status(self, payment):
+        """
+        Consulta o status do pagamento no provedor.
+        Não acessa o banco (pode rodar em threads do ThreadPoolExecutor).
+        
+        Returns:
+            status local equivalente ('completed', 'failed', 'cancelled')
+            ou None se ainda não há decisão
+        """
+        raise NotImplementedError
+    
+    def is_failure(self, error):
+        """Indica se o erro conta para o circuit breaker (falha do gateway, não do pedido)"""
+        return True
+    
+    def call(self, operation):
+        """
+        Executa operation(client) protegida pelo circuit breaker.
+        Erros de negócio (ex: cartão recusado) não abrem o circuito.
+        """
+        self.breaker.before_call()
+        try:
+            result = operation(self.client)
+        except Exception as e:
+            if self.is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+    
+    def stats(self):
+        return {'configured': self.configured, **self.breaker.stats()}
+
+
+class StripeGateway(BaseGateway):
+    """Stripe via StripeClient (sem alterar o stripe.api_key global)"""
+    
+    name = 'stripe'
+    
+    @property
+    def configured(self):
+        return bool(getattr(settings, 'STRIPE_SECRET_KEY', None))
+    
+    def build_client(self):
+        return stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            # O StripeClient já repete as chamadas (com a mesma idempotency key)
+            http_client=stripe.RequestsClient(timeout=self.timeout, session=build_session(max_retries=0)),
+            max_network_retries=getattr(settings, 'PAYMENT_GATEWAY_MAX_RETRIES', 2)
+        )
+    
+    def fetch_status(self, payment):
+        if not payment.payment_intent_id:
+            return None
+        intent = self.call(lambda client: client.payment_intents.retrieve(payment.payment_intent_id))
+        if intent.status == 'succeeded':
+            return 'completed'
+        if intent.status == 'canceled':
+            return 'cancelled'
+        if intent.status == 'requires_payment_method' and intent.get('last_payment_error'):
+            return 'failed'
+        return None
+    
+    def is_failure(self, error):
+        return isinstance(error, (
+            stripe.APIConnectionError,
+            stripe.APIError,
+            stripe.RateLimitError,
+            stripe.AuthenticationError
+        ))
+
+
+class MercadoPagoGateway(BaseGateway):
+    """Mercado Pago via SDK oficial com sessão HTTP compartilhada"""
+    
+    name = 'mercadopago'
+    
+    @property
+    def configured(self):
+        return bool(getattr(settings, 'MERCADOPAGO_ACCESS_TOKEN', None))
+    
+    def request_options(self, **custom_headers):
+        """RequestOptions com o timeout configurado (e headers extras)"""
+        return RequestOptions(
+            access_token=settings.MERCADOPAGO_ACCESS_TOKEN,
+            connection_timeout=self.timeout,
+            custom_headers=custom_headers or None,
+            max_retries=0
+        )
+    
+    def build_client(self):
+        return mercadopago.SDK(
+            settings.MERCADOPAGO_ACCESS_TOKEN,
+            http_client=PooledHttpClient(build_session()),
+            request_options=self.request_options()
+        )
+    
+    # Status do Mercado Pago -> status local
+    STATUS_MAP = {
+        'approved': 'completed',
+        'rejected': 'failed',
+        'cancelled': 'cancelled',
+    }
+    
+    def fetch_status(self, payment):
+        response = self.call(lambda sdk: sdk.payment().search({
+            'external_reference': str(payment.id),
+            'sort': 'date_created',
+            'criteria': 'desc'
+        }))
+        results = response['response'].get('results', [])
+        statuses = [result.get('status') for result in results]
+        if 'approved' in statuses:
+            return 'completed'
+        return self.STATUS_MAP.get(statuses[0]) if statuses else None
+    
+    def call(self, operation):
+        """Respostas 5xx e 429 do SDK (que não levanta exceção) contam como falha"""
+        def checked(client):
+            response = operation(client)
+            if isinstance(response, dict) and (response.get('status') or 0) in (429, 500, 502, 503, 504):
+                raise GatewayUnavailable(f'Mercado Pago respondeu {response["status"]}')
+            return response
+        return super().call(checked)
+
+
+class FakeGateway(BaseGateway):
+    """
+    Gateway falso para desenvolvimento e testes (PAYMENT_GATEWAY_FAKE=True).
+    
+    Simula a latência e as falhas de um gateway real sem acesso à rede,
+    configuráveis por PAYMENT_FAKE_GATEWAY_LATENCY (segundos) e
+    PAYMENT_FAKE_GATEWAY_FAILURE_RATE (0 a 1). Na conciliação, todos os
+    pagamentos assumem o status PAYMENT_FAKE_GATEWAY_STATUS; o padrão
+    'pending' não decide nada, então um gateway falso ativo por engano
+    não conclui pagamentos reais.
+    """
+    
+    name = 'fake'
+    
+    def build_client(self):
+        return self
+    
+    def _simulate(self):
+        latency = getattr(settings, 'PAYMENT_FAKE_GATEWAY_LATENCY', 0)
+        if latency:
+            time.sleep(latency)
+        if random.random() < getattr(settings, 'PAYMENT_FAKE_GATEWAY_FAILURE_RATE', 0):
+            raise GatewayUnavailable('Gateway falso: falha simulada')
+    
+    def create_charge(self, payment, idempotency_key=None):
+        """Cria uma cobrança simulada com id derivado da chave de idempotência"""
+        self.call(lambda client: client._simulate())
+        
+        transaction_id = f"fake_{idempotency_key or payment.id}"
+        payment.transaction_id = transaction_id
+        payment.status = 'processing'
+        payment.save(update_fields=['transaction_id', 'status', 'updated_at'])
+        
+        return {
+            'payment_id': payment.id,
+            'transaction_id': transaction_id,
+            'amount': payment.amount
+        }
+    
+    def fetch_status(self, payment):
+        self.call(lambda client: client._simulate())
+        status = getattr(settings, 'PAYMENT_FAKE_GATEWAY_STATUS', 'pending')
+        return None if status in (None, '', 'pending') else status
+
+
+GATEWAYS = {
+    StripeGateway.name: StripeGateway,
+    MercadoPagoGateway.name: MercadoPagoGateway,
+    FakeGateway.name: FakeGateway,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register_gateway(gateway_class):
+    """Registra (ou substitui) um provedor; descarta a instância anterior"""
+    with _instances_lock:
+        GATEWAYS[gateway_class.name] = gateway_class
+        _instances.pop(gateway_class.name, None)
+    return gateway_class
+
+
+def get_gateway(name):
+    """Instância única do provedor neste processo"""
+    gateway = _instances.get(name)
+    if gateway is None:
+        with _instances_lock:
+            gateway = _instances.get(name)
+            if gateway is None:
+                gateway = _instances[name] = GATEWAYS[name]()
+    return gateway
+
+
+def reset_gateways():
+    """Descarta os clientes (ex: após alterar credenciais nos settings)"""
+    with _instances_lock:
+        _instances.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting.startswith(('PAYMENT_', 'STRIPE_', 'MERCADOPAGO_')):
+        reset_gateways()
+
+
+def gateway_stats():
+    """Estado dos provedores já inicializados neste processo"""
+    with _instances_lock:
+        instances = dict(_instances)
+    return {name: gateway.stats() for name, gateway in instances.items()}
@@ -0,0 +1,166 @@
+"""
+Fila de tarefas de pagamento para João Macarrão.
+
+As chamadas aos gateways (Stripe, Mercado Pago) são gravadas como
+PaymentJob e executadas pelo comando run_payment_worker, fora dos
+workers do gunicorn. A fila usa o próprio banco: cada worker reserva
+tarefas com SELECT ... FOR UPDATE SKIP LOCKED, então vários workers
+podem rodar em paralelo sem pegar a mesma tarefa.
+
+Falhas são repetidas com backoff exponencial até PAYMENT_JOB_MAX_ATTEMPTS;
+tarefas presas em 'running' (worker encerrado no meio) voltam para a
+fila após PAYMENT_JOB_LOCK_TIMEOUT segundos.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import InvalidPaymentTransition, Payment, PaymentJob
+from .services import PaymentService
+
+
+logger = logging.getLogger(__name__)
+
+
+CREATE_CHARGE = 'create_charge'
+
+
+def is_async():
+    """Indica se as cobranças devem ser criadas pelo worker"""
+    return getattr(settings, 'PAYMENT_JOBS_ASYNC', False)
+
+
+def enqueue_charge(payment):
+    """
+    Agenda a criação da cobrança no gateway.
+    Idempotente: chamar de novo para o mesmo pagamento retorna a mesma tarefa.
+    """
+    job, _ = PaymentJob.objects.get_or_create(
+        idempotency_key=f'{CREATE_CHARGE}:{payment.id}',
+        defaults={
+            'payment': payment,
+            'kind': CREATE_CHARGE,
+            'max_attempts': getattr(settings, 'PAYMENT_JOB_MAX_ATTEMPTS', 5),
+            'run_after': timezone.now()
+        }
+    )
+    return job
+
+
+def backoff_delay(attempts):
+    """Espera (em segundos) antes da próxima tentativa, com jitter de ±20%"""
+    base = getattr(settings, 'PAYMENT_JOB_BACKOFF_BASE', 5)
+    maximum = getattr(settings, 'PAYMENT_JOB_BACKOFF_MAX', 300)
+    delay = min(base * 2 ** max(attempts - 1, 0), maximum)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_jobs(limit=10):
+    """
+    Reserva até `limit` tarefas prontas para execução.
+    
+    A reserva é uma transação curta (SELECT FOR UPDATE SKIP LOCKED +
+    UPDATE); a chamada ao gateway acontece depois, sem lock no banco.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'PAYMENT_JOB_LOCK_TIMEOUT', 300))
+    
+    with transaction.atomic():
+        jobs = list(
+            PaymentJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status='queued', run_after__lte=now) |
+                Q(status='running', locked_at__lt=stale)
+            ).order_by('run_after', 'id')[:limit]
+        )
+        if jobs:
+            PaymentJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status='running',
+                locked_at=now,
+                attempts=F('attempts') + 1,
+                updated_at=now
+            )
+    
+    for job in jobs:
+        job.status = 'running'
+        job.locked_at = now
+        job.attempts += 1
+    return jobs
+
+
+def _run_create_charge(job):
+    payment = Payment.objects.select_related('order', 'user').get(pk=job.payment_id)
+    if payment.status not in ('pending', 'processing'):
+        # Pagamento concluído ou cancelado antes de a tarefa rodar
+        return {'payment_id': payment.id, 'skipped': payment.status}
+    return PaymentService.create_charge(payment, idempotency_key=job.idempotency_key)
+
+
+JOB_HANDLERS = {
+    CREATE_CHARGE: _run_create_charge,
+}
+
+
+def run_job(job):
+    """
+    Executa uma tarefa reservada por claim_jobs.
+    
+    Returns:
+        True se concluída, False se falhou (reagendada ou definitiva)
+    """
+    handler = JOB_HANDLERS[job.kind]
+    try:
+        result = handler(job)
+    except Exception as e:
+        _handle_failure(job, e)
+        return False
+    
+    job.status = 'succeeded'
+    job.result = result
+    job.last_error = None
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'last_error', 'locked_at', 'finished_at', 'updated_at'])
+    return True
+
+
+def _handle_failure(job, error):
+    job.last_error = str(error)
+    job.locked_at = None
+    
+    if job.attempts >= job.max_attempts:
+        logger.error('Tarefa de pagamento %s falhou após %s tentativas: %s', job.pk, job.attempts, error)
+        job.status = 'failed'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'last_error', 'locked_at', 'finished_at', 'updated_at'])
+        try:
+            job.payment.mark_as_failed(str(error))
+        except InvalidPaymentTransition:
+            # Pagamento concluído por outro caminho (ex: webhook) nesse meio tempo
+            pass
+        return
+    
+    delay = backoff_delay(job.attempts)
+    logger.warning(
+        'Tarefa de pagamento %s falhou (tentativa %s), nova tentativa em %.0fs: %s',
+        job.pk, job.attempts, delay, error
+    )
+    job.status = 'queued'
+    job.run_after = timezone.now() + timedelta(seconds=delay)
+    job.save(update_fields=['status', 'last_error', 'locked_at', 'run_after', 'updated_at'])
+
+
+def job_status(job):
+    """Representação da tarefa para o endpoint de acompanhamento"""
+    return {
+        'job_id': job.id,
+        'payment_id': job.payment_id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'data': job.result if job.status == 'succeeded' else None,
+        'error': job.last_error if job.status == 'failed' else None
+    }
@@ -0,0 +1,67 @@
+"""
+Move os QR Codes PIX em base64 do banco para o storage de mídia.
+Uso: python manage.py migrate_pix_qr_codes [--batch-size N] [--dry-run]
+"""
+import base64
+import binascii
+import hashlib
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.payments.models import Payment
+from apps.payments.qrcodes import payload_digest, qr_code_store
+
+
+class Command(BaseCommand):
+    help = 'Grava os QR Codes PIX armazenados em base64 no storage e mantém apenas a URL'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Pagamentos por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta os pagamentos afetados')
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        payments = Payment.objects.exclude(
+            Q(pix_qr_code__isnull=True) | Q(pix_qr_code='')
+        ).only('id', 'pix_qr_code', 'pix_copy_paste').order_by('id')
+        
+        if options['dry_run']:
+            self.stdout.write(f'{payments.count()} pagamento(s) com QR Code no banco')
+            return
+        
+        moved = invalid = 0
+        batch = []
+        for payment in payments.iterator(chunk_size=batch_size):
+            raw = payment.pix_qr_code.split(',', 1)[-1]  # aceita data:image/png;base64,...
+            try:
+                content = base64.b64decode(raw, validate=True)
+            except (binascii.Error, ValueError):
+                invalid += 1
+                self.stderr.write(f'  Pagamento #{payment.id}: base64 inválido, mantido no banco')
+                continue
+            
+            # Mesma chave usada na geração quando o payload é conhecido
+            if payment.pix_copy_paste:
+                digest = payload_digest(payment.pix_copy_paste)
+            else:
+                digest = hashlib.sha256(content).hexdigest()
+            
+            qr_code_store.save(digest, content)
+            payment.pix_qr_code = None
+            payment.pix_qr_code_url = qr_code_store.url_for(digest)
+            batch.append(payment)
+            
+            if len(batch) >= batch_size:
+                moved += self._flush(batch)
+                batch = []
+        
+        moved += self._flush(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} QR Code(s) movido(s) para o storage, {invalid} inválido(s)'
+        ))
+    
+    @staticmethod
+    def _flush(batch):
+        Payment.objects.bulk_update(batch, ['pix_qr_code', 'pix_qr_code_url'])
+        return len(batch)
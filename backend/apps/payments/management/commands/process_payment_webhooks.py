@@ -0,0 +1,36 @@
+"""
+Esvazia a fila de webhooks de pagamento e mostra as métricas da fila.
+Uso: python manage.py process_payment_webhooks [--batch-size N] [--stats]
+
+Útil para drenar um acúmulo (ex: worker parado) sem esperar o
+run_payment_worker. Webhooks com nova tentativa agendada para o futuro
+não são antecipados; use replay_payment_webhooks para isso.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.payments.webhooks import claim_webhooks, process_webhook, webhook_metrics
+
+
+class Command(BaseCommand):
+    help = 'Processa os webhooks de pagamento pendentes e mostra o atraso da fila'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Webhooks reservados por vez (padrão: 50)')
+        parser.add_argument('--stats', action='store_true', help='Apenas mostra as métricas, sem processar')
+    
+    def handle(self, *args, **options):
+        if not options['stats']:
+            processed = failed = 0
+            while True:
+                webhooks = claim_webhooks(options['batch_size'])
+                if not webhooks:
+                    break
+                for webhook in webhooks:
+                    if process_webhook(webhook):
+                        processed += 1
+                    else:
+                        failed += 1
+            self.stdout.write(self.style.SUCCESS(f'{processed} webhook(s) processado(s), {failed} com falha'))
+        
+        for name, value in webhook_metrics().items():
+            self.stdout.write(f'{name}: {value}')
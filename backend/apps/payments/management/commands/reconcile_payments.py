@@ -0,0 +1,45 @@
+"""
+Concilia pagamentos parados em 'processing' com os gateways.
+Uso: python manage.py reconcile_payments [--older-than MIN] [--batch-size N] [--concurrency N] [--limit N] [--dry-run]
+
+Agende (ex: a cada 15 minutos) para recuperar pagamentos cujo webhook
+não chegou. Com PAYMENT_GATEWAY_FAKE=True consulta o gateway falso.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.payments.reconciliation import reconcile_stale_payments
+
+
+class Command(BaseCommand):
+    help = 'Consulta os gateways e atualiza pagamentos parados em processing'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int,
+            default=getattr(settings, 'PAYMENT_RECONCILE_AFTER_MINUTES', 15),
+            help='Minutos sem atualização para considerar o pagamento parado'
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help='Pagamentos por lote (padrão: 100)')
+        parser.add_argument('--concurrency', type=int, help='Consultas simultâneas aos gateways')
+        parser.add_argument('--limit', type=int, help='Máximo de pagamentos verificados')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas consulta, sem alterar')
+    
+    def handle(self, *args, **options):
+        summary = reconcile_stale_payments(
+            older_than=timedelta(minutes=options['older_than']),
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            limit=options['limit'],
+            dry_run=options['dry_run']
+        )
+        
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{summary['checked']} verificado(s): "
+            f"{summary['completed']} completo(s), {summary['failed']} falho(s), "
+            f"{summary['cancelled']} cancelado(s), {summary['unchanged']} sem alteração, "
+            f"{summary['skipped']} ignorado(s), {summary['errors']} erro(s)"
+        ))
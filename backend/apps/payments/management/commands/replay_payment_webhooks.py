@@ -0,0 +1,48 @@
+"""
+Devolve webhooks de pagamento à fila para novo processamento.
+Uso: python manage.py replay_payment_webhooks [--id ID ...] [--provider P] [--since AAAA-MM-DD] [--exhausted] [--dry-run]
+
+Sem filtros, reenfileira apenas os webhooks que esgotaram as tentativas.
+O processamento é feito pelo run_payment_worker (ou process_payment_webhooks).
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.payments.models import PaymentWebhook
+from apps.payments.webhooks import max_attempts, replay
+
+
+class Command(BaseCommand):
+    help = 'Reenfileira webhooks de pagamento (por id, provedor, data ou esgotados)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--id', type=int, nargs='+', dest='webhook_ids', help='IDs dos webhooks')
+        parser.add_argument('--provider', choices=['stripe', 'mercadopago'], help='Apenas deste provedor')
+        parser.add_argument('--since', help='Recebidos a partir da data (AAAA-MM-DD)')
+        parser.add_argument('--exhausted', action='store_true', help='Apenas os que esgotaram as tentativas')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta, sem alterar')
+    
+    def handle(self, *args, **options):
+        webhooks = PaymentWebhook.objects.all()
+        
+        if options['webhook_ids']:
+            webhooks = webhooks.filter(pk__in=options['webhook_ids'])
+        if options['provider']:
+            webhooks = webhooks.filter(provider=options['provider'])
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since deve estar no formato AAAA-MM-DD')
+            webhooks = webhooks.filter(created_at__gte=timezone.make_aware(since))
+        if options['exhausted'] or not (options['webhook_ids'] or options['provider'] or options['since']):
+            webhooks = webhooks.filter(processed=False, attempts__gte=max_attempts())
+        
+        if options['dry_run']:
+            self.stdout.write(f'{webhooks.count()} webhook(s) seriam reenfileirados')
+            return
+        
+        count = replay(webhooks)
+        self.stdout.write(self.style.SUCCESS(f'{count} webhook(s) reenfileirado(s)'))
@@ -0,0 +1,102 @@
+"""
+Worker da fila de pagamentos (PaymentJob) e dos webhooks recebidos.
+Uso: python manage.py run_payment_worker [--batch-size N] [--poll-interval S]
+                                          [--reconcile-interval S] [--once]
+
+Roda como processo separado do gunicorn (linha `worker` do Procfile).
+Vários workers podem rodar em paralelo: as tarefas são reservadas com
+SKIP LOCKED. SIGTERM/SIGINT encerram após a tarefa em andamento.
+
+A cada PAYMENT_RECONCILE_INTERVAL segundos o worker também concilia os
+pagamentos parados em 'processing' (apps.payments.reconciliation), para
+que a consulta aos gateways nunca aconteça em uma requisição.
+
+Os eventos de pagamento (payment.completed/status_changed) publicados
+aqui chegam ao stream da cozinha nos workers web apenas com um backend
+de eventos compartilhado (ORDER_EVENTS_BACKEND, banco por padrão).
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.events import order_events
+from apps.payments.jobs import claim_jobs, run_job
+from apps.payments.reconciliation import reconcile_stale_payments
+from apps.payments.webhooks import claim_webhooks, process_webhook
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas de pagamento e processa os webhooks pendentes'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Tarefas reservadas por vez (padrão: 10)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Espera em segundos quando a fila está vazia (padrão: 1)')
+        parser.add_argument(
+            '--reconcile-interval',
+            type=float,
+            default=getattr(settings, 'PAYMENT_RECONCILE_INTERVAL', 60),
+            help='Segundos entre conciliações dos pagamentos parados (0 desativa; padrão: PAYMENT_RECONCILE_INTERVAL)'
+        )
+        parser.add_argument('--once', action='store_true', help='Processa a fila uma vez e encerra')
+    
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        
+        if not order_events.shared:
+            self.stderr.write(self.style.WARNING(
+                'ORDER_EVENTS_BACKEND é por processo: os eventos de pagamento deste '
+                'worker não chegarão ao stream da cozinha. Use '
+                'apps.core.events.DatabaseEventBackend.'
+            ))
+        
+        succeeded = failed = processed = webhook_failures = reconciled = 0
+        last_reconcile = None
+        while not self._stopping:
+            close_old_connections()
+            interval = options['reconcile_interval']
+            if interval and (last_reconcile is None or time.monotonic() - last_reconcile >= interval):
+                last_reconcile = time.monotonic()
+                reconciled += self._reconcile()
+            
+            jobs = claim_jobs(options['batch_size'])
+            for job in jobs:
+                if run_job(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+            
+            webhooks = claim_webhooks(options['batch_size'])
+            for webhook in webhooks:
+                if process_webhook(webhook):
+                    processed += 1
+                else:
+                    webhook_failures += 1
+            
+            idle = not jobs and not webhooks
+            if options['once'] and idle:
+                break
+            if idle:
+                time.sleep(options['poll_interval'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{succeeded} tarefa(s) concluída(s), {failed} com falha; '
+            f'{processed} webhook(s) processado(s), {webhook_failures} com falha; '
+            f'{reconciled} pagamento(s) conciliado(s)'
+        ))
+    
+    def _reconcile(self):
+        """Concilia os pagamentos parados; falhas não derrubam o worker"""
+        try:
+            summary = reconcile_stale_payments()
+        except Exception as e:
+            self.stderr.write(self.style.WARNING(f'Conciliação falhou: {e}'))
+            return 0
+        return summary['completed'] + summary['failed'] + summary['cancelled']
+    
+    def _stop(self, signum, frame):
+        self._stopping = True
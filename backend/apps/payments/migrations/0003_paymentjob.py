@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 00:34
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('create_charge', 'Criar cobrança')], max_length=30, verbose_name='Tipo')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True, verbose_name='Chave de Idempotência')),
+                ('status', models.CharField(choices=[('queued', 'Na fila'), ('running', 'Executando'), ('succeeded', 'Concluída'), ('failed', 'Falhou')], default='queued', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='Máximo de Tentativas')),
+                ('run_after', models.DateTimeField(verbose_name='Executar a partir de')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Reservada em')),
+                ('result', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Resultado')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='Último Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizada em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finalizada em')),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='payments.payment', verbose_name='Pagamento')),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Pagamento',
+                'verbose_name_plural': 'Tarefas de Pagamento',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='payment_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-18 00:35
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_legacy_webhooks_processed(apps, schema_editor):
+    # Webhooks antigos já foram tratados na própria requisição; sem isto o
+    # consumidor reprocessaria todo o histórico
+    PaymentWebhook = apps.get_model('payments', 'PaymentWebhook')
+    PaymentWebhook.objects.filter(processed=False).update(
+        processed=True,
+        processed_at=F('created_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_paymentjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Tentativas'),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='error',
+            field=models.TextField(blank=True, null=True, verbose_name='Erro'),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='event_id',
+            field=models.CharField(blank=True, help_text='ID do evento no provedor (deduplica reenvios)', max_length=255, null=True, verbose_name='ID do Evento'),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa em'),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Processado em'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentwebhook',
+            index=models.Index(fields=['processed', 'next_attempt_at'], name='payment_webhook_queue_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentwebhook',
+            constraint=models.UniqueConstraint(fields=('provider', 'event_id'), name='payment_webhook_event_uniq'),
+        ),
+        migrations.RunPython(mark_legacy_webhooks_processed, migrations.RunPython.noop),
+    ]
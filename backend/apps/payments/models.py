@@ -2,12 +2,19 @@
 Modelos de pagamento para João Macarrão.
 Sistema de pagamento com múltiplos métodos (Pix, Stripe, Mercado Pago).
 """
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from apps.core.events import PAYMENT_COMPLETED, PAYMENT_STATUS_CHANGED, order_events
 from apps.core.models import Order
 from decimal import Decimal
 
 
+class InvalidPaymentTransition(Exception):
+    """Mudança de status de pagamento não permitida"""
+
+
 class Payment(models.Model):
     """
     Modelo de Pagamento.
@@ -30,6 +37,24 @@ class Payment(models.Model):
         ('cancelled', 'Cancelado'),
     ]
     
+    # Transições de status permitidas (origem -> destinos)
+    ALLOWED_TRANSITIONS = {
+        'pending': {'processing', 'completed', 'failed', 'cancelled'},
+        'processing': {'completed', 'failed', 'cancelled'},
+        'failed': {'processing', 'completed', 'cancelled'},
+        'completed': {'refunded'},
+        'refunded': set(),
+        'cancelled': set(),
+    }
+    
+    # Status do pagamento -> payment_status do pedido
+    ORDER_PAYMENT_STATUS = {
+        'completed': 'paid',
+        'failed': 'failed',
+        'refunded': 'refunded',
+        'cancelled': 'cancelled',
+    }
+    
     PAYMENT_PROVIDER_CHOICES = [
         ('stripe', 'Stripe'),
         ('mercadopago', 'Mercado Pago'),
@@ -151,32 +176,99 @@ class Payment(models.Model):
         verbose_name = 'Pagamento'
         verbose_name_plural = 'Pagamentos'
         ordering = ['-created_at']
+        indexes = [
+            # Paginação por cursor (-created_at, -id) e histórico por usuário
+            models.Index(fields=['-created_at', '-id'], name='payment_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='payment_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"Pagamento #{self.id} - Pedido #{self.order.id} - {self.get_status_display()}"
     
-    def mark_as_completed(self):
-        """Marca pagamento como completo e atualiza pedido"""
-        from django.utils import timezone
+    def transition_to(self, status, error_message=None, transaction_id=None):
+        """
+        Muda o status do pagamento e o payment_status do pedido.
         
-        self.status = 'completed'
-        self.completed_at = timezone.now()
-        self.save()
+        Em uma transação curta: trava o pagamento, valida a transição e
+        grava apenas as colunas alteradas (UPDATE em payments e orders,
+        sem reescrever metadata nem recarregar o pedido). O agregado
+        diário é ajustado e um único evento de domínio é publicado.
         
-        # Atualiza status do pagamento no pedido
-        self.order.payment_status = 'paid'
-        self.order.save()
+        Returns:
+            True se o status mudou, False se o pagamento já estava nele
+            (ex: webhook repetido)
+        
+        Raises:
+            InvalidPaymentTransition: transição não permitida
+        """
+        from apps.core.rollups import TRACKED_FIELDS, record_order_change
+        
+        now = timezone.now()
+        with transaction.atomic():
+            current = Payment.objects.select_for_update().filter(
+                pk=self.pk
+            ).values_list('status', flat=True).get()
+            if current == status:
+                self.status = current
+                return False
+            if status not in self.ALLOWED_TRANSITIONS[current]:
+                raise InvalidPaymentTransition(
+                    f'Pagamento #{self.pk}: transição de {current} para {status} não permitida'
+                )
+            
+            fields = {'status': status, 'updated_at': now}
+            if status == 'completed':
+                fields['completed_at'] = now
+            if error_message:
+                fields['error_message'] = error_message
+            if transaction_id:
+                fields['transaction_id'] = transaction_id
+            Payment.objects.filter(pk=self.pk).update(**fields)
+            for field, value in fields.items():
+                setattr(self, field, value)
+            
+            order = Order.objects.select_for_update().filter(
+                pk=self.order_id
+            ).values('id', 'created_at', *TRACKED_FIELDS).get()
+            order_payment_status = self.ORDER_PAYMENT_STATUS.get(status)
+            if order_payment_status and order_payment_status != order['payment_status']:
+                Order.objects.filter(pk=self.order_id).update(
+                    payment_status=order_payment_status,
+                    updated_at=now
+                )
+                previous = {field: order[field] for field in TRACKED_FIELDS}
+                record_order_change(
+                    order['created_at'],
+                    previous,
+                    {**previous, 'payment_status': order_payment_status}
+                )
+                order['payment_status'] = order_payment_status
+                if Payment.order.is_cached(self):
+                    self.order.payment_status = order_payment_status
+                    self.order.updated_at = now
+            
+            order_events.publish(
+                PAYMENT_COMPLETED if status == 'completed' else PAYMENT_STATUS_CHANGED,
+                Order(
+                    id=order['id'],
+                    status=order['status'],
+                    payment_status=order['payment_status'],
+                    total=order['total']
+                ),
+                payment_id=str(self.pk),
+                payment_method=self.payment_method,
+                new_payment_status=status,
+                old_payment_status=current
+            )
+        return True
+    
+    def mark_as_completed(self, transaction_id=None):
+        """Marca pagamento como completo e atualiza pedido"""
+        return self.transition_to('completed', transaction_id=transaction_id)
     
     def mark_as_failed(self, error_message=None):
         """Marca pagamento como falho"""
-        self.status = 'failed'
-        if error_message:
-            self.error_message = error_message
-        self.save()
-        
-        # Atualiza status do pagamento no pedido
-        self.order.payment_status = 'failed'
-        self.order.save()
+        return self.transition_to('failed', error_message=error_message)
 
 
 class PaymentWebhook(models.Model):
@@ -196,10 +288,35 @@ class PaymentWebhook(models.Model):
     payload = models.JSONField(
         verbose_name='Dados do Webhook'
     )
+    event_id = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        verbose_name='ID do Evento',
+        help_text='ID do evento no provedor (deduplica reenvios)'
+    )
     processed = models.BooleanField(
         default=False,
         verbose_name='Processado'
     )
+    processed_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Processado em'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Tentativas'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próxima tentativa em'
+    )
+    error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Erro'
+    )
     payment = models.ForeignKey(
         Payment,
         on_delete=models.SET_NULL,
@@ -217,6 +334,111 @@ class PaymentWebhook(models.Model):
         verbose_name = 'Webhook de Pagamento'
         verbose_name_plural = 'Webhooks de Pagamento'
         ordering = ['-created_at']
+        constraints = [
+            # Reenvios do mesmo evento são descartados na inserção
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='payment_webhook_event_uniq'),
+        ]
+        indexes = [
+            # Busca do consumidor: webhooks pendentes prontos para processar
+            models.Index(fields=['processed', 'next_attempt_at'], name='payment_webhook_queue_idx'),
+        ]
     
     def __str__(self):
         return f"{self.provider} - {self.event_type} - {self.created_at}"
+
+
+class PaymentJob(models.Model):
+    """
+    Tarefa assíncrona de pagamento (fila no próprio banco).
+    
+    Chamadas aos gateways saem do ciclo da requisição e são executadas
+    pelo comando run_payment_worker. A idempotency_key é única por tarefa
+    e também é enviada ao gateway, então repetir uma tarefa nunca cria
+    uma segunda cobrança.
+    """
+    
+    KIND_CHOICES = [
+        ('create_charge', 'Criar cobrança'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('queued', 'Na fila'),
+        ('running', 'Executando'),
+        ('succeeded', 'Concluída'),
+        ('failed', 'Falhou'),
+    ]
+    
+    payment = models.ForeignKey(
+        Payment,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        verbose_name='Pagamento'
+    )
+    kind = models.CharField(
+        max_length=30,
+        choices=KIND_CHOICES,
+        verbose_name='Tipo'
+    )
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Chave de Idempotência'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        verbose_name='Status'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Tentativas'
+    )
+    max_attempts = models.PositiveIntegerField(
+        default=5,
+        verbose_name='Máximo de Tentativas'
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Executar a partir de'
+    )
+    locked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Reservada em'
+    )
+    result = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Resultado'
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Último Erro'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Criada em'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Atualizada em'
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Finalizada em'
+    )
+    
+    class Meta:
+        verbose_name = 'Tarefa de Pagamento'
+        verbose_name_plural = 'Tarefas de Pagamento'
+        ordering = ['-created_at']
+        indexes = [
+            # Busca do worker: próximas tarefas prontas para execução
+            models.Index(fields=['status', 'run_after'], name='payment_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} - Pagamento #{self.payment_id} - {self.get_status_display()}"
@@ -0,0 +1,116 @@
+"""
+QR codes PIX para João Macarrão.
+
+As imagens são geradas uma vez por payload PIX e gravadas no storage de
+mídia com endereçamento por conteúdo (pix_qr/<sha256 do payload>.png).
+O Payment guarda apenas a URL; as imagens recentes ficam em um LRU em
+memória para servir sem acessar o storage.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import qrcode
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+
+QR_CODE_DIR = 'pix_qr'
+
+
+def payload_digest(payload):
+    """Chave de conteúdo de um payload PIX"""
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_qr_png(payload):
+    """Gera o PNG do QR Code para o payload"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRCodeStore:
+    """
+    Armazenamento de QR Codes endereçado por conteúdo.
+    
+    - save_payload: gera (se ainda não existir) e grava o PNG do payload
+    - load: lê o PNG pelo digest, passando pelo LRU em memória
+    """
+    
+    def __init__(self, storage=None, max_items=None):
+        self._storage = storage
+        self.max_items = max_items or getattr(settings, 'PIX_QR_CACHE_SIZE', 256)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @property
+    def storage(self):
+        return self._storage or default_storage
+    
+    @staticmethod
+    def path_for(digest):
+        return f'{QR_CODE_DIR}/{digest}.png'
+    
+    def _remember(self, digest, content):
+        with self._lock:
+            self._cache[digest] = content
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+    
+    def _cached(self, digest):
+        with self._lock:
+            content = self._cache.get(digest)
+            if content is not None:
+                self._cache.move_to_end(digest)
+            return content
+    
+    def save(self, digest, content):
+        """Grava o PNG sob o digest, se ainda não existir no storage"""
+        path = self.path_for(digest)
+        if not self.storage.exists(path):
+            saved = self.storage.save(path, ContentFile(content))
+            if saved != path:
+                # Gravado em paralelo por outra requisição: descarta a cópia
+                self.storage.delete(saved)
+        self._remember(digest, content)
+        return digest
+    
+    def save_payload(self, payload):
+        """Garante o PNG do payload no storage e retorna o digest"""
+        digest = payload_digest(payload)
+        if self._cached(digest) is None:
+            self.save(digest, render_qr_png(payload))
+        return digest
+    
+    def load(self, digest):
+        """Retorna o PNG do digest ou None se não existir"""
+        content = self._cached(digest)
+        if content is not None:
+            return content
+        
+        path = self.path_for(digest)
+        if not self.storage.exists(path):
+            return None
+        with self.storage.open(path, 'rb') as f:
+            content = f.read()
+        self._remember(digest, content)
+        return content
+    
+    @staticmethod
+    def url_for(digest):
+        """URL absoluta do QR Code servido pela API"""
+        path = reverse('payment-pix-qr', kwargs={'digest': digest})
+        return f"{getattr(settings, 'BACKEND_URL', '') or ''}{path}"
+
+
+qr_code_store = QRCodeStore()
@@ -0,0 +1,199 @@
+"""
+Conciliação de pagamentos com os gateways para João Macarrão.
+
+Pagamentos em 'processing' dependem de um webhook para mudar de status;
+se o webhook não chega, ficam presos. A conciliação seleciona os
+pagamentos parados há mais de PAYMENT_RECONCILE_AFTER_MINUTES, consulta
+os provedores em paralelo (ThreadPoolExecutor, sem acesso ao banco nas
+threads) e aplica as transições em lote: um UPDATE por status em
+pagamentos e pedidos, com os agregados diários e os eventos de pedido
+atualizados à parte (o update() não passa por save()).
+"""
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.events import PAYMENT_COMPLETED, PAYMENT_STATUS_CHANGED, order_events
+from apps.core.models import Order
+from apps.core.rollups import TRACKED_FIELDS, record_order_changes
+
+from .gateways import get_gateway
+from .models import Payment
+from .serializers import PAYMENT_LIST_DEFERRED_FIELDS
+
+
+logger = logging.getLogger(__name__)
+
+
+def stale_payments(older_than=None):
+    """Pagamentos em 'processing' sem atualização há mais de older_than"""
+    if older_than is None:
+        older_than = timedelta(minutes=getattr(settings, 'PAYMENT_RECONCILE_AFTER_MINUTES', 15))
+    return Payment.objects.filter(
+        status='processing',
+        updated_at__lt=timezone.now() - older_than
+    ).exclude(payment_provider='manual')
+
+
+def gateway_for(payment):
+    """Provedor que deve ser consultado para o pagamento (None se nenhum)"""
+    if getattr(settings, 'PAYMENT_GATEWAY_FAKE', False):
+        return get_gateway('fake')
+    gateway = get_gateway(payment.payment_provider)
+    # PIX simulado (Mercado Pago não configurado) não tem o que consultar
+    return gateway if gateway.configured else None
+
+
+def fetch_statuses(payments, concurrency=None):
+    """
+    Consulta os provedores com no máximo `concurrency` chamadas simultâneas.
+    
+    Returns:
+        (transitions {payment_id: status}, errors {payment_id: mensagem}, skipped)
+    """
+    concurrency = concurrency or getattr(settings, 'PAYMENT_RECONCILE_CONCURRENCY', 8)
+    transitions, errors, skipped = {}, {}, 0
+    
+    calls = []
+    for payment in payments:
+        gateway = gateway_for(payment)
+        if gateway is None:
+            skipped += 1
+        else:
+            calls.append((payment, gateway))
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [(payment, pool.submit(gateway.fetch_status, payment)) for payment, gateway in calls]
+        for payment, future in futures:
+            try:
+                status = future.result()
+            except Exception as e:
+                errors[payment.id] = str(e)
+                continue
+            if status in ('completed', 'failed', 'cancelled'):
+                transitions[payment.id] = status
+    
+    return transitions, errors, skipped
+
+
+def apply_transitions(transitions):
+    """
+    Aplica {payment_id: status} em lote.
+    
+    Só altera pagamentos que continuam em 'processing' (um webhook pode
+    ter chegado durante a consulta). Retorna {status: quantidade}.
+    """
+    by_status = defaultdict(list)
+    for payment_id, status in transitions.items():
+        by_status[status].append(payment_id)
+    
+    applied = Counter()
+    now = timezone.now()
+    with transaction.atomic():
+        for status, payment_ids in by_status.items():
+            rows = list(
+                Payment.objects.select_for_update().filter(
+                    pk__in=payment_ids,
+                    status='processing'
+                ).values_list('pk', 'order_id', 'payment_method')
+            )
+            locked = {pk: order_id for pk, order_id, _ in rows}
+            payment_methods = {pk: method for pk, _, method in rows}
+            if not locked:
+                continue
+            
+            fields = {'status': status, 'updated_at': now}
+            if status == 'completed':
+                fields['completed_at'] = now
+            elif status == 'failed':
+                fields['error_message'] = 'Pagamento não aprovado pelo gateway (conciliação)'
+            Payment.objects.filter(pk__in=list(locked)).update(**fields)
+            
+            order_status = Payment.ORDER_PAYMENT_STATUS[status]
+            orders = list(
+                Order.objects.select_for_update().filter(
+                    pk__in=list(locked.values())
+                ).values('id', 'created_at', *TRACKED_FIELDS)
+            )
+            Order.objects.filter(pk__in=list(locked.values())).update(
+                payment_status=order_status,
+                updated_at=now
+            )
+            
+            changes = []
+            for order in orders:
+                previous = {field: order[field] for field in TRACKED_FIELDS}
+                changes.append((order['created_at'], previous, {**previous, 'payment_status': order_status}))
+            record_order_changes(changes)
+            
+            # Mesmo evento que Payment.transition_to publicaria
+            payment_ids_by_order = {order_id: payment_id for payment_id, order_id in locked.items()}
+            for order in orders:
+                payment_id = payment_ids_by_order[order['id']]
+                order_events.publish(
+                    PAYMENT_COMPLETED if status == 'completed' else PAYMENT_STATUS_CHANGED,
+                    Order(
+                        id=order['id'],
+                        status=order['status'],
+                        payment_status=order_status,
+                        total=order['total']
+                    ),
+                    payment_id=str(payment_id),
+                    payment_method=payment_methods[payment_id],
+                    new_payment_status=status,
+                    old_payment_status='processing',
+                    source='reconciliation'
+                )
+            
+            applied[status] += len(locked)
+    
+    return applied
+
+
+def reconcile_payments(payments, concurrency=None, dry_run=False):
+    """Concilia uma lista de pagamentos; retorna o resumo"""
+    payments = list(payments)
+    transitions, errors, skipped = fetch_statuses(payments, concurrency)
+    applied = Counter(transitions.values()) if dry_run else apply_transitions(transitions)
+    
+    for payment_id, error in errors.items():
+        logger.warning('Conciliação do pagamento %s falhou: %s', payment_id, error)
+    
+    return {
+        'checked': len(payments),
+        'completed': applied['completed'],
+        'failed': applied['failed'],
+        'cancelled': applied['cancelled'],
+        'unchanged': len(payments) - sum(applied.values()) - len(errors) - skipped,
+        'skipped': skipped,
+        'errors': len(errors)
+    }
+
+
+def reconcile_stale_payments(older_than=None, batch_size=100, concurrency=None,
+                             limit=None, dry_run=False):
+    """
+    Concilia todos os pagamentos parados, em lotes por id crescente.
+    Retorna o resumo acumulado.
+    """
+    summary = Counter()
+    queryset = stale_payments(older_than).defer(*PAYMENT_LIST_DEFERRED_FIELDS).order_by('pk')
+    last_id = 0
+    
+    while limit is None or summary['checked'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - summary['checked'])
+        batch = list(queryset.filter(pk__gt=last_id)[:size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        summary.update(reconcile_payments(batch, concurrency, dry_run))
+    
+    return {
+        key: summary[key]
+        for key in ('checked', 'completed', 'failed', 'cancelled', 'unchanged', 'skipped', 'errors')
+    }
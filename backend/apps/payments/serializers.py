@@ -56,6 +56,44 @@ class PaymentSerializer(serializers.ModelSerializer):
         ]
 
 
+class PaymentListSerializer(serializers.ModelSerializer):
+    """
+    Serializer de listagem de Payment.
+    Omite os campos pesados (metadata, QR code e código copia e cola),
+    que são adiados na query com PAYMENT_LIST_DEFERRED_FIELDS.
+    """
+    order_id = serializers.IntegerField(read_only=True)
+    user_name = serializers.CharField(source='user.username', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
+    
+    class Meta:
+        model = Payment
+        fields = [
+            'id',
+            'order_id',
+            'user_name',
+            'payment_method',
+            'payment_method_display',
+            'payment_provider',
+            'status',
+            'status_display',
+            'amount',
+            'transaction_id',
+            'payment_intent_id',
+            'preference_id',
+            'pix_qr_code_url',
+            'error_message',
+            'created_at',
+            'updated_at',
+            'completed_at'
+        ]
+        read_only_fields = fields
+
+
+PAYMENT_LIST_DEFERRED_FIELDS = ('metadata', 'pix_qr_code', 'pix_copy_paste')
+
+
 class PaymentCreateSerializer(serializers.Serializer):
     """
     Serializer para criação de pagamento.
@@ -2,14 +2,14 @@
 Serviços de pagamento para João Macarrão.
 Integração com Stripe, Mercado Pago e PIX.
 """
+import json
+
 import stripe
-import mercadopago
-import qrcode
-import io
-import base64
 from decimal import Decimal
 from django.conf import settings
-from .models import Payment
+from .gateways import get_gateway
+from .models import InvalidPaymentTransition, Payment
+from .qrcodes import qr_code_store
 
 
 class PaymentService:
@@ -40,6 +40,30 @@ class PaymentService:
         )
         
         return payment
+    
+    @staticmethod
+    def create_charge(payment, idempotency_key=None):
+        """
+        Cria a cobrança no gateway do método de pagamento.
+        
+        Não altera o status em caso de erro: quem chama decide se marca o
+        pagamento como falho (requisição síncrona) ou tenta de novo
+        (PaymentJob). A idempotency_key é repassada ao gateway para que
+        uma nova tentativa não gere cobrança duplicada.
+        
+        Returns:
+            dict com os dados para o cliente concluir o pagamento
+        """
+        if getattr(settings, 'PAYMENT_GATEWAY_FAKE', False):
+            return get_gateway('fake').create_charge(payment, idempotency_key)
+        
+        if payment.payment_method == 'pix':
+            return PixPaymentService().create_pix_payment(payment, idempotency_key)
+        
+        if payment.payment_method in ['credit_card', 'debit_card']:
+            return StripePaymentService().create_payment_intent(payment, idempotency_key)
+        
+        raise Exception('Método de pagamento não suportado')
 
 
 class StripePaymentService:
@@ -48,31 +72,33 @@ class StripePaymentService:
     """
     
     def __init__(self):
-        self.stripe_key = getattr(settings, 'STRIPE_SECRET_KEY', None)
-        if self.stripe_key:
-            stripe.api_key = self.stripe_key
+        self.gateway = get_gateway('stripe')
     
-    def create_payment_intent(self, payment):
+    def create_payment_intent(self, payment, idempotency_key=None):
         """
         Cria um Payment Intent no Stripe.
         """
         try:
-            if not self.stripe_key:
+            if not self.gateway.configured:
                 raise Exception("Stripe não configurado. Defina STRIPE_SECRET_KEY nas configurações.")
             
             # Converte valor para centavos
             amount_cents = int(payment.amount * 100)
             
             # Cria Payment Intent
-            intent = stripe.PaymentIntent.create(
-                amount=amount_cents,
-                currency='brl',
-                metadata={
+            params = {
+                'amount': amount_cents,
+                'currency': 'brl',
+                'metadata': {
                     'order_id': payment.order.id,
                     'payment_id': payment.id,
                     'user_id': payment.user.id
                 },
-                description=f'Pedido #{payment.order.id} - João Macarrão'
+                'description': f'Pedido #{payment.order.id} - João Macarrão'
+            }
+            options = {'idempotency_key': idempotency_key} if idempotency_key else {}
+            intent = self.gateway.call(
+                lambda client: client.payment_intents.create(params=params, options=options)
             )
             
             # Atualiza payment com dados do Stripe
@@ -80,7 +106,9 @@ class StripePaymentService:
             payment.transaction_id = intent.id
             payment.status = 'processing'
             payment.metadata['stripe_intent'] = intent
-            payment.save()
+            payment.save(update_fields=[
+                'payment_intent_id', 'transaction_id', 'status', 'metadata', 'updated_at'
+            ])
             
             return {
                 'payment_id': payment.id,
@@ -88,9 +116,8 @@ class StripePaymentService:
                 'publishable_key': getattr(settings, 'STRIPE_PUBLISHABLE_KEY', ''),
                 'amount': payment.amount
             }
-            
+        
         except stripe.error.StripeError as e:
-            payment.mark_as_failed(str(e))
             raise Exception(f"Erro ao criar pagamento Stripe: {str(e)}")
     
     def confirm_payment(self, payment_intent_id):
@@ -98,59 +125,57 @@ class StripePaymentService:
         Confirma um pagamento no Stripe.
         """
         try:
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            intent = self.gateway.call(
+                lambda client: client.payment_intents.retrieve(payment_intent_id)
+            )
             
             if intent.status == 'succeeded':
                 return True
             return False
-            
+        
         except stripe.error.StripeError as e:
             raise Exception(f"Erro ao confirmar pagamento: {str(e)}")
     
-    def handle_webhook(self, payload, sig_header):
+    def construct_event(self, payload, sig_header):
         """
-        Processa webhook do Stripe.
+        Valida a assinatura do webhook e retorna o evento.
+        Apenas verificação local (HMAC), sem chamadas ao Stripe.
         """
-        try:
-            webhook_secret = getattr(settings, 'STRIPE_WEBHOOK_SECRET', None)
-            
-            if webhook_secret:
-                event = stripe.Webhook.construct_event(
-                    payload, sig_header, webhook_secret
-                )
-            else:
-                # Se não tiver webhook secret, apenas decodifica o payload
-                import json
-                event = json.loads(payload)
-            
-            # Processa evento
-            if event['type'] == 'payment_intent.succeeded':
-                payment_intent = event['data']['object']
-                payment_intent_id = payment_intent['id']
-                
-                # Busca pagamento
-                try:
-                    payment = Payment.objects.get(payment_intent_id=payment_intent_id)
-                    payment.mark_as_completed()
-                    return True
-                except Payment.DoesNotExist:
-                    pass
-            
-            elif event['type'] == 'payment_intent.payment_failed':
-                payment_intent = event['data']['object']
-                payment_intent_id = payment_intent['id']
-                
-                try:
-                    payment = Payment.objects.get(payment_intent_id=payment_intent_id)
-                    error_message = payment_intent.get('last_payment_error', {}).get('message', 'Pagamento falhou')
-                    payment.mark_as_failed(error_message)
-                except Payment.DoesNotExist:
-                    pass
-            
-            return True
-            
-        except Exception as e:
-            raise Exception(f"Erro ao processar webhook Stripe: {str(e)}")
+        webhook_secret = getattr(settings, 'STRIPE_WEBHOOK_SECRET', None)
+        
+        if webhook_secret:
+            event = stripe.Webhook.construct_event(
+                payload, sig_header, webhook_secret
+            )
+            return event
+        
+        # Se não tiver webhook secret, apenas decodifica o payload
+        return json.loads(payload)
+    
+    def handle_event(self, event):
+        """
+        Processa um evento do Stripe já validado.
+        
+        Returns:
+            Payment afetado (ou None)
+        """
+        payment_intent = event['data']['object']
+        payment_intent_id = payment_intent['id']
+        
+        if event['type'] == 'payment_intent.succeeded':
+            payment = Payment.objects.filter(payment_intent_id=payment_intent_id).first()
+            if payment:
+                payment.mark_as_completed()
+            return payment
+        
+        elif event['type'] == 'payment_intent.payment_failed':
+            payment = Payment.objects.filter(payment_intent_id=payment_intent_id).first()
+            if payment:
+                error_message = (payment_intent.get('last_payment_error') or {}).get('message', 'Pagamento falhou')
+                payment.mark_as_failed(error_message)
+            return payment
+        
+        return None
 
 
 class MercadoPagoPaymentService:
@@ -159,18 +184,14 @@ class MercadoPagoPaymentService:
     """
     
     def __init__(self):
-        self.access_token = getattr(settings, 'MERCADOPAGO_ACCESS_TOKEN', None)
-        if self.access_token:
-            self.sdk = mercadopago.SDK(self.access_token)
-        else:
-            self.sdk = None
+        self.gateway = get_gateway('mercadopago')
     
-    def create_pix_payment(self, payment):
+    def create_pix_payment(self, payment, idempotency_key=None):
         """
         Cria um pagamento PIX via Mercado Pago.
         """
         try:
-            if not self.sdk:
+            if not self.gateway.configured:
                 # Modo simulado para desenvolvimento
                 return self._create_simulated_pix(payment)
             
@@ -201,14 +222,21 @@ class MercadoPagoPaymentService:
                 "auto_return": "approved"
             }
             
-            preference_response = self.sdk.preference().create(preference_data)
+            if idempotency_key:
+                request_options = self.gateway.request_options(**{'x-idempotency-key': idempotency_key})
+            else:
+                request_options = self.gateway.request_options()
+            
+            preference_response = self.gateway.call(
+                lambda sdk: sdk.preference().create(preference_data, request_options)
+            )
             preference = preference_response["response"]
             
             # Atualiza payment
             payment.preference_id = preference["id"]
             payment.status = 'processing'
             payment.metadata['preference'] = preference
-            payment.save()
+            payment.save(update_fields=['preference_id', 'status', 'metadata', 'updated_at'])
             
             return {
                 'payment_id': payment.id,
@@ -217,9 +245,8 @@ class MercadoPagoPaymentService:
                 'sandbox_init_point': preference.get("sandbox_init_point"),
                 'amount': payment.amount
             }
-            
+        
         except Exception as e:
-            payment.mark_as_failed(str(e))
             raise Exception(f"Erro ao criar pagamento PIX: {str(e)}")
     
     def _create_simulated_pix(self, payment):
@@ -229,25 +256,19 @@ class MercadoPagoPaymentService:
         # Gera QR Code simulado
         pix_code = f"00020126330014BR.GOV.BCB.PIX0111{payment.id:011d}5204000053039865802BR5925Joao Macarrao6009SAO PAULO62070503***6304"
         
-        # Gera imagem do QR Code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(pix_code)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
+        # Imagem gerada uma vez por payload e servida por URL
+        qr_code_url = qr_code_store.url_for(qr_code_store.save_payload(pix_code))
         
         # Atualiza payment
-        payment.pix_qr_code = qr_code_base64
+        payment.pix_qr_code_url = qr_code_url
         payment.pix_copy_paste = pix_code
         payment.status = 'processing'
-        payment.save()
+        payment.save(update_fields=['pix_qr_code_url', 'pix_copy_paste', 'status', 'updated_at'])
         
         return {
             'payment_id': payment.id,
-            'qr_code': qr_code_base64,
+            'qr_code': qr_code_url,
+            'qr_code_url': qr_code_url,
             'copy_paste': pix_code,
             'amount': payment.amount
         }
@@ -255,6 +276,11 @@ class MercadoPagoPaymentService:
     def handle_webhook(self, data):
         """
         Processa webhook do Mercado Pago.
+        Consulta o pagamento no Mercado Pago (chamada de rede), por isso
+        roda no consumidor de webhooks e não na requisição.
+        
+        Returns:
+            Payment afetado (ou None)
         """
         try:
             # Mercado Pago envia notificações de diferentes tipos
@@ -265,29 +291,41 @@ class MercadoPagoPaymentService:
                 
                 if payment_id:
                     # Busca detalhes do pagamento
-                    payment_info = self.sdk.payment().get(payment_id)
+                    payment_info = self.gateway.call(lambda sdk: sdk.payment().get(payment_id))
                     payment_data = payment_info["response"]
                     
                     # Busca nosso Payment pelo external_reference
                     external_ref = payment_data.get('external_reference')
                     if external_ref:
-                        try:
-                            payment = Payment.objects.get(id=int(external_ref))
-                            
+                        payment = Payment.objects.filter(id=int(external_ref)).first()
+                        if payment:
                             status = payment_data.get('status')
                             if status == 'approved':
-                                payment.transaction_id = str(payment_id)
-                                payment.mark_as_completed()
+                                payment.mark_as_completed(transaction_id=str(payment_id))
                             elif status == 'rejected':
                                 payment.mark_as_failed('Pagamento rejeitado')
-                            
-                        except Payment.DoesNotExist:
-                            pass
-            
-            return True
+                        return payment
             
+            return None
+        
+        except InvalidPaymentTransition:
+            raise
         except Exception as e:
             raise Exception(f"Erro ao processar webhook Mercado Pago: {str(e)}")
+    
+    @staticmethod
+    def event_id(data):
+        """
+        Identificador da notificação para deduplicação.
+        Usa o id da notificação; sem ele, combina tipo, ação e recurso.
+        """
+        if data.get('id') and data.get('data'):
+            return str(data['id'])
+        resource_id = (data.get('data') or {}).get('id') or data.get('id')
+        if not resource_id:
+            return None
+        topic = data.get('topic') or data.get('type') or 'unknown'
+        return f"{topic}:{data.get('action', '')}:{resource_id}"
 
 
 class PixPaymentService:
@@ -297,30 +335,32 @@ class PixPaymentService:
     """
     
     def __init__(self):
-        # Por padrão, usa Mercado Pago
+        # Por padrão, usa Mercado Pago (cliente compartilhado, ver gateways.py)
         self.provider = MercadoPagoPaymentService()
     
-    def create_pix_payment(self, payment):
+    def create_pix_payment(self, payment, idempotency_key=None):
         """
         Cria pagamento PIX.
         """
-        return self.provider.create_pix_payment(payment)
+        return self.provider.create_pix_payment(payment, idempotency_key)
     
     def verify_payment(self, payment_id):
         """
         Verifica status de um pagamento PIX.
+        
+        Retorna o status local, sem consultar o provedor: pagamentos sem
+        webhook são conciliados pelo worker (run_payment_worker) ou pelo
+        comando reconcile_payments, fora do ciclo da requisição.
         """
         try:
             payment = Payment.objects.get(id=payment_id)
             
-            # Implementar verificação real com o provedor
-            # Por enquanto, retorna o status atual
             return {
                 'payment_id': payment.id,
                 'status': payment.status,
                 'completed': payment.status == 'completed'
             }
-            
+        
         except Payment.DoesNotExist:
             raise Exception("Pagamento não encontrado")
 
@@ -0,0 +1,214 @@
+"""
+Testes dos pagamentos com o gateway falso (sem acesso à rede).
+João Macarrão - Pagamentos
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.core.events import PAYMENT_COMPLETED, OrderEventBroker
+from apps.core.models import Order, User
+
+from . import jobs
+from .gateways import CircuitBreaker, FakeGateway, GatewayUnavailable, MercadoPagoGateway, get_gateway
+from .models import InvalidPaymentTransition, Payment
+from .reconciliation import reconcile_payments
+
+
+class FakeClock:
+    """Substitui time.monotonic nos testes do circuit breaker"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@override_settings(PAYMENT_CIRCUIT_FAILURE_THRESHOLD=2, PAYMENT_CIRCUIT_RESET_TIMEOUT=30)
+class CircuitBreakerTests(SimpleTestCase):
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('apps.payments.gateways.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gateway = FakeGateway()
+    
+    def fail_call(self):
+        with self.settings(PAYMENT_FAKE_GATEWAY_FAILURE_RATE=1):
+            with self.assertRaisesMessage(GatewayUnavailable, 'falha simulada'):
+                self.gateway.fetch_status(None)
+    
+    def test_opens_after_consecutive_failures(self):
+        self.fail_call()
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.CLOSED)
+        self.fail_call()
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.OPEN)
+        
+        # Aberto: falha na hora, sem chamar o gateway
+        with mock.patch.object(FakeGateway, '_simulate') as simulate:
+            with self.assertRaisesMessage(GatewayUnavailable, 'circuito aberto'):
+                self.gateway.fetch_status(None)
+        simulate.assert_not_called()
+    
+    def test_half_open_probe_success_closes_circuit(self):
+        self.fail_call()
+        self.fail_call()
+        self.clock.advance(30)
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.HALF_OPEN)
+        
+        # Só uma chamada de teste passa enquanto o circuito está meio-aberto
+        self.gateway.breaker.before_call()
+        with self.assertRaisesMessage(GatewayUnavailable, 'circuito aberto'):
+            self.gateway.breaker.before_call()
+        self.gateway.breaker.record_success()
+        
+        self.assertEqual(self.gateway.breaker.stats(), {'state': CircuitBreaker.CLOSED, 'failures': 0})
+        self.assertIsNone(self.gateway.fetch_status(None))
+    
+    def test_half_open_probe_failure_reopens_circuit(self):
+        self.fail_call()
+        self.fail_call()
+        self.clock.advance(30)
+        
+        self.fail_call()
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.OPEN)
+        self.clock.advance(29)
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.OPEN)
+
+
+@override_settings(PAYMENT_CIRCUIT_FAILURE_THRESHOLD=2, MERCADOPAGO_ACCESS_TOKEN='TEST-token')
+class MercadoPagoResponseTests(SimpleTestCase):
+    """O SDK do Mercado Pago não levanta exceção em 5xx/429: a resposta é checada"""
+    
+    def setUp(self):
+        self.gateway = MercadoPagoGateway()
+        self.gateway._client = mock.Mock()
+    
+    def respond(self, status_code):
+        return self.gateway.call(lambda sdk: {'status': status_code, 'response': {}})
+    
+    def test_server_errors_and_rate_limit_count_as_failures(self):
+        for status_code in (500, 502, 503, 504, 429):
+            with self.subTest(status=status_code):
+                self.gateway.breaker.record_success()
+                with self.assertRaisesMessage(GatewayUnavailable, f'respondeu {status_code}'):
+                    self.respond(status_code)
+                self.assertEqual(self.gateway.breaker.stats()['failures'], 1)
+    
+    def test_repeated_server_errors_open_circuit(self):
+        for _ in range(2):
+            with self.assertRaises(GatewayUnavailable):
+                self.respond(503)
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.OPEN)
+    
+    def test_client_errors_do_not_count_as_failures(self):
+        with self.assertRaises(GatewayUnavailable):
+            self.respond(503)
+        
+        self.assertEqual(self.respond(404)['status'], 404)
+        self.assertEqual(self.respond(201)['status'], 201)
+        self.assertEqual(self.gateway.breaker.stats()['failures'], 0)
+
+
+@override_settings(PAYMENT_GATEWAY_FAKE=True, PAYMENT_JOB_BACKOFF_BASE=0)
+class FakeGatewayPaymentTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cliente',
+            email='cliente@joaomacarrao.com',
+            password='senha-segura-123'
+        )
+    
+    def setUp(self):
+        self.order = Order.objects.create(
+            user=self.user,
+            delivery_address='Rua das Massas, 10',
+            payment_method='pix',
+            total=Decimal('42.50')
+        )
+        self.payment = Payment.objects.create(
+            order=self.order,
+            user=self.user,
+            payment_method='pix',
+            payment_provider='mercadopago',
+            amount=self.order.total
+        )
+    
+    def run_charge_job(self):
+        jobs.enqueue_charge(self.payment)
+        [job] = jobs.claim_jobs()
+        return job, jobs.run_job(job)
+    
+    def test_charge_job_runs_against_fake_gateway(self):
+        job, succeeded = self.run_charge_job()
+        
+        self.assertTrue(succeeded)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'processing')
+        self.assertEqual(self.payment.transaction_id, f'fake_{job.idempotency_key}')
+    
+    @override_settings(PAYMENT_FAKE_GATEWAY_FAILURE_RATE=1)
+    def test_failed_charge_is_rescheduled(self):
+        job, succeeded = self.run_charge_job()
+        
+        self.assertFalse(succeeded)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('falha simulada', job.last_error)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+    
+    def test_reconciliation_leaves_payment_pending_by_default(self):
+        self.run_charge_job()
+        
+        summary = reconcile_payments([Payment.objects.get(pk=self.payment.pk)])
+        
+        self.assertEqual(summary['unchanged'], 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'processing')
+    
+    @override_settings(PAYMENT_FAKE_GATEWAY_STATUS='completed')
+    def test_transition_to_status_reported_by_fake_gateway(self):
+        self.run_charge_job()
+        payment = Payment.objects.get(pk=self.payment.pk)
+        
+        status = get_gateway('fake').fetch_status(payment)
+        
+        self.assertEqual(status, 'completed')
+        self.assertTrue(payment.transition_to(status))
+        self.assertFalse(payment.transition_to(status))
+        
+        payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+        self.assertIsNotNone(payment.completed_at)
+        self.assertEqual(self.order.payment_status, 'paid')
+        
+        with self.assertRaises(InvalidPaymentTransition):
+            payment.transition_to('processing')
+    
+    @override_settings(PAYMENT_FAKE_GATEWAY_STATUS='completed')
+    def test_worker_payment_events_reach_other_processes(self):
+        self.run_charge_job()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = reconcile_payments([Payment.objects.get(pk=self.payment.pk)])
+        self.assertEqual(summary['completed'], 1)
+        
+        # Um broker novo lê o backend como um worker web leria
+        web_broker = OrderEventBroker()
+        self.assertTrue(web_broker.shared)
+        events, gap = web_broker.events_since(0)
+        self.assertFalse(gap)
+        self.assertEqual(
+            [(event['type'], event['order_id'], event['payment_status']) for event in events],
+            [(PAYMENT_COMPLETED, self.order.pk, 'paid')]
+        )
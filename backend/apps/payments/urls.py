@@ -2,7 +2,7 @@
 URLs para pagamentos.
 João Macarrão - Sistema de Pagamentos
 """
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 
@@ -10,9 +10,6 @@ router = DefaultRouter()
 router.register(r'payments', views.PaymentViewSet, basename='payment')
 
 urlpatterns = [
-    # Router URLs
-    path('', include(router.urls)),
-    
     # Criar pagamento
     path('payments/create/', views.create_payment, name='payment-create'),
     
@@ -22,8 +19,19 @@ urlpatterns = [
     # Histórico de pagamentos
     path('payments/history/', views.payment_history, name='payment-history'),
     
+    # Imagens de QR Code PIX (endereçadas pelo sha256 do payload)
+    re_path(
+        r'^payments/pix-qr/(?P<digest>[0-9a-f]{64})\.png$',
+        views.pix_qr_code,
+        name='payment-pix-qr'
+    ),
+    
     # Webhooks
     path('payments/webhook/stripe/', views.stripe_webhook, name='webhook-stripe'),
     path('payments/webhook/mercadopago/', views.mercadopago_webhook, name='webhook-mercadopago'),
+    
+    # Router URLs (por último: a rota de detalhe payments/<pk>/ capturaria
+    # os caminhos acima)
+    path('', include(router.urls)),
 ]
 
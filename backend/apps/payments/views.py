@@ -3,17 +3,27 @@ Views para pagamentos.
 João Macarrão - Sistema de Pagamentos
 """
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes, action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.settings import api_settings
+from django.db import transaction
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import etag, require_GET
 from django.utils.decorators import method_decorator
 
+from apps.api.pagination import OptInCursorPagination
+from apps.api.renderers import NDJSONRenderer
 from apps.core.models import Order
-from .models import Payment, PaymentWebhook
+from . import jobs, webhooks
+from .models import InvalidPaymentTransition, Payment
+from .qrcodes import qr_code_store
 from .serializers import (
+    PAYMENT_LIST_DEFERRED_FIELDS,
     PaymentSerializer,
+    PaymentListSerializer,
     PaymentCreateSerializer,
     PixPaymentResponseSerializer,
     StripePaymentResponseSerializer,
@@ -34,6 +44,7 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = PaymentSerializer
+    pagination_class = OptInCursorPagination
     
     def get_queryset(self):
         """
@@ -66,6 +77,24 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
         
         serializer = self.get_serializer(payment)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def job(self, request, pk=None):
+        """
+        Acompanha a criação assíncrona da cobrança (PAYMENT_JOBS_ASYNC).
+        GET /api/payments/{id}/job/
+        
+        Quando status = succeeded, `data` traz o mesmo conteúdo que
+        POST /api/payments/create/ retornaria no modo síncrono.
+        """
+        payment = self.get_object()
+        job = payment.jobs.filter(kind=jobs.CREATE_CHARGE).first()
+        if job is None:
+            return Response({
+                'error': 'Nenhuma tarefa para este pagamento'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(jobs.job_status(job))
 
 
 @api_view(['POST'])
@@ -107,21 +136,33 @@ def create_payment(request):
         )
         
         # Processa baseado no método
-        if payment_method == 'pix':
-            # PIX via Mercado Pago ou simulado
-            pix_service = PixPaymentService()
-            result = pix_service.create_pix_payment(payment)
+        if payment_method in ['pix', 'credit_card', 'debit_card']:
+            # PIX via Mercado Pago (ou simulado), cartão via Stripe
+            if jobs.is_async():
+                # O worker chama o gateway; o cliente acompanha pela status_url
+                with transaction.atomic():
+                    payment.status = 'processing'
+                    payment.save(update_fields=['status', 'updated_at'])
+                    job = jobs.enqueue_charge(payment)
+                
+                return Response({
+                    'success': True,
+                    'payment_method': payment_method,
+                    'data': {
+                        'payment_id': payment.id,
+                        'job_id': job.id,
+                        'status': payment.status,
+                        'status_url': request.build_absolute_uri(
+                            reverse('payment-job', args=[payment.id])
+                        )
+                    }
+                }, status=status.HTTP_202_ACCEPTED)
             
-            return Response({
-                'success': True,
-                'payment_method': 'pix',
-                'data': result
-            }, status=status.HTTP_201_CREATED)
-        
-        elif payment_method in ['credit_card', 'debit_card']:
-            # Cartão via Stripe
-            stripe_service = StripePaymentService()
-            result = stripe_service.create_payment_intent(payment)
+            try:
+                result = PaymentService.create_charge(payment)
+            except Exception as e:
+                payment.mark_as_failed(str(e))
+                raise
             
             return Response({
                 'success': True,
@@ -130,10 +171,7 @@ def create_payment(request):
             }, status=status.HTTP_201_CREATED)
         
         elif payment_method == 'cash':
-            # Pagamento em dinheiro - apenas cria o registro
-            payment.status = 'pending'
-            payment.save()
-            
+            # Pagamento em dinheiro - apenas cria o registro (já pendente)
             return Response({
                 'success': True,
                 'payment_method': 'cash',
@@ -192,12 +230,13 @@ def confirm_payment(request):
                 'error': 'Você não tem permissão para confirmar este pagamento'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Atualiza transaction_id se fornecido
-        if transaction_id:
-            payment.transaction_id = transaction_id
-        
-        # Marca como completo
-        payment.mark_as_completed()
+        # Marca como completo (e grava o transaction_id, se fornecido)
+        try:
+            payment.mark_as_completed(transaction_id=transaction_id)
+        except InvalidPaymentTransition as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'success': True,
@@ -218,71 +257,93 @@ def confirm_payment(request):
 
 @csrf_exempt
 @api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
 def stripe_webhook(request):
     """
     Webhook do Stripe para notificações de pagamento.
     
     POST /api/payments/webhook/stripe/
-    """
-    payload = request.body
-    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
-    
-    # Registra webhook
-    PaymentWebhook.objects.create(
-        provider='stripe',
-        event_type='webhook',
-        payload=request.data
-    )
     
+    Apenas valida a assinatura e registra o evento; o processamento é
+    feito pelo worker (run_payment_worker).
+    """
     try:
-        stripe_service = StripePaymentService()
-        stripe_service.handle_webhook(payload, sig_header)
-        
-        return HttpResponse(status=200)
-    
+        event = StripePaymentService().construct_event(
+            request.body,
+            request.META.get('HTTP_STRIPE_SIGNATURE')
+        )
     except Exception as e:
         return HttpResponse(status=400)
+    
+    webhooks.ingest(
+        provider='stripe',
+        event_type=event.get('type', 'unknown'),
+        event_id=event.get('id'),
+        payload=event
+    )
+    return HttpResponse(status=200)
 
 
 @csrf_exempt
 @api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
 def mercadopago_webhook(request):
     """
     Webhook do Mercado Pago para notificações de pagamento.
     
     POST /api/payments/webhook/mercadopago/
+    
+    Apenas registra a notificação; a consulta ao Mercado Pago e a
+    atualização do pagamento são feitas pelo worker (run_payment_worker).
     """
-    # Registra webhook
-    PaymentWebhook.objects.create(
+    data = request.data
+    webhooks.ingest(
         provider='mercadopago',
-        event_type=request.data.get('type', 'unknown'),
-        payload=request.data
+        event_type=data.get('type') or data.get('topic') or 'unknown',
+        event_id=MercadoPagoPaymentService.event_id(data),
+        payload=data
     )
-    
-    try:
-        mp_service = MercadoPagoPaymentService()
-        mp_service.handle_webhook(request.data)
-        
-        return HttpResponse(status=200)
-    
-    except Exception as e:
-        return HttpResponse(status=400)
+    return HttpResponse(status=200)
+
+
+# Linhas lidas do banco por vez na exportação NDJSON do histórico
+HISTORY_EXPORT_CHUNK_SIZE = 500
+
+
+def _stream_payment_history(payments):
+    """Serializa o histórico em NDJSON, um lote de linhas por vez"""
+    batch = []
+    for payment in payments.iterator(chunk_size=HISTORY_EXPORT_CHUNK_SIZE):
+        batch.append(payment)
+        if len(batch) == HISTORY_EXPORT_CHUNK_SIZE:
+            yield ''.join(map(NDJSONRenderer.render_line, PaymentListSerializer(batch, many=True).data))
+            batch = []
+    if batch:
+        yield ''.join(map(NDJSONRenderer.render_line, PaymentListSerializer(batch, many=True).data))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer])
 def payment_history(request):
     """
-    Lista histórico de pagamentos do usuário.
+    Lista histórico de pagamentos do usuário (paginado).
     
     GET /api/payments/history/
+    GET /api/payments/history/?pagination=cursor (paginação por cursor)
+    GET /api/payments/history/?format=ndjson (exportação completa em stream)
     """
     user = request.user
     
     if user.is_staff:
-        payments = Payment.objects.all().select_related('order', 'user')
+        payments = Payment.objects.all()
     else:
-        payments = Payment.objects.filter(user=user).select_related('order', 'user')
+        payments = Payment.objects.filter(user=user)
+    
+    # Campos pesados não são exibidos na listagem
+    payments = payments.select_related('user').defer(*PAYMENT_LIST_DEFERRED_FIELDS)
     
     # Filtra por status se fornecido
     status_filter = request.query_params.get('status')
@@ -290,7 +351,36 @@ def payment_history(request):
         payments = payments.filter(status=status_filter)
     
     # Ordena por data de criação (mais recente primeiro)
-    payments = payments.order_by('-created_at')
+    payments = payments.order_by('-created_at', '-id')
+    
+    if request.accepted_renderer.format == NDJSONRenderer.format:
+        response = StreamingHttpResponse(
+            _stream_payment_history(payments),
+            content_type=NDJSONRenderer.media_type
+        )
+        response['Content-Disposition'] = 'attachment; filename="payments.ndjson"'
+        return response
+    
+    paginator = OptInCursorPagination()
+    page = paginator.paginate_queryset(payments, request)
+    serializer = PaymentListSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@require_GET
+@etag(lambda request, digest: digest)
+def pix_qr_code(request, digest):
+    """
+    Serve a imagem do QR Code PIX.
+    GET /api/payments/pix-qr/{sha256}.png
+    
+    O conteúdo nunca muda para o mesmo digest, então a resposta pode ser
+    mantida em cache indefinidamente.
+    """
+    content = qr_code_store.load(digest)
+    if content is None:
+        raise Http404('QR Code não encontrado')
     
-    serializer = PaymentSerializer(payments, many=True)
-    return Response(serializer.data)
+    response = HttpResponse(content, content_type='image/png')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
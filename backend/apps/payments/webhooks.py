@@ -0,0 +1,177 @@
+"""
+Ingestão e processamento de webhooks de pagamento para João Macarrão.
+
+A requisição do gateway só grava o PaymentWebhook (um INSERT) e responde;
+reenvios do mesmo evento esbarram na constraint única (provider,
+event_id) e são confirmados sem novo processamento. O processamento
+(incluindo a consulta ao Mercado Pago) roda no worker de pagamentos,
+que reserva webhooks com um lease em next_attempt_at e repete falhas
+com backoff até PAYMENT_WEBHOOK_MAX_ATTEMPTS.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .jobs import backoff_delay
+from .models import InvalidPaymentTransition, PaymentWebhook
+from .services import MercadoPagoPaymentService, StripePaymentService
+
+
+logger = logging.getLogger(__name__)
+
+
+def max_attempts():
+    return getattr(settings, 'PAYMENT_WEBHOOK_MAX_ATTEMPTS', 10)
+
+
+def ingest(provider, event_type, event_id, payload):
+    """
+    Registra um webhook recebido.
+    
+    Returns:
+        (webhook, created) — created é False para reenvios já registrados
+    """
+    try:
+        with transaction.atomic():
+            webhook = PaymentWebhook.objects.create(
+                provider=provider,
+                event_type=event_type,
+                event_id=event_id,
+                payload=payload
+            )
+        return webhook, True
+    except IntegrityError:
+        webhook = PaymentWebhook.objects.filter(provider=provider, event_id=event_id).first()
+        if webhook is None:
+            raise
+        return webhook, False
+
+
+def pending():
+    """Webhooks ainda não processados e com tentativas restantes"""
+    return PaymentWebhook.objects.filter(processed=False, attempts__lt=max_attempts())
+
+
+def claim_webhooks(limit=10):
+    """
+    Reserva até `limit` webhooks prontos para processamento.
+    
+    A reserva adia next_attempt_at pelo tempo do lease: se o worker
+    cair no meio, o webhook volta a ficar disponível sozinho.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=getattr(settings, 'PAYMENT_JOB_LOCK_TIMEOUT', 300))
+    
+    with transaction.atomic():
+        webhooks = list(
+            pending().select_for_update(skip_locked=True).filter(
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'id')[:limit]
+        )
+        if webhooks:
+            PaymentWebhook.objects.filter(pk__in=[webhook.pk for webhook in webhooks]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=lease
+            )
+    
+    for webhook in webhooks:
+        webhook.attempts += 1
+        webhook.next_attempt_at = lease
+    return webhooks
+
+
+def _handle_stripe(webhook):
+    return StripePaymentService().handle_event(webhook.payload)
+
+
+def _handle_mercadopago(webhook):
+    return MercadoPagoPaymentService().handle_webhook(webhook.payload)
+
+
+WEBHOOK_HANDLERS = {
+    'stripe': _handle_stripe,
+    'mercadopago': _handle_mercadopago,
+}
+
+
+def process_webhook(webhook):
+    """
+    Processa um webhook reservado por claim_webhooks.
+    
+    Returns:
+        True se processado, False se falhou (reagendado ou esgotado)
+    """
+    try:
+        payment = WEBHOOK_HANDLERS[webhook.provider](webhook)
+        webhook.error = None
+    except InvalidPaymentTransition as e:
+        # Evento fora de ordem (ex: falha depois de concluído): não adianta repetir
+        logger.warning('Webhook %s (%s) ignorado: %s', webhook.pk, webhook.provider, e)
+        payment = None
+        webhook.error = str(e)
+    except Exception as e:
+        webhook.error = str(e)
+        webhook.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(webhook.attempts))
+        webhook.save(update_fields=['error', 'next_attempt_at'])
+        log = logger.error if webhook.attempts >= max_attempts() else logger.warning
+        log('Webhook %s (%s) falhou na tentativa %s: %s', webhook.pk, webhook.provider, webhook.attempts, e)
+        return False
+    
+    webhook.processed = True
+    webhook.processed_at = timezone.now()
+    webhook.payment = payment
+    webhook.save(update_fields=['processed', 'processed_at', 'error', 'payment'])
+    return True
+
+
+def replay(queryset):
+    """Devolve webhooks à fila (inclusive os já processados ou esgotados)"""
+    return queryset.update(
+        processed=False,
+        processed_at=None,
+        attempts=0,
+        error=None,
+        next_attempt_at=timezone.now()
+    )
+
+
+def webhook_metrics(window=timedelta(hours=1)):
+    """
+    Métricas da fila de webhooks.
+    
+    - backlog: pendentes com tentativas restantes
+    - exhausted: pendentes que esgotaram as tentativas (precisam de replay)
+    - oldest_pending_seconds: idade do webhook pendente mais antigo
+    - lag_*_seconds: recebimento → processamento na janela recente
+    """
+    now = timezone.now()
+    limit = max_attempts()
+    
+    queue = PaymentWebhook.objects.filter(processed=False).aggregate(
+        backlog=Count('pk', filter=Q(attempts__lt=limit)),
+        exhausted=Count('pk', filter=Q(attempts__gte=limit)),
+        oldest=Min('created_at', filter=Q(attempts__lt=limit))
+    )
+    lag = PaymentWebhook.objects.filter(
+        processed=True,
+        processed_at__gte=now - window
+    ).annotate(
+        lag=F('processed_at') - F('created_at')
+    ).aggregate(
+        processed=Count('pk'),
+        lag_avg=Avg('lag'),
+        lag_max=Max('lag')
+    )
+    
+    return {
+        'backlog': queue['backlog'],
+        'exhausted': queue['exhausted'],
+        'oldest_pending_seconds': round((now - queue['oldest']).total_seconds(), 1) if queue['oldest'] else 0.0,
+        'processed_recent': lag['processed'],
+        'lag_avg_seconds': round(lag['lag_avg'].total_seconds(), 3) if lag['lag_avg'] else 0.0,
+        'lag_max_seconds': round(lag['lag_max'].total_seconds(), 3) if lag['lag_max'] else 0.0
+    }
@@ -3,7 +3,10 @@ Admin para reviews.
 João Macarrão - Sistema de Avaliações
 """
 from django.contrib import admin
+from django.db import transaction
 from .models import DishReview, ReviewHelpful
+from .ratings import recompute_dish_ratings
+from .services import ReviewModerationService
 
 
 @admin.register(DishReview)
@@ -63,15 +66,26 @@ class DishReviewAdmin(admin.ModelAdmin):
     
     def approve_reviews(self, request, queryset):
         """Aprova avaliações selecionadas"""
-        updated = queryset.update(is_approved=True)
-        self.message_user(request, f'{updated} avaliação(ões) aprovada(s).')
+        result = ReviewModerationService.moderate(
+            approve_ids=queryset.values_list('pk', flat=True)
+        )
+        self.message_user(request, f'{result["approved"]} avaliação(ões) aprovada(s).')
     approve_reviews.short_description = 'Aprovar avaliações selecionadas'
     
     def reject_reviews(self, request, queryset):
         """Rejeita avaliações selecionadas"""
-        updated = queryset.update(is_approved=False)
-        self.message_user(request, f'{updated} avaliação(ões) rejeitada(s).')
+        result = ReviewModerationService.moderate(
+            reject_ids=queryset.values_list('pk', flat=True)
+        )
+        self.message_user(request, f'{result["rejected"]} avaliação(ões) rejeitada(s).')
     reject_reviews.short_description = 'Rejeitar avaliações selecionadas'
+    
+    def delete_queryset(self, request, queryset):
+        """Exclusão em lote: recalcula os agregados dos pratos afetados"""
+        with transaction.atomic():
+            dish_ids = set(queryset.values_list('dish_id', flat=True))
+            super().delete_queryset(request, queryset)
+            recompute_dish_ratings(dish_ids)
 
 
 @admin.register(ReviewHelpful)
@@ -0,0 +1,171 @@
+"""
+Votos de "útil" das avaliações para João Macarrão.
+
+A marcação (ReviewHelpful) é a fonte da verdade; helpful_count é um
+contador derivado, atualizado com F() no mesmo commit do voto ou, com
+REVIEW_HELPFUL_WRITE_BEHIND ativo, as avaliações votadas são acumuladas
+em memória e recalculadas em lote a partir das marcações. Como a
+gravação é sempre um recálculo (nunca um incremento), o buffer de
+qualquer processo e o comando flush_helpful_counts podem rodar em
+qualquer ordem sem contar um voto duas vezes.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import DishReview, ReviewHelpful
+
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_deltas(deltas):
+    """Aplica {review_id: delta} em um único UPDATE"""
+    deltas = {review_id: delta for review_id, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    
+    increment = Case(
+        *[When(pk=review_id, then=Value(delta)) for review_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    return DishReview.objects.filter(pk__in=list(deltas)).update(
+        helpful_count=Greatest(F('helpful_count') + increment, Value(0))
+    )
+
+
+class HelpfulCountBuffer:
+    """
+    Buffer write-behind dos contadores de útil (por processo).
+    
+    Os deltas são somados em memória (só para estimar o contador na
+    resposta do voto). Quando o intervalo expira ou o buffer atinge o
+    limite de avaliações pendentes, o contador das avaliações votadas é
+    recalculado a partir das marcações em um único UPDATE.
+    """
+    
+    def __init__(self, flush_interval=None, max_pending=None):
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(
+            settings, 'REVIEW_HELPFUL_FLUSH_INTERVAL', 5
+        )
+        self.max_pending = max_pending or getattr(settings, 'REVIEW_HELPFUL_MAX_PENDING', 500)
+        self._deltas = defaultdict(int)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+    
+    def add(self, review_id, delta):
+        """Acumula um delta e grava o buffer se estiver vencido"""
+        with self._lock:
+            self._deltas[review_id] += delta
+            due = (
+                len(self._deltas) >= self.max_pending or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+    
+    def pending(self, review_id):
+        """Delta ainda não gravado para a avaliação"""
+        with self._lock:
+            return self._deltas.get(review_id, 0)
+    
+    def flush(self):
+        """Recalcula as avaliações pendentes. Retorna avaliações corrigidas."""
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(int)
+            self._last_flush = time.monotonic()
+        
+        if not deltas:
+            return 0
+        try:
+            return reconcile_helpful_counts(list(deltas))
+        except Exception:
+            # Devolve ao buffer para a próxima tentativa
+            with self._lock:
+                for review_id, delta in deltas.items():
+                    self._deltas[review_id] += delta
+            raise
+
+
+helpful_buffer = HelpfulCountBuffer()
+
+
+def _flush_at_exit():
+    try:
+        helpful_buffer.flush()
+    except Exception:
+        logger.exception('Falha ao gravar contadores de útil pendentes')
+
+
+atexit.register(_flush_at_exit)
+
+
+def is_write_behind():
+    return getattr(settings, 'REVIEW_HELPFUL_WRITE_BEHIND', False)
+
+
+def toggle_helpful(review, user):
+    """
+    Alterna o voto de útil do usuário na avaliação.
+    
+    DELETE da marcação; se nada foi removido, INSERT. O par
+    (review, user) é único, então cliques concorrentes do mesmo usuário
+    resultam em um único voto (IntegrityError = já marcado).
+    
+    Returns:
+        (is_helpful, helpful_count)
+    """
+    with transaction.atomic():
+        deleted, _ = ReviewHelpful.objects.filter(review=review, user=user).delete()
+        if deleted:
+            is_helpful, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    ReviewHelpful.objects.create(review=review, user=user)
+                is_helpful, delta = True, 1
+            except IntegrityError:
+                # Voto inserido por uma requisição concorrente
+                is_helpful, delta = True, 0
+        
+        if not delta:
+            helpful_count = review.helpful_count
+        elif is_write_behind():
+            transaction.on_commit(lambda: helpful_buffer.add(review.pk, delta))
+            helpful_count = review.helpful_count + helpful_buffer.pending(review.pk) + delta
+        else:
+            _apply_deltas({review.pk: delta})
+            helpful_count = DishReview.objects.filter(pk=review.pk).values_list(
+                'helpful_count', flat=True
+            ).first()
+    
+    return is_helpful, max(helpful_count or 0, 0)
+
+
+def reconcile_helpful_counts(review_ids=None):
+    """
+    Recalcula helpful_count a partir das marcações em um único UPDATE.
+    Retorna a quantidade de avaliações corrigidas.
+    """
+    marks = ReviewHelpful.objects.filter(review=OuterRef('pk')).order_by().values(
+        'review'
+    ).annotate(total=Count('pk')).values('total')
+    expected = Coalesce(Subquery(marks, output_field=IntegerField()), Value(0))
+    
+    reviews = DishReview.objects.annotate(expected=expected).exclude(
+        helpful_count=F('expected')
+    )
+    if review_ids is not None:
+        reviews = reviews.filter(pk__in=review_ids)
+    
+    return DishReview.objects.filter(
+        pk__in=list(reviews.values_list('pk', flat=True))
+    ).update(helpful_count=expected)
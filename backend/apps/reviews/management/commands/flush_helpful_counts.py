@@ -0,0 +1,24 @@
+"""
+Grava os contadores de útil a partir das marcações (ReviewHelpful).
+Uso: python manage.py flush_helpful_counts [--review ID ...]
+
+Com REVIEW_HELPFUL_WRITE_BEHIND ativo, agende este comando (ex: a cada
+minuto) para recuperar votos que ficaram no buffer de um processo
+encerrado sem gravar. O recálculo é idempotente: os buffers dos workers
+web também recalculam a partir das marcações, então rodar o comando
+enquanto há votos pendentes não os conta duas vezes.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.reviews.helpful import reconcile_helpful_counts
+
+
+class Command(BaseCommand):
+    help = 'Recalcula helpful_count das avaliações a partir das marcações de útil'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--review', type=int, nargs='+', dest='review_ids', help='IDs das avaliações (padrão: todas)')
+    
+    def handle(self, *args, **options):
+        fixed = reconcile_helpful_counts(options['review_ids'])
+        self.stdout.write(self.style.SUCCESS(f'{fixed} avaliação(ões) atualizada(s)'))
@@ -0,0 +1,38 @@
+"""
+Confere os agregados de avaliação dos pratos com as avaliações aprovadas.
+Uso: python manage.py reconcile_dish_ratings [--dish ID ...] [--fix]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.reviews.ratings import RATING_FIELDS, find_rating_drift, write_dish_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os agregados de avaliação dos pratos e reporta divergências'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--dish', type=int, nargs='+', dest='dish_ids', help='IDs dos pratos (padrão: todos)')
+        parser.add_argument('--fix', action='store_true', help='Grava os valores recalculados')
+    
+    def handle(self, *args, **options):
+        drift = find_rating_drift(options['dish_ids'])
+        
+        for dish, expected in drift:
+            changes = ', '.join(
+                f'{field}: {getattr(dish, field)} -> {expected[field]}'
+                for field in RATING_FIELDS
+                if getattr(dish, field) != expected[field]
+            )
+            self.stdout.write(f'  #{dish.pk} {dish.name}: {changes}')
+        
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Nenhuma divergência encontrada'))
+            return
+        
+        if options['fix']:
+            write_dish_ratings(drift)
+            self.stdout.write(self.style.SUCCESS(f'{len(drift)} prato(s) corrigido(s)'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(drift)} prato(s) com divergência. Use --fix para corrigir.'
+            ))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 00:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_cursor_pagination_indexes'),
+        ('reviews', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dishreview',
+            index=models.Index(fields=['dish', '-created_at', '-id'], name='review_dish_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dishreview',
+            index=models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ),
+    ]
@@ -2,7 +2,7 @@
 Modelos de avaliações para João Macarrão.
 Sistema de avaliações e feedback de pratos.
 """
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -68,21 +68,80 @@ class DishReview(models.Model):
         verbose_name_plural = 'Avaliações de Pratos'
         ordering = ['-created_at']
         unique_together = ['dish', 'user']  # Um usuário só pode avaliar cada prato uma vez
+        indexes = [
+            # Paginação por cursor (-created_at, -id) nas avaliações de um prato
+            models.Index(fields=['dish', '-created_at', '-id'], name='review_dish_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ]
     
     def __str__(self):
         stars = '⭐' * self.rating
         return f"{self.user.username} - {self.dish.name} - {stars}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Guarda a contribuição carregada para atualizar o prato incrementalmente"""
+        instance = super().from_db(db, field_names, values)
+        instance._rating_state = instance.get_rating_state()
+        return instance
+    
+    def get_rating_state(self):
+        """
+        (dish_id, nota contada) desta avaliação; a nota é None se a
+        avaliação não está aprovada. Retorna None se algum campo não
+        foi carregado (only/defer).
+        """
+        if any(field not in self.__dict__ for field in ('dish_id', 'rating', 'is_approved')):
+            return None
+        return (self.dish_id, self.rating if self.is_approved else None)
+    
     def save(self, *args, **kwargs):
-        """Atualiza média de avaliações do prato após salvar"""
-        super().save(*args, **kwargs)
-        self.dish.update_rating()
+        """Salva e aplica no prato apenas a diferença de contribuição"""
+        from .ratings import apply_rating_change
+        
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = getattr(self, '_rating_state', None)
+                if previous is None:
+                    previous = type(self)._base_manager.filter(pk=self.pk).values_list(
+                        'dish_id', 'rating', 'is_approved'
+                    ).first()
+                    if previous:
+                        previous = (previous[0], previous[1] if previous[2] else None)
+            
+            super().save(*args, **kwargs)
+            
+            current = self.get_rating_state()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and previous and not (
+                {'dish', 'rating', 'is_approved'} & set(update_fields)
+            ):
+                # Nenhum campo que afeta a nota foi gravado
+                current = previous
+            elif current is None:
+                self.refresh_from_db(fields=['dish', 'rating', 'is_approved'])
+                current = self.get_rating_state()
+            
+            if previous and previous[0] != current[0]:
+                # Avaliação movida de prato
+                apply_rating_change(previous[0], previous[1], None)
+                apply_rating_change(current[0], None, current[1])
+            else:
+                apply_rating_change(current[0], previous[1] if previous else None, current[1])
+        
+        self._rating_state = current
     
     def delete(self, *args, **kwargs):
-        """Atualiza média de avaliações do prato após deletar"""
-        dish = self.dish
-        super().delete(*args, **kwargs)
-        dish.update_rating()
+        """Remove a avaliação e sua contribuição no prato"""
+        from .ratings import apply_rating_change
+        
+        state = getattr(self, '_rating_state', None) or self.get_rating_state()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if state:
+                apply_rating_change(state[0], state[1], None)
+        return result
 
 
 class ReviewHelpful(models.Model):
@@ -0,0 +1,141 @@
+"""
+Agregados de avaliação dos pratos para João Macarrão.
+
+Cada avaliação aprovada contribui com sua nota para os contadores do
+prato (reviews_count, rating_sum, stars_1..stars_5 e average_rating).
+Escritas aplicam apenas a diferença, com um UPDATE atômico usando F();
+recompute_dish_ratings recalcula do zero para reconciliação e para
+escritas em lote (queryset.update).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Count, DecimalField, F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+from apps.core.models import Dish
+from apps.core.stats import count_if
+from .models import DishReview
+
+
+STAR_FIELDS = {star: f'stars_{star}' for star in range(1, 6)}
+RATING_FIELDS = ['reviews_count', 'rating_sum', 'average_rating', *STAR_FIELDS.values()]
+
+
+def _average_expression(count, total):
+    """average_rating = round(total / count, 2), 0 sem avaliações"""
+    return Coalesce(
+        Round(Cast(total, FloatField()) / NullIf(count, 0), 2),
+        Value(0.0),
+        output_field=DecimalField(max_digits=3, decimal_places=2)
+    )
+
+
+def rating_stats(dish):
+    """
+    Estatísticas públicas de um prato a partir dos contadores gravados.
+    dish: dict de Dish.objects.values('id', 'name', *RATING_FIELDS)
+    """
+    return {
+        'dish_id': dish['id'],
+        'dish_name': dish['name'],
+        'average_rating': float(dish['average_rating']),
+        'total_reviews': dish['reviews_count'],
+        'distribution': {field: dish[field] for field in STAR_FIELDS.values()}
+    }
+
+
+def apply_rating_change(dish_id, old_rating, new_rating):
+    """
+    Aplica no prato a troca de contribuição de uma avaliação.
+    old_rating/new_rating são a nota contada (None se a avaliação não
+    existia ou não está aprovada). Executa um único UPDATE.
+    """
+    if old_rating == new_rating:
+        return
+    
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    
+    # No SET, as colunas referenciadas ainda têm os valores anteriores
+    updates = {
+        'reviews_count': F('reviews_count') + count_delta,
+        'rating_sum': F('rating_sum') + sum_delta,
+        'average_rating': _average_expression(
+            F('reviews_count') + count_delta,
+            F('rating_sum') + sum_delta
+        )
+    }
+    if old_rating is not None:
+        updates[STAR_FIELDS[old_rating]] = F(STAR_FIELDS[old_rating]) - 1
+    if new_rating is not None:
+        updates[STAR_FIELDS[new_rating]] = F(STAR_FIELDS[new_rating]) + 1
+    
+    Dish.objects.filter(pk=dish_id).update(**updates)
+
+
+def compute_dish_ratings(dish_ids=None, review_model=DishReview):
+    """
+    Agregados calculados a partir das avaliações aprovadas, com um único
+    GROUP BY por prato. Retorna {dish_id: {campo: valor}}.
+    """
+    reviews = review_model.objects.filter(is_approved=True)
+    if dish_ids is not None:
+        reviews = reviews.filter(dish_id__in=dish_ids)
+    
+    rows = reviews.order_by().values('dish_id').annotate(
+        reviews_count=Count('pk'),
+        rating_sum=Sum('rating'),
+        **{field: count_if(rating=star) for star, field in STAR_FIELDS.items()}
+    )
+    
+    stats = {}
+    for row in rows:
+        dish_id = row.pop('dish_id')
+        row['average_rating'] = (
+            Decimal(row['rating_sum']) / row['reviews_count']
+        ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        stats[dish_id] = row
+    return stats
+
+
+def find_rating_drift(dish_ids=None, dish_model=Dish, review_model=DishReview):
+    """
+    Compara os contadores gravados com os recalculados.
+    Retorna lista de (dish, esperado) para os pratos divergentes.
+    """
+    expected = compute_dish_ratings(dish_ids, review_model)
+    empty = {field: 0 for field in RATING_FIELDS}
+    
+    dishes = dish_model.objects.only('id', 'name', *RATING_FIELDS).order_by('id')
+    if dish_ids is not None:
+        dishes = dishes.filter(pk__in=dish_ids)
+    
+    drift = []
+    for dish in dishes.iterator(chunk_size=500):
+        values = expected.get(dish.pk, empty)
+        if any(getattr(dish, field) != values[field] for field in RATING_FIELDS):
+            drift.append((dish, values))
+    return drift
+
+
+def write_dish_ratings(drift, dish_model=Dish):
+    """Grava os valores esperados dos pratos divergentes em um bulk_update"""
+    dishes = []
+    for dish, values in drift:
+        for field in RATING_FIELDS:
+            setattr(dish, field, values[field])
+        dishes.append(dish)
+    dish_model.objects.bulk_update(dishes, RATING_FIELDS, batch_size=500)
+
+
+def recompute_dish_ratings(dish_ids=None, dish_model=Dish, review_model=DishReview):
+    """
+    Recalcula e grava os agregados dos pratos informados (todos se None).
+    Apenas pratos divergentes são gravados. Retorna a quantidade corrigida.
+    
+    dish_model/review_model permitem usar os modelos históricos em
+    migrações.
+    """
+    drift = find_rating_drift(dish_ids, dish_model, review_model)
+    write_dish_ratings(drift, dish_model)
+    return len(drift)
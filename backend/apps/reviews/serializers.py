@@ -181,3 +181,35 @@ class DishWithReviewsSerializer(serializers.ModelSerializer):
             'reviews'
         ]
 
+
+class BulkModerationSerializer(serializers.Serializer):
+    """
+    Serializer para moderação em lote.
+    """
+    MAX_IDS = 500
+    
+    approve = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+        max_length=MAX_IDS
+    )
+    reject = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+        max_length=MAX_IDS
+    )
+    
+    def validate(self, data):
+        """Exige ao menos um id e impede o mesmo id nas duas listas"""
+        if not data['approve'] and not data['reject']:
+            raise serializers.ValidationError("Informe ids em 'approve' e/ou 'reject'.")
+        
+        overlap = set(data['approve']) & set(data['reject'])
+        if overlap:
+            raise serializers.ValidationError(
+                f"Avaliações em 'approve' e 'reject' ao mesmo tempo: {sorted(overlap)}"
+            )
+        
+        return data
@@ -0,0 +1,66 @@
+"""
+Serviços de avaliações para João Macarrão.
+Moderação em lote com recálculo dos agregados uma vez por prato.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DishReview
+from .ratings import recompute_dish_ratings
+
+
+class ReviewModerationService:
+    """
+    Serviço de moderação de avaliações.
+    
+    Aprovações e rejeições são aplicadas com um UPDATE cada (apenas nas
+    avaliações que mudam de estado, atualizando updated_at para invalidar
+    os ETags das listagens) e os agregados de avaliação são
+    recalculados uma única vez por prato afetado, ao final da transação.
+    """
+    
+    @staticmethod
+    def moderate(approve_ids=(), reject_ids=()):
+        """
+        Aprova e rejeita avaliações em lote.
+        
+        Args:
+            approve_ids: ids (ou queryset de ids) a aprovar
+            reject_ids: ids (ou queryset de ids) a rejeitar
+        
+        Returns:
+            dict com approved, rejected, dishes_updated e not_found
+        """
+        approve_ids = set(approve_ids)
+        reject_ids = set(reject_ids)
+        
+        with transaction.atomic():
+            reviews = DishReview.objects.select_for_update().filter(
+                pk__in=approve_ids | reject_ids
+            ).values_list('pk', 'dish_id', 'is_approved')
+            
+            found = set()
+            to_approve, to_reject, dish_ids = [], [], set()
+            for pk, dish_id, is_approved in reviews:
+                found.add(pk)
+                if pk in approve_ids and not is_approved:
+                    to_approve.append(pk)
+                    dish_ids.add(dish_id)
+                elif pk in reject_ids and is_approved:
+                    to_reject.append(pk)
+                    dish_ids.add(dish_id)
+            
+            now = timezone.now()
+            if to_approve:
+                DishReview.objects.filter(pk__in=to_approve).update(is_approved=True, updated_at=now)
+            if to_reject:
+                DishReview.objects.filter(pk__in=to_reject).update(is_approved=False, updated_at=now)
+            
+            dishes_updated = recompute_dish_ratings(dish_ids) if dish_ids else 0
+        
+        return {
+            'approved': len(to_approve),
+            'rejected': len(to_reject),
+            'dishes_updated': dishes_updated,
+            'not_found': sorted((approve_ids | reject_ids) - found)
+        }
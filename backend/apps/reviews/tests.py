@@ -0,0 +1,63 @@
+"""
+Testes das avaliações de pratos.
+João Macarrão - Sistema de Avaliações
+"""
+from rest_framework.test import APITestCase
+
+from apps.core.models import Category, Dish, User
+
+from .models import DishReview
+
+
+class BulkModerationETagTests(APITestCase):
+    """A moderação em lote invalida os ETags das listagens da equipe"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin',
+            email='admin@joaomacarrao.com',
+            password='senha-segura-123',
+            is_staff=True
+        )
+        customer = User.objects.create_user(
+            username='cliente',
+            email='cliente@joaomacarrao.com',
+            password='senha-segura-123'
+        )
+        dish = Dish.objects.create(
+            name='Fettuccine',
+            description='Molho alfredo',
+            price='34.00',
+            category=Category.objects.create(name='Massas')
+        )
+        cls.review = DishReview.objects.create(dish=dish, user=customer, rating=5, is_approved=False)
+    
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+    
+    def assert_moderation_changes_etag(self, url, **moderation):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        response = self.client.post('/api/reviews/bulk_moderate/', moderation, format='json')
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+    
+    def test_list_after_bulk_approve(self):
+        self.assert_moderation_changes_etag('/api/reviews/', approve=[self.review.pk])
+    
+    def test_detail_after_bulk_approve_and_reject(self):
+        url = f'/api/reviews/{self.review.pk}/'
+        
+        response = self.assert_moderation_changes_etag(url, approve=[self.review.pk])
+        self.assertTrue(response.data['is_approved'])
+        
+        response = self.assert_moderation_changes_etag(url, reject=[self.review.pk])
+        self.assertFalse(response.data['is_approved'])
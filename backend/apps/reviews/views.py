@@ -6,20 +6,31 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, Sum
 
-from .models import DishReview, ReviewHelpful
+from .models import DishReview
 from .serializers import (
     DishReviewSerializer,
     DishReviewCreateSerializer,
     DishReviewUpdateSerializer,
     DishReviewListSerializer,
-    DishWithReviewsSerializer
+    DishWithReviewsSerializer,
+    BulkModerationSerializer
 )
+from .helpful import toggle_helpful
+from .ratings import RATING_FIELDS, STAR_FIELDS, rating_stats
+from .services import ReviewModerationService
 from apps.core.models import Dish
+from apps.core.stats import conditional_counts, count_if
+from apps.api.mixins import ConditionalGetMixin
+from apps.api.pagination import OptInCursorPagination
 
 
-class DishReviewViewSet(viewsets.ModelViewSet):
+# Limite de pratos por requisição em /api/reviews/stats/
+MAX_STATS_DISHES = 100
+
+
+class DishReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de avaliações de pratos.
     
@@ -28,6 +39,9 @@ class DishReviewViewSet(viewsets.ModelViewSet):
     - PUT/PATCH (próprio usuário): Atualizar avaliação
     - DELETE (próprio usuário ou admin): Deletar avaliação
     """
+    # helpful_count é atualizado sem alterar updated_at
+    conditional_extra_aggregates = {'helpful': Sum('helpful_count')}
+    pagination_class = OptInCursorPagination
     
     def get_permissions(self):
         """
@@ -36,7 +50,7 @@ class DishReviewViewSet(viewsets.ModelViewSet):
         - create: Autenticado
         - update, destroy: Próprio usuário ou admin
         """
-        if self.action in ['list', 'retrieve', 'dish_reviews', 'dish_stats']:
+        if self.action in ['list', 'retrieve', 'dish_reviews', 'dish_stats', 'stats']:
             return [AllowAny()]
         return [IsAuthenticated()]
     
@@ -119,33 +133,71 @@ class DishReviewViewSet(viewsets.ModelViewSet):
         """
         Retorna estatísticas de avaliações de um prato.
         GET /api/reviews/dish/{dish_id}/stats/
+        
+        Público: contadores das avaliações aprovadas, mantidos no prato.
+        Staff: calculado sobre get_queryset(), incluindo as avaliações
+        ainda não aprovadas (um aggregate condicional).
         """
-        try:
-            dish = Dish.objects.get(id=dish_id)
-        except Dish.DoesNotExist:
+        dish = Dish.objects.filter(id=dish_id).values('id', 'name', *RATING_FIELDS).first()
+        if dish is None:
             return Response({
                 'error': 'Prato não encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        reviews = self.get_queryset().filter(dish=dish)
+        if not request.user.is_staff:
+            # Contadores mantidos incrementalmente (apps.reviews.ratings)
+            return Response(rating_stats(dish))
         
-        # Estatísticas
-        stats = reviews.aggregate(
+        stats = conditional_counts(
+            self.get_queryset().filter(dish_id=dish['id']),
             average=Avg('rating'),
-            count=Count('id')
+            count=Count('pk'),
+            **{field: count_if(rating=star) for star, field in STAR_FIELDS.items()}
         )
-        
-        # Distribuição por estrelas
-        distribution = {}
-        for i in range(1, 6):
-            distribution[f'stars_{i}'] = reviews.filter(rating=i).count()
-        
         return Response({
-            'dish_id': dish.id,
-            'dish_name': dish.name,
+            'dish_id': dish['id'],
+            'dish_name': dish['name'],
             'average_rating': round(stats['average'] or 0, 2),
             'total_reviews': stats['count'],
-            'distribution': distribution
+            'distribution': {field: stats[field] for field in STAR_FIELDS.values()}
+        })
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Estatísticas de avaliações de vários pratos em uma query.
+        GET /api/reviews/stats/?dish_ids=1,2,3
+        """
+        raw_ids = []
+        for value in request.query_params.getlist('dish_ids'):
+            raw_ids += [item for item in value.split(',') if item.strip()]
+        
+        try:
+            dish_ids = list(dict.fromkeys(int(item) for item in raw_ids))
+        except ValueError:
+            return Response({
+                'error': 'dish_ids deve ser uma lista de números separados por vírgula'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not dish_ids:
+            return Response({
+                'error': 'Informe dish_ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(dish_ids) > MAX_STATS_DISHES:
+            return Response({
+                'error': f'Máximo de {MAX_STATS_DISHES} pratos por requisição'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        dishes = {
+            dish['id']: dish
+            for dish in Dish.objects.filter(id__in=dish_ids).values('id', 'name', *RATING_FIELDS)
+        }
+        results = [rating_stats(dishes[dish_id]) for dish_id in dish_ids if dish_id in dishes]
+        
+        return Response({
+            'count': len(results),
+            'results': results
         })
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
@@ -155,35 +207,14 @@ class DishReviewViewSet(viewsets.ModelViewSet):
         POST /api/reviews/{id}/mark_helpful/
         """
         review = self.get_object()
-        user = request.user
+        is_helpful, helpful_count = toggle_helpful(review, request.user)
         
-        # Verifica se já marcou
-        existing = ReviewHelpful.objects.filter(review=review, user=user).first()
-        
-        if existing:
-            # Remove marcação
-            existing.delete()
-            review.helpful_count = max(0, review.helpful_count - 1)
-            review.save(update_fields=['helpful_count'])
-            
-            return Response({
-                'success': True,
-                'message': 'Marcação removida',
-                'helpful_count': review.helpful_count,
-                'is_helpful': False
-            })
-        else:
-            # Adiciona marcação
-            ReviewHelpful.objects.create(review=review, user=user)
-            review.helpful_count += 1
-            review.save(update_fields=['helpful_count'])
-            
-            return Response({
-                'success': True,
-                'message': 'Avaliação marcada como útil',
-                'helpful_count': review.helpful_count,
-                'is_helpful': True
-            })
+        return Response({
+            'success': True,
+            'message': 'Avaliação marcada como útil' if is_helpful else 'Marcação removida',
+            'helpful_count': helpful_count,
+            'is_helpful': is_helpful
+        })
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_reviews(self, request):
@@ -232,4 +263,24 @@ class DishReviewViewSet(viewsets.ModelViewSet):
             'message': 'Avaliação rejeitada',
             'data': DishReviewSerializer(review).data
         })
-
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_moderate(self, request):
+        """
+        Aprova e rejeita avaliações em lote (admin apenas).
+        POST /api/reviews/bulk_moderate/
+        Body: {"approve": [1, 2], "reject": [3]}
+        """
+        serializer = BulkModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = ReviewModerationService.moderate(
+            approve_ids=serializer.validated_data['approve'],
+            reject_ids=serializer.validated_data['reject']
+        )
+        
+        return Response({
+            'success': True,
+            'message': f'{result["approved"]} aprovada(s), {result["rejected"]} rejeitada(s)',
+            **result
+        })
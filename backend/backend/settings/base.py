@@ -102,6 +102,102 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'core.User'
 
+# Cache
+# O alias 'menu' guarda as listagens públicas do cardápio (apps.core.menu_cache).
+# Local-memory por padrão; com múltiplos workers use um backend compartilhado,
+# ex: MENU_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'joaomacarrao-default',
+    },
+    'menu': {
+        'BACKEND': os.getenv('MENU_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('MENU_CACHE_LOCATION', 'joaomacarrao-menu'),
+    },
+}
+MENU_CACHE_ALIAS = 'menu'
+MENU_CACHE_TIMEOUT = int(os.getenv('MENU_CACHE_TIMEOUT', 300))
+
+# Eventos de pedidos (apps.core.events) consumidos pelo stream da cozinha.
+# O backend padrão grava na tabela OrderEvent, compartilhada por todos os
+# processos; InMemoryEventBackend só serve para um único processo.
+# O stream deve rodar em ASGI; em WSGI cada processo mantém no máximo
+# ORDER_EVENTS_WSGI_STREAMS streams abertos (cada um ocupa uma thread) e
+# as demais conexões recebem short polling a cada ORDER_EVENTS_POLL_RETRY s.
+# ORDER_EVENTS_SETTLE_SECONDS: quanto tempo a leitura espera por um id
+# faltando (INSERT ainda não confirmado) antes de seguir adiante.
+ORDER_EVENTS_BACKEND = os.getenv('ORDER_EVENTS_BACKEND', 'apps.core.events.DatabaseEventBackend')
+ORDER_EVENTS_BUFFER_SIZE = int(os.getenv('ORDER_EVENTS_BUFFER_SIZE', 1000))
+ORDER_EVENTS_POLL_INTERVAL = float(os.getenv('ORDER_EVENTS_POLL_INTERVAL', 1.0))
+ORDER_EVENTS_SETTLE_SECONDS = float(os.getenv('ORDER_EVENTS_SETTLE_SECONDS', 3.0))
+ORDER_EVENTS_WSGI_STREAMS = int(os.getenv('ORDER_EVENTS_WSGI_STREAMS', 1))
+ORDER_EVENTS_POLL_RETRY = int(os.getenv('ORDER_EVENTS_POLL_RETRY', 5))
+ORDER_EVENTS_KEEPALIVE = int(os.getenv('ORDER_EVENTS_KEEPALIVE', 15))
+ORDER_EVENTS_STREAM_TIMEOUT = int(os.getenv('ORDER_EVENTS_STREAM_TIMEOUT', 300))
+
+# Votos de útil (apps.reviews.helpful). Com write-behind os contadores são
+# acumulados em memória e gravados em lote; agende flush_helpful_counts.
+REVIEW_HELPFUL_WRITE_BEHIND = os.getenv('REVIEW_HELPFUL_WRITE_BEHIND', 'False') == 'True'
+REVIEW_HELPFUL_FLUSH_INTERVAL = int(os.getenv('REVIEW_HELPFUL_FLUSH_INTERVAL', 5))
+REVIEW_HELPFUL_MAX_PENDING = int(os.getenv('REVIEW_HELPFUL_MAX_PENDING', 500))
+
+# QR Codes PIX (apps.payments.qrcodes): imagens recentes mantidas em memória
+PIX_QR_CACHE_SIZE = int(os.getenv('PIX_QR_CACHE_SIZE', 256))
+
+# Fila de pagamentos (apps.payments.jobs) e webhooks (apps.payments.webhooks),
+# processados pelo worker run_payment_worker
+PAYMENT_JOBS_ASYNC = os.getenv('PAYMENT_JOBS_ASYNC', 'False') == 'True'
+PAYMENT_JOB_MAX_ATTEMPTS = int(os.getenv('PAYMENT_JOB_MAX_ATTEMPTS', 5))
+PAYMENT_JOB_BACKOFF_BASE = int(os.getenv('PAYMENT_JOB_BACKOFF_BASE', 5))
+PAYMENT_JOB_BACKOFF_MAX = int(os.getenv('PAYMENT_JOB_BACKOFF_MAX', 300))
+PAYMENT_JOB_LOCK_TIMEOUT = int(os.getenv('PAYMENT_JOB_LOCK_TIMEOUT', 300))
+PAYMENT_WEBHOOK_MAX_ATTEMPTS = int(os.getenv('PAYMENT_WEBHOOK_MAX_ATTEMPTS', 10))
+
+# Clientes dos gateways (apps.payments.gateways): um por processo, com pool
+# de conexões HTTP, timeout e circuit breaker por provedor
+PAYMENT_GATEWAY_TIMEOUT = int(os.getenv('PAYMENT_GATEWAY_TIMEOUT', 10))
+PAYMENT_GATEWAY_MAX_RETRIES = int(os.getenv('PAYMENT_GATEWAY_MAX_RETRIES', 2))
+PAYMENT_HTTP_POOL_SIZE = int(os.getenv('PAYMENT_HTTP_POOL_SIZE', 10))
+PAYMENT_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('PAYMENT_CIRCUIT_FAILURE_THRESHOLD', 5))
+PAYMENT_CIRCUIT_RESET_TIMEOUT = int(os.getenv('PAYMENT_CIRCUIT_RESET_TIMEOUT', 30))
+
+# Conciliação (apps.payments.reconciliation): pagamentos em 'processing' há
+# mais de N minutos são consultados nos gateways pelo worker (a cada
+# PAYMENT_RECONCILE_INTERVAL segundos) ou pelo comando reconcile_payments
+PAYMENT_RECONCILE_AFTER_MINUTES = int(os.getenv('PAYMENT_RECONCILE_AFTER_MINUTES', 15))
+PAYMENT_RECONCILE_INTERVAL = int(os.getenv('PAYMENT_RECONCILE_INTERVAL', 60))
+PAYMENT_RECONCILE_CONCURRENCY = int(os.getenv('PAYMENT_RECONCILE_CONCURRENCY', 8))
+
+# Gateway falso para desenvolvimento e testes (sem acesso à rede)
+PAYMENT_GATEWAY_FAKE = os.getenv('PAYMENT_GATEWAY_FAKE', 'False') == 'True'
+PAYMENT_FAKE_GATEWAY_LATENCY = float(os.getenv('PAYMENT_FAKE_GATEWAY_LATENCY', 0))
+PAYMENT_FAKE_GATEWAY_FAILURE_RATE = float(os.getenv('PAYMENT_FAKE_GATEWAY_FAILURE_RATE', 0))
+PAYMENT_FAKE_GATEWAY_STATUS = os.getenv('PAYMENT_FAKE_GATEWAY_STATUS', 'pending')
+
+# Text-to-Speech (apps.accessibility.tts): sínteses em um pool de threads por
+# processo; textos longos respondem 202 e são acompanhados por polling.
+# TTS_SYNTHESIZER=stub gera áudio de silêncio localmente (sem Google Cloud)
+TTS_SYNTHESIZER = os.getenv('TTS_SYNTHESIZER', 'google')
+TTS_MAX_WORKERS = int(os.getenv('TTS_MAX_WORKERS', 4))
+TTS_MAX_PENDING = int(os.getenv('TTS_MAX_PENDING', 100))
+TTS_TIMEOUT = int(os.getenv('TTS_TIMEOUT', 15))
+TTS_ASYNC_MIN_CHARS = int(os.getenv('TTS_ASYNC_MIN_CHARS', 1000))
+TTS_STUB_LATENCY = float(os.getenv('TTS_STUB_LATENCY', 0))
+# Textos com várias frases são sintetizados frase a frase (cache por frase)
+TTS_CHUNKING = os.getenv('TTS_CHUNKING', 'True') == 'True'
+TTS_CHUNK_MAX_CHARS = int(os.getenv('TTS_CHUNK_MAX_CHARS', 300))
+# Cache de áudio (apps.accessibility.cache): acima do limite os áudios menos
+# usados (lru ou lfu) são removidos; veja o comando prune_tts_cache
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+TTS_CACHE_EVICTION = os.getenv('TTS_CACHE_EVICTION', 'lru')
+TTS_CACHE_TARGET_RATIO = float(os.getenv('TTS_CACHE_TARGET_RATIO', 0.9))
+# Narração do cardápio (apps.accessibility.prewarm): sintetizada ao salvar um
+# prato e pelo comando prewarm_menu_audio
+TTS_PREWARM_ON_SAVE = os.getenv('TTS_PREWARM_ON_SAVE', 'True') == 'True'
+TTS_PREWARM_CONCURRENCY = int(os.getenv('TTS_PREWARM_CONCURRENCY', 2))
+TTS_PREWARM_VOICES = os.getenv('TTS_PREWARM_VOICES', 'NEUTRAL').split(',')
+
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
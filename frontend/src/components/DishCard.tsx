@@ -44,6 +44,7 @@ const DishCard: React.FC<DishCardProps> = ({
   const handlePlayAudio = () => {
     if (onPlayAudio) {
       setIsPlayingAudio(true);
+      // Mesmo texto de dish_narration no backend (narração pré-sintetizada)
       const audioText = `${dish.name}. ${dish.description}. Preço: R$ ${dish.price.toFixed(2)}.`;
       onPlayAudio(audioText);
       
@@ -56,7 +56,9 @@ const PixPayment: React.FC<{
       
       <div className="qr-code-container">
         <div className="qr-code">
-          {data.qr_code.startsWith('data:') ? (
+          {data.qr_code_url ? (
+            <img src={data.qr_code_url} alt="QR Code PIX" />
+          ) : data.qr_code.startsWith('data:') ? (
             <img src={data.qr_code} alt="QR Code PIX" />
           ) : (
             <QRCodeSVG
@@ -123,9 +123,11 @@ export const AccessibilityProvider: React.FC<AccessibilityProviderProps> = ({ ch
         text,
         language_code: settings.language,
         voice_gender: settings.voiceGender,
+        response_mode: 'url',
       });
 
-      accessibilityService.playAudio(response.audio_content);
+      // O navegador baixa (e mantém em cache) o MP3 direto da URL
+      accessibilityService.playAudioFromUrl(response.audio_url);
       
       // Estima a duração baseada no tamanho do texto (aproximadamente)
       const estimatedDuration = (text.length / 10) * 1000; // ~10 caracteres por segundo
@@ -1,5 +1,5 @@
 import { api } from './api';
-import type { AccessibilityConfig, TTSRequest, TTSResponse } from '../types/accessibility';
+import type { AccessibilityConfig, TTSRequest, TTSResponse, TTSStatus } from '../types/accessibility';
 
 const ACCESSIBILITY_BASE_PATH = '/api/accessibility';
 
@@ -16,8 +16,31 @@ export const accessibilityService = {
    * Converte texto em áudio usando Text-to-Speech
    */
   async textToSpeech(request: TTSRequest): Promise<TTSResponse> {
-    const response = await api.post<TTSResponse>(`${ACCESSIBILITY_BASE_PATH}/tts/`, request);
-    return response.data;
+    const response = await api.post<TTSResponse | TTSStatus>(`${ACCESSIBILITY_BASE_PATH}/tts/`, request);
+    if (response.status === 202) {
+      // Texto longo: a síntese continua no servidor
+      const result = await accessibilityService.waitForSpeech((response.data as TTSStatus).status_url!);
+      return { ...result, text: request.text } as TTSResponse;
+    }
+    return response.data as TTSResponse;
+  },
+
+  /**
+   * Acompanha uma síntese em segundo plano até o áudio ficar pronto
+   */
+  async waitForSpeech(statusUrl: string, interval = 1000, timeout = 60000): Promise<TTSStatus> {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+      const response = await api.get<TTSStatus>(statusUrl);
+      if (response.data.status === 'ready') {
+        return response.data;
+      }
+      if (response.data.status === 'failed') {
+        throw new Error(response.data.error || 'Falha ao sintetizar fala');
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+    throw new Error('Tempo esgotado aguardando o áudio');
   },
 
   /**
@@ -7,7 +7,8 @@ import type {
   Payment,
   PaymentCreateData,
   PaymentResponse,
-  PaymentConfirmData
+  PaymentConfirmData,
+  PaymentJob
 } from '../types/payment';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
@@ -32,9 +33,32 @@ export const paymentService = {
       data,
       getAuthHeaders()
     );
+    if (response.status === 202) {
+      // Cobrança criada em segundo plano: aguarda o worker
+      const job = await paymentService.waitForPaymentJob(response.data.data.status_url);
+      return { ...response.data, data: job.data };
+    }
     return response.data;
   },
 
+  /**
+   * Acompanha a criação assíncrona da cobrança até concluir
+   */
+  async waitForPaymentJob(statusUrl: string, interval = 1000, timeout = 60000): Promise<PaymentJob> {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+      const response = await axios.get<PaymentJob>(statusUrl, getAuthHeaders());
+      if (response.data.status === 'succeeded') {
+        return response.data;
+      }
+      if (response.data.status === 'failed') {
+        throw new Error(response.data.error || 'Falha ao criar pagamento');
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+    throw new Error('Tempo esgotado aguardando o pagamento');
+  },
+
   /**
    * Confirma um pagamento
    */
@@ -80,7 +104,8 @@ export const paymentService = {
         params: status ? { status } : undefined
       }
     );
-    return response.data;
+    // Resposta paginada: { count, next, previous, results }
+    return response.data.results ?? response.data;
   }
 };
 
@@ -11,15 +11,25 @@ export interface TTSRequest {
   text: string;
   language_code?: LanguageCode;
   voice_gender?: VoiceGender;
+  response_mode?: 'inline' | 'url';
 }
 
 export interface TTSResponse {
-  audio_content: string;
+  audio_content?: string;
   text: string;
   cache_key: string;
   audio_url: string;
 }
 
+export interface TTSStatus {
+  status: 'pending' | 'ready' | 'failed';
+  cache_key: string;
+  status_url?: string;
+  audio_content?: string;
+  audio_url?: string;
+  error?: string;
+}
+
 export interface AccessibilityConfig {
   tts_enabled: boolean;
   supported_languages: Language[];
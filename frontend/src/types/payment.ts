@@ -73,6 +73,15 @@ export interface PaymentResponse {
   data: PixPaymentResponse | StripePaymentResponse | MercadoPagoPaymentResponse | any;
 }
 
+export interface PaymentJob {
+  job_id: number;
+  payment_id: number;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  attempts: number;
+  data: PixPaymentResponse | StripePaymentResponse | MercadoPagoPaymentResponse | any | null;
+  error: string | null;
+}
+
 export interface PaymentConfirmData {
   payment_id: number;
   transaction_id?: string;